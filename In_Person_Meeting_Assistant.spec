@@ -1,7 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 from PyInstaller.utils.hooks import collect_all
 
-datas = [('in_person_meeting_app.py', '.')]
+datas = [('in_person_meeting_app.py', '.'), ('assistant', 'assistant')]
 binaries = []
 hiddenimports = ['streamlit', 'sounddevice', 'whisper', 'openai', 'pinecone', 'keyring', 'PyPDF2', 'numpy', 'librosa']
 tmp_ret = collect_all('streamlit')
@@ -0,0 +1,59 @@
+from .asr import (ASRBackend, FasterWhisperBackend, Segment, WhisperBackend, Word,
+                  load_backend, segments_text)
+from .asr_daemon import RemoteBackend, TranscriptionServer, connect_or_spawn
+from .batch import decode_audio, format_timestamp, split_on_silence, transcribe_file
+from .capture import AudioCapture, AudioCursor, AudioRingBuffer
+from .chunking import Chunk, TokenChunker
+from .decoding import DECODE_PROFILES, LANGUAGES, LanguageLock, decode_options
+from .embedding_cache import EmbeddingCache
+from .embeddings import EMBEDDING_MODEL, EmbeddingService
+from .hybrid import HybridRanker, reciprocal_rank_fusion
+from .ingestion import IngestionRegistry, content_digest
+from .journal import AudioJournal, list_sessions, new_session_id, open_journal, session_dir
+from .lexical import LexicalIndex, query_terms
+from .metrics import METRICS, LatencyHistogram, LatencyRecorder
+from .model_controller import MODEL_SIZES, AdaptiveModelController, ModelCache
+from .paths import DATA_DIR, data_dir
+from .pipeline import BoundedQueue, LivePipeline, PipelineState
+from .prompt_context import AssembledContext, ContextAssembler, simhash
+from .resample import PolyphaseResampler
+from .retrieval import RetrievalContext
+from .session import LiveSession
+from .streaming import StreamingTranscriber
+from .tokens import count_tokens, count_tokens_many
+from .transcript import TranscriptWindow
+from .transcript_store import TranscriptStore
+from .trigger import QuestionTrigger, TriggerDecision, lexical_sketch
+from .vad import VadConfig, VoiceActivityDetector
+from .vector_store import LocalVectorStore, Match, PineconeStore, QueryResponse, VectorStore
+from .vector_writer import VectorWriter, vector_id
+
+__all__ = [
+    'ASRBackend', 'FasterWhisperBackend', 'Segment', 'WhisperBackend', 'Word',
+    'load_backend', 'segments_text',
+    'RemoteBackend', 'TranscriptionServer', 'connect_or_spawn',
+    'decode_audio', 'format_timestamp', 'split_on_silence', 'transcribe_file',
+    'AudioCapture', 'AudioCursor', 'AudioRingBuffer',
+    'Chunk', 'TokenChunker',
+    'DECODE_PROFILES', 'LANGUAGES', 'LanguageLock', 'decode_options',
+    'EmbeddingCache',
+    'EMBEDDING_MODEL', 'EmbeddingService',
+    'HybridRanker', 'reciprocal_rank_fusion',
+    'IngestionRegistry', 'content_digest',
+    'AudioJournal', 'list_sessions', 'new_session_id', 'open_journal', 'session_dir',
+    'LexicalIndex', 'query_terms',
+    'METRICS', 'LatencyHistogram', 'LatencyRecorder',
+    'MODEL_SIZES', 'AdaptiveModelController', 'ModelCache',
+    'DATA_DIR', 'data_dir',
+    'BoundedQueue', 'LivePipeline', 'PipelineState',
+    'AssembledContext', 'ContextAssembler', 'simhash',
+    'PolyphaseResampler',
+    'RetrievalContext',
+    'LiveSession',
+    'StreamingTranscriber',
+    'count_tokens', 'count_tokens_many', 'TranscriptWindow', 'TranscriptStore',
+    'QuestionTrigger', 'TriggerDecision', 'lexical_sketch',
+    'VadConfig', 'VoiceActivityDetector',
+    'LocalVectorStore', 'Match', 'PineconeStore', 'QueryResponse', 'VectorStore',
+    'VectorWriter', 'vector_id',
+]
@@ -0,0 +1,178 @@
+"""
+Pluggable speech-recognition backends behind one transcribe(audio) -> segments contract
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+
+@dataclass
+class Word:
+    start: float
+    end: float
+    word: str
+    probability: float = None
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+    words: List[Word] = field(default_factory=list)
+
+
+class ASRBackend:
+    """Base class for speech-recognition engines.
+
+    Subclasses implement ``_transcribe``; the base class times every call so
+    real-time factor (decode time / audio time) can be compared per backend.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.audio_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.calls = 0
+        self.last_rtf = None
+        self._stats_lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model_name}"
+
+    @property
+    def real_time_factor(self):
+        """Cumulative decode time divided by audio time (below 1.0 keeps up with live audio)"""
+        if not self.audio_seconds:
+            return None
+        return self.decode_seconds / self.audio_seconds
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int = 16000, **options) -> List[Segment]:
+        """Transcribe 16 kHz mono float32 audio into timed segments"""
+        started = time.perf_counter()
+        segments = self._transcribe(np.asarray(audio, dtype=np.float32), **options)
+        elapsed = time.perf_counter() - started
+        duration = len(audio) / sample_rate
+        with self._stats_lock:
+            self.calls += 1
+            self.audio_seconds += duration
+            self.decode_seconds += elapsed
+            self.last_rtf = elapsed / duration if duration else None
+        return segments
+
+    def _transcribe(self, audio: np.ndarray, **options) -> List[Segment]:
+        raise NotImplementedError
+
+    def detect_language(self, audio: np.ndarray, sample_rate: int = 16000) -> tuple:
+        """Most likely spoken language code and its probability"""
+        raise NotImplementedError
+
+    def warm(self):
+        """Make sure the model is loaded; local backends load in ``__init__``"""
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "backend": self.label,
+                "calls": self.calls,
+                "audio_seconds": round(self.audio_seconds, 1),
+                "decode_seconds": round(self.decode_seconds, 1),
+                "real_time_factor": self.real_time_factor,
+                "last_rtf": self.last_rtf,
+            }
+
+
+class WhisperBackend(ASRBackend):
+    """Reference openai-whisper engine (PyTorch, fp32 on CPU)"""
+
+    name = "whisper"
+
+    def __init__(self, model_name: str = "base", device: str = None):
+        super().__init__(model_name)
+        import whisper
+
+        self.model = whisper.load_model(model_name, device=device)
+
+    def detect_language(self, audio, sample_rate=16000):
+        import whisper
+
+        audio = whisper.pad_or_trim(np.asarray(audio, dtype=np.float32))
+        mel = whisper.log_mel_spectrogram(audio, n_mels=self.model.dims.n_mels).to(self.model.device)
+        _, probs = self.model.detect_language(mel)
+        language = max(probs, key=probs.get)
+        return language, probs[language]
+
+    def _transcribe(self, audio, **options):
+        options.setdefault("fp16", False)
+        # openai-whisper spells greedy decoding as beam_size=None and rejects best_of without sampling
+        if options.get("beam_size") == 1:
+            del options["beam_size"]
+        if options.get("temperature") == 0:
+            options.pop("best_of", None)
+        result = self.model.transcribe(audio, **options)
+        return [
+            Segment(
+                start=s["start"],
+                end=s["end"],
+                text=s["text"].strip(),
+                words=[Word(w["start"], w["end"], w["word"], w.get("probability"))
+                       for w in s.get("words", [])],
+            )
+            for s in result["segments"]
+        ]
+
+
+class FasterWhisperBackend(ASRBackend):
+    """CTranslate2 engine via faster-whisper, int8-quantized for CPU-only machines"""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str = "base", compute_type: str = "int8", cpu_threads: int = 0):
+        super().__init__(model_name)
+        from faster_whisper import WhisperModel
+
+        self.compute_type = compute_type
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def detect_language(self, audio, sample_rate=16000):
+        # Detection runs eagerly inside transcribe(); the segment generator is never consumed
+        _segments, info = self.model.transcribe(np.asarray(audio, dtype=np.float32))
+        return info.language, info.language_probability
+
+    def _transcribe(self, audio, **options):
+        options.pop("fp16", None)
+        segments, _info = self.model.transcribe(audio, **options)
+        return [
+            Segment(
+                start=s.start,
+                end=s.end,
+                text=s.text.strip(),
+                words=[Word(w.start, w.end, w.word, w.probability) for w in (s.words or [])],
+            )
+            for s in segments
+        ]
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_backend(name: str = None, model_name: str = "base", **kwargs) -> ASRBackend:
+    """Instantiate a backend by name (defaults to the ASR_BACKEND environment variable)"""
+    name = name or os.getenv("ASR_BACKEND", WhisperBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name, **kwargs)
+
+
+def segments_text(segments: List[Segment]) -> str:
+    return " ".join(s.text for s in segments if s.text).strip()
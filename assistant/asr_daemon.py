@@ -0,0 +1,413 @@
+"""
+Shared local transcription daemon on a Unix domain socket
+
+One long-lived process keeps the ASR model warm and serves PCM frames from
+every desktop app, so running the three assistants side by side loads the
+weights once. Requests are scheduled round-robin across connected clients.
+
+Run it directly with ``python -m assistant.asr_daemon`` or let
+:func:`connect_or_spawn` start it on first use. Bundled (PyInstaller) apps
+can connect to a running daemon but cannot start one, since they have no
+Python interpreter to run the module with.
+
+The socket is bound owner-only (mode 0600) inside an owner-only per-user
+directory, clients refuse a socket owned by another user, and requests may
+only name models in :data:`MODEL_NAMES` and decoding options in
+:data:`DECODE_OPTION_KEYS`.
+"""
+import argparse
+import fcntl
+import json
+import os
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+
+import numpy as np
+
+from .asr import ASRBackend, Segment, Word, load_backend
+from .model_controller import ModelCache
+
+DEFAULT_SOCKET = os.getenv("ASR_DAEMON_SOCKET",
+                           os.path.join(tempfile.gettempdir(), f"audio_assistant-{os.getuid()}", "asr.sock"))
+
+# Model names a client may ask for; engines also accept paths and hub ids, which a client must not pick
+MODEL_NAMES = frozenset({
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+    "large", "large-v1", "large-v2", "large-v3", "turbo", "distil-large-v3",
+})
+
+# Decoding options a client may set; anything else in a request is rejected
+DECODE_OPTION_KEYS = frozenset({
+    "language", "task", "beam_size", "best_of", "patience", "length_penalty", "temperature",
+    "compression_ratio_threshold", "logprob_threshold", "log_prob_threshold", "no_speech_threshold",
+    "condition_on_previous_text", "initial_prompt", "word_timestamps", "suppress_blank", "without_timestamps",
+})
+
+_HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b""):
+    """Frame: 4-byte header length, JSON header, raw payload of ``header['bytes']`` bytes"""
+    header = dict(header, bytes=len(payload))
+    encoded = json.dumps(header).encode()
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded + payload)
+
+
+def check_options(options: dict) -> dict:
+    """Decoding options from a request header, refusing keys outside :data:`DECODE_OPTION_KEYS`"""
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object")
+    unknown = sorted(set(options) - DECODE_OPTION_KEYS)
+    if unknown:
+        raise ValueError(f"unsupported decoding options: {', '.join(unknown)}")
+    return options
+
+
+def check_model(model_name):
+    """Model name from a request header (None for the default), refusing names outside :data:`MODEL_NAMES`"""
+    if model_name is not None and model_name not in MODEL_NAMES:
+        raise ValueError(f"unsupported model: {model_name}")
+    return model_name
+
+
+def check_owner(socket_path: str):
+    """Refuse a socket created by another user; it could be anyone's process listening for our audio"""
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} is owned by another user")
+
+
+def _socket_dir(socket_path: str) -> str:
+    """Create the socket's directory owner-only; refuse one another user could swap the socket in"""
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() and not info.st_mode & stat.S_ISVTX:
+        raise PermissionError(f"{directory} is owned by another user")
+    return directory
+
+
+def recv_message(sock: socket.socket):
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, length))
+    payload = _recv_exact(sock, header["bytes"]) if header.get("bytes") else b""
+    return header, payload
+
+
+class FairScheduler:
+    """Round-robin job queue: each client gets one job served per turn"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._order = deque()
+        self._cond = threading.Condition()
+
+    def put(self, client_id, job):
+        with self._cond:
+            if client_id not in self._jobs:
+                self._jobs[client_id] = deque()
+                self._order.append(client_id)
+            self._jobs[client_id].append(job)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Next job in client rotation, or None on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._order, timeout):
+                return None
+            client_id = self._order.popleft()
+            jobs = self._jobs[client_id]
+            job = jobs.popleft()
+            if jobs:
+                self._order.append(client_id)
+            else:
+                del self._jobs[client_id]
+            return job
+
+    def drop_client(self, client_id):
+        with self._cond:
+            if self._jobs.pop(client_id, None) is not None:
+                self._order.remove(client_id)
+
+    def pending(self) -> dict:
+        with self._cond:
+            return {client: len(jobs) for client, jobs in self._jobs.items()}
+
+
+class TranscriptionServer:
+    """Serves transcription requests from any number of local clients"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, backend: str = None, model_name: str = "base",
+                 workers: int = 1, max_models: int = 3):
+        self.socket_path = socket_path
+        self.default_backend = backend or os.getenv("ASR_BACKEND", "whisper")
+        self.default_model = model_name
+        self.workers = workers
+        self.scheduler = FairScheduler()
+        self._backends = ModelCache(lambda key: load_backend(*key), max_models)
+        self._stop = threading.Event()
+        self._sock = None
+        self._next_client = 0
+
+    def backend(self, name: str = None, model_name: str = None) -> ASRBackend:
+        """Warm backend for (engine, model), loading it on first use"""
+        return self._backends.get((name or self.default_backend, model_name or self.default_model))
+
+    def _bind(self):
+        """Listen on the socket, or return None if another daemon holds it.
+
+        The lock file decides which of two racing daemons owns the socket,
+        so a stale socket file can be replaced without probing it. The
+        umask makes the socket owner-only from the moment it exists.
+        """
+        _socket_dir(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            lock = os.open(self.socket_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(lock)
+                return None
+            if os.path.lexists(self.socket_path):
+                os.unlink(self.socket_path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        sock.listen()
+        return sock, lock
+
+    def serve_forever(self):
+        bound = self._bind()
+        if bound is None:
+            print(f"Transcription daemon already running on {self.socket_path}")
+            return
+        self._sock, lock = bound
+        try:
+            # Loaded after binding, so a daemon that lost the race never loads a model; clients that
+            # connect meanwhile wait in the listen backlog until the default model is warm
+            self.backend()
+            self._sock.settimeout(0.5)
+            for _ in range(self.workers):
+                threading.Thread(target=self._work_loop, daemon=True).start()
+            print(f"Transcription daemon ready on {self.socket_path} ({self.backend().label})")
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                self._next_client += 1
+                threading.Thread(target=self._client_loop, args=(conn, self._next_client), daemon=True).start()
+        finally:
+            self._sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            os.close(lock)
+
+    def stop(self):
+        self._stop.set()
+
+    def _client_loop(self, conn: socket.socket, client_id: int):
+        send_lock = threading.Lock()
+        try:
+            while not self._stop.is_set():
+                header, payload = recv_message(conn)
+                if header.get("op") == "ping":
+                    with send_lock:
+                        send_message(conn, {"id": header.get("id"), "ok": True, "pending": self.scheduler.pending(),
+                                            "models": [f"{b}:{m}" for b, m in self._backends.keys()]})
+                    continue
+                if header.get("op") == "load":
+                    reply = {"id": header.get("id")}
+                    try:
+                        reply["backend"] = self.backend(header.get("backend"), check_model(header.get("model"))).label
+                    except Exception as e:
+                        reply["error"] = str(e)
+                    with send_lock:
+                        send_message(conn, reply)
+                    continue
+                audio = np.frombuffer(payload, dtype=np.float32)
+                self.scheduler.put(client_id, (conn, send_lock, header, audio))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.scheduler.drop_client(client_id)
+            conn.close()
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            job = self.scheduler.get(timeout=0.5)
+            if job is None:
+                continue
+            conn, send_lock, header, audio = job
+            reply = {"id": header.get("id")}
+            try:
+                backend = self.backend(header.get("backend"), check_model(header.get("model")))
+                if header.get("op") == "detect":
+                    reply["language"], reply["probability"] = backend.detect_language(
+                        audio, header.get("sample_rate", 16000)
+                    )
+                else:
+                    segments = backend.transcribe(audio, header.get("sample_rate", 16000),
+                                                  **check_options(header.get("options", {})))
+                    reply["segments"] = [asdict(s) for s in segments]
+                reply["backend"] = backend.label
+            except Exception as e:
+                reply["error"] = str(e)
+            try:
+                with send_lock:
+                    send_message(conn, reply)
+            except OSError:
+                pass
+
+
+class RemoteBackend(ASRBackend):
+    """Client side of the daemon; behaves like any other :class:`ASRBackend`"""
+
+    name = "daemon"
+
+    def __init__(self, model_name: str = None, backend: str = None, socket_path: str = DEFAULT_SOCKET,
+                 timeout: float = 120.0):
+        super().__init__(model_name or "default")
+        self.backend_name = backend
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.remote_label = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._request_id = 0
+
+    @property
+    def label(self) -> str:
+        return f"daemon:{self.remote_label or self.model_name}"
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            check_owner(self.socket_path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._sock = sock
+        return self._sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _request(self, header: dict, payload: bytes = b"") -> dict:
+        with self._lock:
+            self._request_id += 1
+            header = dict(header, id=self._request_id)
+            try:
+                sock = self._connect()
+                send_message(sock, header, payload)
+                reply, _ = recv_message(sock)
+            except (ConnectionError, OSError):
+                if self._sock is not None:
+                    self._sock.close()
+                self._sock = None
+                raise
+        if "error" in reply:
+            raise RuntimeError(f"transcription daemon: {reply['error']}")
+        return reply
+
+    def ping(self) -> dict:
+        return self._request({"op": "ping"})
+
+    def warm(self):
+        """Ask the daemon to load this model now instead of on the first request"""
+        reply = self._request({"op": "load", "backend": self.backend_name,
+                               "model": None if self.model_name == "default" else self.model_name})
+        self.remote_label = reply.get("backend")
+
+    def detect_language(self, audio, sample_rate=16000):
+        header = {"op": "detect", "sample_rate": sample_rate, "backend": self.backend_name,
+                  "model": None if self.model_name == "default" else self.model_name}
+        reply = self._request(header, np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        return reply["language"], reply["probability"]
+
+    def _transcribe(self, audio, **options):
+        options.pop("fp16", None)
+        header = {"op": "transcribe", "options": options, "backend": self.backend_name,
+                  "model": None if self.model_name == "default" else self.model_name}
+        reply = self._request(header, np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        self.remote_label = reply.get("backend")
+        return [
+            Segment(s["start"], s["end"], s["text"], [Word(**w) for w in s["words"]])
+            for s in reply["segments"]
+        ]
+
+
+def connect_or_spawn(backend: str = None, model_name: str = "base", socket_path: str = DEFAULT_SOCKET,
+                     startup_timeout: float = 300.0) -> RemoteBackend:
+    """Connect to the running daemon, starting it in the background if needed"""
+    remote = RemoteBackend(model_name, backend, socket_path)
+    if os.path.lexists(socket_path):
+        # A socket another user planted is an error, not a reason to start a daemon of our own
+        check_owner(socket_path)
+        try:
+            remote.ping()
+            return remote
+        except OSError:
+            # Stale socket of a daemon that died; the new one replaces it
+            pass
+
+    if getattr(sys, "frozen", False):
+        raise RuntimeError("cannot start the transcription daemon from a bundled app")
+
+    cmd = [sys.executable, "-m", "assistant.asr_daemon", "--socket", socket_path, "--model", model_name]
+    if backend:
+        cmd += ["--backend", backend]
+    log_path = os.path.join(_socket_dir(socket_path), "asr-daemon.log")
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        try:
+            remote.ping()
+            return remote
+        except PermissionError:
+            raise
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"transcription daemon did not start; see {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Whisper transcription daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix domain socket path")
+    parser.add_argument("--backend", default=None, help="ASR engine (whisper or faster-whisper)")
+    parser.add_argument("--model", default="base", help="Default model size to keep warm")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent decode workers")
+    parser.add_argument("--max-models", type=int, default=3, help="Loaded models kept in the LRU cache")
+    args = parser.parse_args()
+    TranscriptionServer(args.socket, args.backend, args.model, args.workers, args.max_models).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
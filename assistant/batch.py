@@ -0,0 +1,145 @@
+"""
+Chunked parallel transcription of uploaded audio files
+
+The file is stream-decoded by ffmpeg into 16 kHz PCM, cut into segments at
+silences, and the segments are transcribed in a process pool. Only a
+bounded number of segments is in flight at any time, so memory stays flat
+no matter how long the recording is. Results are stitched back in order
+with absolute timestamps.
+
+Each worker process loads its own copy of the model, so the pool is capped
+at :data:`MAX_WORKERS` (``TRANSCRIBE_WORKERS``, default 4) unless
+``workers`` is given, and each worker decodes on a single thread. Thread
+limits are set inside the workers only; the calling process (the Streamlit
+app, with its live model) is left alone.
+"""
+import os
+import subprocess
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator
+
+import numpy as np
+
+from .asr import Segment, load_backend
+from .vad import VadConfig, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+MAX_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "4"))  # worker processes, each holding a model copy
+
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, block_seconds: float = 10.0) -> Iterator[np.ndarray]:
+    """Yield float32 mono blocks decoded by ffmpeg without loading the whole file"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "-",
+    ]
+    block_bytes = int(block_seconds * sample_rate) * 2
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {process.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def split_on_silence(blocks: Iterator[np.ndarray], min_seconds: float = 10.0, max_seconds: float = 30.0,
+                     vad: VoiceActivityDetector = None, sample_rate: int = SAMPLE_RATE):
+    """Group decoded blocks into (start_seconds, audio) segments cut at pauses.
+
+    Whenever ``max_seconds`` of audio (one Whisper window) has accumulated, it
+    is cut in the middle of the longest silent run after ``min_seconds``.
+    Segments with no speech at all are dropped.
+    """
+    vad = vad or VoiceActivityDetector(VadConfig(sample_rate=sample_rate))
+    frame = vad.frame
+    lo = int(min_seconds * sample_rate) // frame
+    hi = int(max_seconds * sample_rate) // frame
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0
+
+    def cut_point(audio):
+        silent = ~vad.speech_mask(audio[:hi * frame])[lo:hi]
+        if not silent.any():
+            return hi * frame
+        # Longest silent run, found from run-length boundaries
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], silent.astype(np.int8), [0]])))
+        starts, ends = edges[::2], edges[1::2]
+        best = np.argmax(ends - starts)
+        return (lo + (starts[best] + ends[best]) // 2) * frame
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= hi * frame:
+            cut = cut_point(buffer)
+            segment, buffer = buffer[:cut], buffer[cut:]
+            if vad.speech_mask(segment).any():
+                yield offset / sample_rate, segment
+            offset += cut
+    if len(buffer) and vad.speech_mask(buffer).any():
+        yield offset / sample_rate, buffer
+
+
+_worker_backend = None
+
+
+def _init_worker(backend_name, model_name):
+    global _worker_backend
+    # One decoder thread per worker process, set before the engine is imported; the pool provides
+    # the parallelism
+    os.environ["OMP_NUM_THREADS"] = "1"
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker_backend = load_backend(backend_name, model_name)
+
+
+def _transcribe_segment(index, start, audio, options):
+    segments = _worker_backend.transcribe(audio, **options)
+    return index, [Segment(start + s.start, start + s.end, s.text) for s in segments]
+
+
+def transcribe_file(path: str, backend: str = None, model_name: str = "base", workers: int = None,
+                    **options) -> Iterator[Segment]:
+    """Transcribe an audio file in parallel, yielding timestamped segments in order"""
+    workers = workers or max(1, min(MAX_WORKERS, (os.cpu_count() or 2) - 1))
+    context = multiprocessing.get_context("spawn")
+    max_in_flight = workers * 2
+    results = {}
+    next_index = 0
+
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(backend, model_name)) as pool:
+        pending = set()
+        segments = split_on_silence(decode_audio(path))
+        for index, (start, audio) in enumerate(segments):
+            pending.add(pool.submit(_transcribe_segment, index, start, audio, options))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, result = future.result()
+                    results[i] = result
+                while next_index in results:
+                    yield from results.pop(next_index)
+                    next_index += 1
+        for future in pending:
+            i, result = future.result()
+            results[i] = result
+        while next_index in results:
+            yield from results.pop(next_index)
+            next_index += 1
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
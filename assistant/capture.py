@@ -0,0 +1,238 @@
+"""
+Gapless microphone capture for the desktop assistants
+"""
+import threading
+import time
+
+import numpy as np
+
+from .resample import PolyphaseResampler, downmix
+
+
+class AudioRingBuffer:
+    """Preallocated float32 ring buffer written by the capture callback.
+
+    Every sample is stored twice (at ``i`` and ``i + capacity``) so any window
+    of up to ``capacity`` samples is a contiguous slice and can be handed out
+    as a view instead of a copy.
+    """
+
+    def __init__(self, capacity: int, sample_rate: int = 16000):
+        self.capacity = int(capacity)
+        self.sample_rate = sample_rate
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._written = 0
+        self._cond = threading.Condition()
+
+    @property
+    def written(self) -> int:
+        """Total number of samples written since the buffer was created"""
+        return self._written
+
+    def write(self, samples: np.ndarray):
+        """Append samples; the oldest audio is overwritten once the buffer is full"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self.capacity
+        with self._cond:
+            if n > cap:
+                self._written += n - cap
+                samples = samples[-cap:]
+                n = cap
+            start = self._written % cap
+            first = min(n, cap - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[start + cap:start + cap + first] = samples[:first]
+            rest = n - first
+            if rest:
+                self._data[:rest] = samples[first:]
+                self._data[cap:cap + rest] = samples[first:]
+            self._written += n
+            self._cond.notify_all()
+
+    def view(self, start: int, length: int) -> np.ndarray:
+        """Zero-copy view of ``length`` samples starting at absolute sample ``start``"""
+        if length > self.capacity:
+            raise ValueError("window is larger than the ring buffer")
+        offset = start % self.capacity
+        return self._data[offset:offset + length]
+
+    def latest(self, length: int) -> np.ndarray:
+        """Zero-copy view of the most recent ``length`` samples"""
+        with self._cond:
+            length = min(length, self._written, self.capacity)
+            return self.view(self._written - length, length)
+
+    def wait_for(self, position: int, timeout: float = None) -> bool:
+        """Block until at least ``position`` samples have been written"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._written >= position, timeout)
+
+    def reader(self) -> "AudioCursor":
+        """Create a consumer cursor positioned at the current write head"""
+        return AudioCursor(self)
+
+
+class AudioCursor:
+    """Independent read position into an :class:`AudioRingBuffer`.
+
+    Each consumer owns its cursor, so a slow consumer never blocks the
+    capture callback; if it falls more than a buffer behind it skips ahead
+    and the lost samples are counted in ``dropped``.
+    """
+
+    def __init__(self, ring: AudioRingBuffer):
+        self.ring = ring
+        self.position = ring.written
+        self.dropped = 0
+
+    @property
+    def available(self) -> int:
+        """Samples written but not yet consumed by this cursor"""
+        return self.ring.written - self.position
+
+    def _catch_up(self):
+        lag = self.ring.written - self.position
+        if lag > self.ring.capacity:
+            self.dropped += lag - self.ring.capacity
+            self.position = self.ring.written - self.ring.capacity
+
+    def read(self, length: int, step: int = None, timeout: float = None):
+        """Return a fixed-size window as a view, or None on timeout.
+
+        ``step`` controls how far the cursor advances (defaults to ``length``);
+        a smaller step yields overlapping windows.
+        """
+        if not self.ring.wait_for(self.position + length, timeout):
+            return None
+        self._catch_up()
+        window = self.ring.view(self.position, length)
+        self.position += length if step is None else step
+        return window
+
+    def read_available(self, max_length: int = None, min_length: int = 1, timeout: float = None):
+        """Return everything captured since the last read (variable size), or None"""
+        if not self.ring.wait_for(self.position + min_length, timeout):
+            return None
+        self._catch_up()
+        length = self.available
+        if max_length is not None:
+            length = min(length, max_length)
+        window = self.ring.view(self.position, length)
+        self.position += length
+        return window
+
+
+class AudioCapture:
+    """Microphone capture driven by a ``sounddevice.InputStream`` callback.
+
+    The callback only copies incoming blocks into the ring buffer, so capture
+    keeps running regardless of how slow transcription or the LLM calls are.
+    Consumers that share one capture take a cursor with :meth:`open_reader`
+    and hand it back with :meth:`release`; the stream is closed when the
+    last one is released, so one consumer stopping never cuts off another.
+
+    The device is opened at its native rate and channel count unless
+    ``device_rate``/``channels`` are given; blocks are downmixed and
+    resampled to ``sample_rate`` in the callback, so the host API never has
+    to convert.
+    """
+
+    def __init__(self, sample_rate: int = 16000, channels: int = None, buffer_seconds: float = 120,
+                 device=None, blocksize: int = 0, device_rate: int = None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.blocksize = blocksize
+        self.device_rate = device_rate
+        self.resampler = None
+        self.stream_format = None
+        self.buffer = AudioRingBuffer(int(buffer_seconds * sample_rate), sample_rate)
+        self.status_errors = 0
+        self.started_at = None
+        self._stream = None
+        self._readers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._stream is not None and self._stream.active
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.status_errors += 1
+        if self.resampler is None:
+            self.buffer.write(downmix(indata))
+        else:
+            self.buffer.write(self.resampler.process(indata))
+
+    def start(self):
+        """Open the input stream; calling it on a running capture is a no-op"""
+        with self._lock:
+            self._open()
+        return self
+
+    def _open(self):
+        import sounddevice as sd
+
+        if self.running:
+            return
+        info = sd.query_devices(self.device, "input")
+        device_rate = int(self.device_rate or info["default_samplerate"])
+        channels = self.channels or max(1, int(info["max_input_channels"]))
+        self.resampler = None
+        if device_rate != self.sample_rate:
+            self.resampler = PolyphaseResampler(device_rate, self.sample_rate)
+        self.stream_format = f"{device_rate} Hz x{channels}"
+        self._stream = sd.InputStream(
+            samplerate=device_rate,
+            channels=channels,
+            dtype="float32",
+            device=self.device,
+            blocksize=self.blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+        self.started_at = time.time()
+
+    def stop(self):
+        """Stop and close the input stream, whoever is still reading"""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def reader(self) -> AudioCursor:
+        """Create a new consumer cursor at the current write head"""
+        return self.buffer.reader()
+
+    def open_reader(self) -> AudioCursor:
+        """Start the stream if needed and return a cursor that keeps it open until :meth:`release`"""
+        with self._lock:
+            self._open()
+            cursor = self.buffer.reader()
+            self._readers.add(cursor)
+        return cursor
+
+    def release(self, cursor: AudioCursor):
+        """Hand back a cursor from :meth:`open_reader`; the stream closes with the last one"""
+        with self._lock:
+            self._readers.discard(cursor)
+            if not self._readers:
+                self._close()
+
+    @property
+    def readers(self) -> int:
+        return len(self._readers)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,182 @@
+"""
+Token-bounded, overlapping text chunking for embedding
+
+Text is cut into pieces at structural breaks (PDF pages joined with ``\\f``,
+blank-line paragraphs, sentence ends, line breaks), each piece is counted
+with the embedding model's tokenizer in one batch, and consecutive pieces
+are packed into chunks of at most ``max_tokens``. A chunk ends at the
+strongest break available in its second half, so ideas are rarely cut in
+the middle, and a chunk that had to end inside a paragraph repeats up to
+``overlap_tokens`` of its tail at the start of the next one. Every chunk
+keeps its character offsets into the source text.
+"""
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .tokens import DEFAULT_ENCODING, count_tokens_many
+
+# Break strength after a piece; a chunk prefers to end at the strongest one
+WORD, LINE, SENTENCE, PARAGRAPH, PAGE = range(-1, 4)
+
+_BREAKS = re.compile(
+    r"(?P<page>\s*\f\s*)"
+    r"|(?P<paragraph>[ \t]*\n[ \t]*\n\s*)"
+    r"|(?<=[.!?])(?P<sentence>\s+)"
+    r"|(?<=[.!?][\"'”’)\]])(?P<quoted>\s+)"
+    r"|(?P<line>[ \t]*\n\s*)"
+)
+_LEVELS = {"page": PAGE, "paragraph": PARAGRAPH, "sentence": SENTENCE, "quoted": SENTENCE, "line": LINE}
+_WORDS = re.compile(r"\S+\s*")
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int  # character offsets into the chunked text
+    end: int
+    tokens: int
+
+
+class TokenChunker:
+    """Packs structural pieces of a text into overlapping token-bounded chunks.
+
+    ``min_tokens`` (half of ``max_tokens`` by default) is how full a chunk
+    must be before a weaker break may end it early in favour of a stronger
+    one. A single sentence longer than ``max_tokens`` is split between
+    words. Token counts are per piece, including the whitespace that
+    follows it; with tiktoken their sum is within a token or so of the
+    chunk's real count, while without it they are the ~4 characters per
+    token estimate of :func:`~assistant.tokens.count_tokens`, which can be
+    off either way. Whitespace-only text yields no chunks.
+    """
+
+    def __init__(self, max_tokens: int = 500, overlap_tokens: int = 50, min_tokens: int = None,
+                 encoding: str = DEFAULT_ENCODING):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = max_tokens // 2 if min_tokens is None else min_tokens
+        self.encoding = encoding
+
+    def pieces(self, text: str) -> List[Tuple[int, int, int, int]]:
+        """``(start, end, next_start, break level)`` of each piece; ``end`` excludes the separator.
+
+        Whitespace-only pieces are skipped so a blank chunk is never embedded.
+        """
+        pieces = []
+        start = 0
+        for match in _BREAKS.finditer(text):
+            if text[start:match.start()].strip():
+                pieces.append((start, match.start(), match.end(), _LEVELS[match.lastgroup]))
+            start = match.end()
+        if text[start:].strip():
+            pieces.append((start, len(text), len(text), PAGE))
+        return pieces
+
+    def _bounded(self, text: str, pieces, counts):
+        """Split pieces over ``max_tokens`` into runs of words, sized by their share of the characters"""
+        bounded, bounded_counts = [], []
+        for piece, count in zip(pieces, counts):
+            if count <= self.max_tokens:
+                bounded.append(piece)
+                bounded_counts.append(count)
+                continue
+            start, end, next_start, level = piece
+            # Word runs small enough to pack tightly and to serve as overlap
+            piece_tokens = min(max(self.overlap_tokens // 2, 16), self.max_tokens // 2)
+            target = max((end - start) * piece_tokens // count, 1)
+            cuts = []
+            for word in _WORDS.finditer(text, start, end):
+                if word.start() - (cuts[-1] if cuts else start) >= target:
+                    cuts.append(word.start())
+            if not cuts:
+                # One enormous "word" (e.g. a base64 blob): cut by characters
+                cuts = list(range(start + target, end, target))
+            edges = [start] + cuts
+            split = []
+            for i, edge in enumerate(edges[:-1]):
+                split.append((edge, edge + len(text[edge:edges[i + 1]].rstrip()), edges[i + 1], WORD))
+            split.append((edges[-1], end, next_start, level))
+            split_counts = count_tokens_many([text[s:n] for s, _, n, _ in split], self.encoding)
+            if max(split_counts) > self.max_tokens:
+                split, split_counts = self._bounded(text, split, split_counts)
+            bounded.extend(split)
+            bounded_counts.extend(split_counts)
+        return bounded, bounded_counts
+
+    def split(self, text: str) -> List[Chunk]:
+        pieces = self.pieces(text)
+        if not pieces:
+            return []
+        counts = count_tokens_many([text[start:next_start] for start, _, next_start, _ in pieces], self.encoding)
+        if max(counts) > self.max_tokens:
+            pieces, counts = self._bounded(text, pieces, counts)
+        prefix = [0]
+        for count in counts:
+            prefix.append(prefix[-1] + count)
+
+        chunks = []
+        first = 0
+        while first < len(pieces):
+            # Furthest piece that still fits
+            last = first
+            while last + 1 < len(pieces) and prefix[last + 2] - prefix[first] <= self.max_tokens:
+                last += 1
+            # Walk back to the strongest break among the ends that leave the chunk at least min_tokens full
+            if last + 1 < len(pieces):
+                best = last
+                for candidate in range(last - 1, first - 1, -1):
+                    if prefix[candidate + 1] - prefix[first] < self.min_tokens:
+                        break
+                    if pieces[candidate][3] > pieces[best][3]:
+                        best = candidate
+                last = best
+            start, end = pieces[first][0], pieces[last][1]
+            chunks.append(Chunk(text[start:end], start, end, prefix[last + 1] - prefix[first]))
+            if last + 1 >= len(pieces):
+                break
+            following = last + 1
+            # Carry context over a break inside a paragraph, never across paragraphs or pages
+            if self.overlap_tokens and pieces[last][3] < PARAGRAPH:
+                while (following - 1 > first
+                       and prefix[last + 1] - prefix[following - 1] <= self.overlap_tokens):
+                    following -= 1
+            first = following
+        return chunks
+
+
+def benchmark(pages: int = 500, words_per_page: int = 450, max_tokens: int = 500) -> dict:
+    """Chunk a synthetic PDF-like document of ``pages`` pages"""
+    sentence = "The quarterly roadmap covers ingestion, retrieval and latency work for the assistant."
+    paragraph = " ".join([sentence] * 6)
+    page = "\n\n".join([paragraph] * max(words_per_page // (6 * len(sentence.split())), 1))
+    text = "\f".join([page] * pages)
+    chunker = TokenChunker(max_tokens)
+    started = time.perf_counter()
+    chunks = chunker.split(text)
+    elapsed = time.perf_counter() - started
+    return {
+        "pages": pages,
+        "characters": len(text),
+        "chunks": len(chunks),
+        "max_chunk_tokens": max(chunk.tokens for chunk in chunks),
+        "seconds": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chunking throughput on a synthetic document")
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the synthetic document")
+    parser.add_argument("--max-tokens", type=int, default=500, help="Token budget per chunk")
+    args = parser.parse_args()
+    result = benchmark(args.pages, max_tokens=args.max_tokens)
+    print(f"{result['pages']} pages ({result['characters']} chars) -> {result['chunks']} chunks of at most "
+          f"{result['max_chunk_tokens']} tokens in {result['seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Named decoding profiles and a session-level language lock
+
+Whisper detects the spoken language on every call unless ``language`` is
+given, which costs an extra encoder/decoder pass per chunk and can flip
+the language mid-session. :class:`LanguageLock` detects it once over the
+first seconds of speech and pins it for the rest of the session.
+
+Run ``python -m assistant.decoding recording.wav`` to measure the
+throughput of each profile with and without a locked language.
+"""
+import argparse
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .asr import ASRBackend, load_backend
+
+logger = logging.getLogger(__name__)
+
+DECODE_PROFILES = {
+    # Greedy, single pass, no temperature fallback: predictable latency for live audio
+    "live": {"beam_size": 1, "best_of": 1, "temperature": 0.0},
+    # Beam search with temperature fallback and cross-window context, for finished recordings
+    "accurate": {"beam_size": 5, "best_of": 5, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                 "condition_on_previous_text": True},
+}
+
+# Languages offered for the manual override; Whisper accepts any of its ~100 codes
+LANGUAGES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German", "it": "Italian",
+    "pt": "Portuguese", "nl": "Dutch", "pl": "Polish", "sv": "Swedish", "tr": "Turkish",
+    "ru": "Russian", "uk": "Ukrainian", "ar": "Arabic", "hi": "Hindi", "ja": "Japanese",
+    "ko": "Korean", "zh": "Chinese",
+}
+
+
+def decode_options(profile: str = "live", **overrides) -> dict:
+    """Options for ``backend.transcribe`` from a named profile, with overrides applied"""
+    if profile not in DECODE_PROFILES:
+        raise ValueError(f"Unknown decode profile '{profile}'. Choose one of: {', '.join(DECODE_PROFILES)}")
+    options = dict(DECODE_PROFILES[profile])
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return options
+
+
+class LanguageLock:
+    """Detects the session language once, then pins it for every decode.
+
+    Speech is accumulated until ``detect_seconds`` are available, so the
+    detection sees a real utterance rather than a one-second fragment.
+    A manual choice from the UI takes precedence and locks immediately.
+    """
+
+    def __init__(self, backend: ASRBackend, detect_seconds: float = 8.0, sample_rate: int = 16000,
+                 language: str = None):
+        self.backend = backend
+        self.detect_seconds = detect_seconds
+        self.sample_rate = sample_rate
+        self.language = None
+        self.probability = None
+        self.source = None
+        self._speech = []
+        self._lock = threading.Lock()
+        self.set(language)
+
+    @property
+    def locked(self) -> bool:
+        return self.language is not None
+
+    def set(self, language: str = None):
+        """Apply a manual override; ``None`` goes back to automatic detection"""
+        with self._lock:
+            if language:
+                self.language, self.probability, self.source = language, None, "manual"
+            elif self.source == "manual":
+                self.language = self.probability = self.source = None
+                self._speech = []
+
+    def observe(self, speech: np.ndarray) -> str:
+        """Feed voiced audio until enough has been heard to detect the language"""
+        with self._lock:
+            if self.language is not None:
+                return self.language
+            self._speech.append(np.asarray(speech, dtype=np.float32))
+            if sum(len(s) for s in self._speech) < self.detect_seconds * self.sample_rate:
+                return None
+            audio = np.concatenate(self._speech)
+            self._speech = []
+        language, probability = self.backend.detect_language(audio, self.sample_rate)
+        with self._lock:
+            if self.language is None:
+                self.language, self.probability, self.source = language, probability, "detected"
+                logger.info("Session language locked to %s (p=%.2f)", language, probability)
+            return self.language
+
+    def options(self) -> dict:
+        return {"language": self.language} if self.language else {}
+
+    def describe(self) -> str:
+        if self.language is None:
+            return "language: detecting"
+        if self.source == "manual":
+            return f"language: {self.language} (manual)"
+        return f"language: {self.language} (p={self.probability:.2f})"
+
+
+def benchmark(backend: ASRBackend, audio: np.ndarray, sample_rate: int = 16000, chunk_seconds: float = 5.0,
+              language: str = None) -> list:
+    """Real-time factor of each profile on ``chunk_seconds`` chunks, with and without a locked language"""
+    chunks = [audio[i:i + int(chunk_seconds * sample_rate)]
+              for i in range(0, len(audio), int(chunk_seconds * sample_rate))]
+    language = language or backend.detect_language(audio[:30 * sample_rate], sample_rate)[0]
+    results = []
+    for profile in DECODE_PROFILES:
+        for locked in (False, True):
+            options = decode_options(profile, language=language if locked else None)
+            started = time.perf_counter()
+            for chunk in chunks:
+                backend.transcribe(chunk, sample_rate, **options)
+            decode_seconds = time.perf_counter() - started
+            results.append({
+                "profile": profile,
+                "language": language if locked else "auto",
+                "real_time_factor": decode_seconds / (len(audio) / sample_rate),
+            })
+    return results
+
+
+def main():
+    from .batch import decode_audio
+
+    parser = argparse.ArgumentParser(description="Compare decode profiles and the language lock")
+    parser.add_argument("audio", help="Speech recording to decode (any format ffmpeg reads)")
+    parser.add_argument("--backend", default=None, help="ASR engine (whisper or faster-whisper)")
+    parser.add_argument("--model", default="base", help="Model size")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Audio to use from the start of the file")
+    args = parser.parse_args()
+
+    audio = np.concatenate(list(decode_audio(args.audio)))[:int(args.seconds * 16000)]
+    backend = load_backend(args.backend, args.model)
+    results = benchmark(backend, audio)
+    baseline = results[0]["real_time_factor"]
+    for r in results:
+        print(f"{r['profile']:>8} language={r['language']:<5} RTF {r['real_time_factor']:.3f} "
+              f"({baseline / r['real_time_factor']:.2f}x live/auto throughput)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Persistent content-addressed embedding cache
+
+Embeddings are keyed by a hash of the model name and the normalized text,
+so the same PDF, summary or query is only ever sent to the API once per
+model, across reruns, topics and apps. Vectors are stored as float32 blobs
+in ``embeddings.db`` (SQLite, WAL) under the data directory; the least
+recently used entries are evicted once the cache grows past ``max_bytes``.
+A small in-process LRU sits in front of the database for hot texts such as
+repeated queries.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .paths import data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_by_use ON embeddings (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed, so trivially different copies share a key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).digest()
+
+
+class EmbeddingCache:
+    """Two-tier (memory, then SQLite) embedding cache with LRU eviction.
+
+    Lookups and stores take whole batches so a chunked document costs one
+    query and one transaction. ``hits`` counts texts found in either tier,
+    ``memory_hits`` the subset served without touching the database.
+    """
+
+    TOUCH_INTERVAL = 60.0  # seconds between recency updates for entries served from memory
+
+    def __init__(self, path: str = None, max_bytes: int = 512 * 2**20, memory_entries: int = 2048):
+        self.path = path or os.path.join(data_dir(), "embeddings.db")
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.evicted = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._bytes = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key: bytes, vector: np.ndarray, touched: float):
+        self._memory[key] = (vector, touched)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vector for each text, or None where it has not been embedded yet"""
+        keys = [cache_key(model, text) for text in texts]
+        found = {}
+        touch = []
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    vector, touched = self._memory[key]
+                    found[key] = vector
+                    # Hot entries only refresh their on-disk recency now and then
+                    if now - touched > self.TOUCH_INTERVAL:
+                        touch.append(key)
+                        self._remember(key, vector, now)
+                    else:
+                        self._memory.move_to_end(key)
+            self.memory_hits += sum(1 for key in keys if key in found)
+            missing = list({key for key in keys if key not in found})
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(missing), 500):
+                batch = missing[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    touch.append(key)
+                    self._remember(key, vector, now)
+            if touch:
+                with self._conn:
+                    self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key in touch])
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [found[key].tolist() if key in found else None for key in keys]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector, now)
+                rows.append((key, model, vector.tobytes(), now))
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)", rows
+                )
+            self._bytes += sum(len(row[2]) for row in rows)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other processes share the file, so recount before deciding how much to drop
+        self._bytes = self._stored_bytes()
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            oldest = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not oldest:
+                break
+            victims = []
+            for key, size in oldest:
+                if self._bytes <= target:
+                    break
+                victims.append(key)
+                self._memory.pop(key, None)
+                self._bytes -= size
+            with self._conn:
+                self._conn.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key in victims])
+            self.evicted += len(victims)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "hit_rate": self.hit_rate,
+            "evicted": self.evicted,
+            "bytes": self._bytes,
+        }
+
+    def describe(self) -> str:
+        return (f"embedding cache: {self.hit_rate:.0%} hits ({self.hits}/{self.hits + self.misses}), "
+                f"{self._bytes / 2**20:.1f} MB")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+"""
+Batched embedding requests
+
+The embeddings endpoint accepts many inputs per request, so instead of one
+HTTP round trip per chunk :class:`EmbeddingService` packs consecutive texts
+into requests that stay under the API's input-count and token limits, sends
+a bounded number of them concurrently, and returns the vectors in the order
+the texts were given. With an :class:`~assistant.embedding_cache.EmbeddingCache`
+only texts that have never been embedded reach the API.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+
+from .embedding_cache import normalize_text
+from .metrics import METRICS
+from .tokens import count_tokens
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+API_MAX_INPUTS = 2048  # inputs per embeddings request
+API_MAX_TOKENS = 300_000  # tokens summed over all inputs of one request
+
+
+class EmbeddingService:
+    """Embeds lists of texts with as few requests as the limits allow.
+
+    Batches are filled greedily in input order up to ``max_batch_inputs``
+    texts or ``max_batch_tokens`` tokens; a text larger than the token
+    budget goes in a batch of its own. At most ``max_in_flight`` requests
+    run at once. Cached and repeated texts are left out of the requests.
+    """
+
+    def __init__(self, client, model: str = EMBEDDING_MODEL, max_batch_inputs: int = 256,
+                 max_batch_tokens: int = 60_000, max_in_flight: int = 4, counter=count_tokens, cache=None):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.max_batch_inputs = min(max_batch_inputs, API_MAX_INPUTS)
+        self.max_batch_tokens = min(max_batch_tokens, API_MAX_TOKENS)
+        self.max_in_flight = max_in_flight
+        self.counter = counter
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+
+    def batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Indices of ``texts`` grouped into requests, in order"""
+        batches, current, tokens = [], [], 0
+        for i, text in enumerate(texts):
+            count = self.counter(text)
+            if current and (len(current) >= self.max_batch_inputs or tokens + count > self.max_batch_tokens):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += count
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """One vector per text, in the same order"""
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.cache.get_many(self.model, texts) if self.cache is not None else [None] * len(texts)
+        # Texts that only differ in whitespace are requested once
+        missing = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                missing.setdefault(normalize_text(text), text)
+        if missing:
+            fetched = dict(zip(missing, self._fetch(list(missing.values()))))
+            if self.cache is not None:
+                self.cache.put_many(self.model, list(missing.values()), list(fetched.values()))
+            vectors = [fetched[normalize_text(text)] if vector is None else vector
+                       for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def _fetch(self, texts: List[str]) -> List[List[float]]:
+        batches = [[texts[i] for i in batch] for batch in self.batches(texts)]
+        if len(batches) == 1:
+            results = [self._request(batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches)),
+                                    thread_name_prefix="embedding") as pool:
+                results = list(pool.map(self._request, batches))
+        return [vector for vectors in results for vector in vectors]
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def _request(self, inputs: List[str]) -> List[List[float]]:
+        with METRICS.time("embedding"):
+            response = self.client.embeddings.create(input=inputs, model=self.model)
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(inputs)
+        # Each item carries the position of its input; don't rely on the response order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def describe(self) -> str:
+        part = f"embeddings: {self.inputs} texts in {self.requests} requests"
+        if self.cache is not None:
+            part += f" · {self.cache.describe()}"
+        return part
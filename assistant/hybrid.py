@@ -0,0 +1,65 @@
+"""
+Hybrid lexical + vector ranking for prompt context
+
+The vector store's matches and the BM25 hits of the transcript's
+distinctive words are merged with reciprocal rank fusion, which needs no
+score calibration between the two lists: a passage's fused score is the sum
+of ``1 / (k + rank)`` over the lists it appears in. The head of the fused
+list is then reranked by how many of the query's distinctive words each
+passage actually contains, and only the best few are returned, so prompts
+carry fewer, more relevant passages.
+"""
+from typing import Dict, List, Sequence
+
+from .lexical import TERM, LexicalIndex, query_terms
+from .metrics import METRICS
+from .vector_store import Match
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> Dict[str, float]:
+    """Fused score of every id in any ranking; rankings list ids best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class HybridRanker:
+    """Fuses vector matches with BM25 hits from one scope of a :class:`LexicalIndex`.
+
+    ``candidates`` is how many results to take from each list; the
+    :class:`~assistant.retrieval.RetrievalContext` asks the vector store for
+    that many. The keyword query uses the ``max_terms`` most distinctive
+    words, which bounds its cost on long transcripts. The fused head (twice
+    ``top_k``) is reranked by ``score * (1 + coverage_weight * coverage)``,
+    where coverage is the share of those words found in the passage.
+    """
+
+    def __init__(self, lexical: LexicalIndex, scope: str, candidates: int = 20, max_terms: int = 16,
+                 rrf_k: int = 60, coverage_weight: float = 1.0):
+        self.lexical = lexical
+        self.scope = scope
+        self.candidates = candidates
+        self.max_terms = max_terms
+        self.rrf_k = rrf_k
+        self.coverage_weight = coverage_weight
+
+    def rank(self, query: str, matches: Sequence, top_k: int) -> List[Match]:
+        terms = query_terms(query, self.max_terms)
+        with METRICS.time("lexical_query"):
+            hits = self.lexical.search(self.scope, terms, self.candidates)
+        metadata = {match["id"]: match["metadata"] for match in matches}
+        for vector_id, text, _ in hits:
+            metadata.setdefault(vector_id, {"text": text})
+        fused = reciprocal_rank_fusion([[match["id"] for match in matches], [hit[0] for hit in hits]], self.rrf_k)
+        head = sorted(fused, key=fused.get, reverse=True)[:2 * top_k]
+
+        wanted = set(terms)
+        scores = {}
+        for vector_id in head:
+            coverage = (len(wanted.intersection(TERM.findall(metadata[vector_id]["text"].lower()))) / len(wanted)
+                        if wanted else 0.0)
+            scores[vector_id] = fused[vector_id] * (1 + self.coverage_weight * coverage)
+        best = sorted(head, key=scores.get, reverse=True)[:top_k]
+        return [Match(id=vector_id, score=scores[vector_id], metadata=metadata[vector_id]) for vector_id in best]
@@ -0,0 +1,93 @@
+"""
+Registry of documents already embedded into the vector index
+
+Streamlit reruns the whole script on every interaction, and a file left in
+``st.file_uploader`` comes back each time. :class:`IngestionRegistry`
+remembers which file contents have been embedded into which topic (in
+``ingested.db`` under the data directory), so a document is extracted and
+upserted once, survives restarts, and is only embedded again on request.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from .paths import data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    digest TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT,
+    vector_ids TEXT NOT NULL,
+    ingested REAL NOT NULL,
+    PRIMARY KEY (digest, scope)
+);
+"""
+
+
+def content_digest(data: bytes) -> str:
+    """SHA-256 of the file contents; renaming or re-uploading a file doesn't change it"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestionRegistry:
+    """Durable ``(content digest, scope) -> vector ids`` records.
+
+    ``scope`` is whatever the vectors were written under, e.g. a topic or a
+    Pinecone namespace; the same file ingested into two topics is two
+    records. The vector ids are kept so a re-ingest can delete the old
+    vectors first instead of duplicating them.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(data_dir(), "ingested.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(self, digest: str, scope: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, scope, name, vector_ids, ingested FROM documents WHERE digest = ? AND scope = ?",
+                (digest, scope),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["vector_ids"] = json.loads(record["vector_ids"])
+        return record
+
+    def record(self, digest: str, scope: str, name: str, vector_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (digest, scope, name, vector_ids, ingested) VALUES (?, ?, ?, ?, ?)",
+                (digest, scope, name, json.dumps(list(vector_ids)), time.time()),
+            )
+
+    def forget(self, digest: str, scope: str) -> Optional[dict]:
+        """Drop a record so the document is ingested again; returns it for deleting its vectors"""
+        record = self.lookup(digest, scope)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE digest = ? AND scope = ?", (digest, scope))
+        return record
+
+    def forget_scope(self, scope: str) -> int:
+        """Drop every record of a scope, e.g. after its vectors were cleared"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM documents WHERE scope = ?", (scope,)).rowcount
+
+    def documents(self, scope: str = None) -> List[dict]:
+        query = "SELECT digest, scope, name, ingested, json_array_length(vector_ids) AS chunks FROM documents"
+        params = ()
+        if scope is not None:
+            query += " WHERE scope = ?"
+            params = (scope,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY ingested DESC", params).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,291 @@
+"""
+Append-only session audio journal on memory-mapped storage
+
+Raw audio for a session is appended to ``audio.pcm`` through a memory map
+that grows in large steps, and every appended window gets a line in
+``index.jsonl``. Index lines are only written after the samples they
+describe have been flushed, so after a crash the last complete index line
+marks exactly how much audio is valid and recording can resume from there.
+"""
+import datetime
+import io
+import json
+import os
+import threading
+import time
+from typing import Iterator, List
+from uuid import uuid4
+
+import numpy as np
+
+from .asr import ASRBackend, Segment
+from .paths import data_dir
+
+_DTYPES = {"int16": np.int16, "float32": np.float32}
+
+
+def new_session_id(app: str = None) -> str:
+    """Session id such as ``twitter_spaces-20250101-120000-1a2b3c4d``"""
+    # The apps share one transcript database, so sessions started in the same second must not collide
+    stamp = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid4().hex[:8]}"
+    return f"{app}-{stamp}" if app else stamp
+
+
+def session_dir(app: str, session_id: str) -> str:
+    return data_dir("sessions", app, session_id)
+
+
+# Session listing per journal directory, keyed by the index file's (mtime, size)
+_listing_cache = {}
+_TAIL_BYTES = 4096
+
+
+def _index_tail(index_path: str) -> tuple:
+    """(end sample, valid bytes) of the last complete index line, read from the end of the file"""
+    with open(index_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_bytes = _TAIL_BYTES
+        while True:
+            start = f.seek(max(0, size - tail_bytes))
+            lines = f.read().split(b"\n")
+            # An unterminated last line is a torn write; the first line may be cut by the seek
+            valid = size - len(lines[-1])
+            for line in reversed(lines[1 if start else 0:-1]):
+                try:
+                    return json.loads(line)["end"], valid
+                except (ValueError, KeyError, TypeError):
+                    valid -= len(line) + 1
+            if not start:
+                return 0, 0
+            tail_bytes *= 4
+
+
+def _recorded_length(index_path: str) -> int:
+    return _index_tail(index_path)[0]
+
+
+def list_sessions(app: str) -> List[dict]:
+    """Journals recorded by an app, newest first, read without opening them for writing.
+
+    Only the tail of each index is read, and only when the index has changed
+    since the last call, so this is cheap enough to run on every UI rerun.
+    """
+    root = data_dir("sessions", app)
+    sessions = []
+    for session_id in sorted(os.listdir(root), reverse=True):
+        path = os.path.join(root, session_id)
+        meta_path = os.path.join(path, "meta.json")
+        index_path = os.path.join(path, "index.jsonl")
+        try:
+            stat = os.stat(index_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            key = None
+        cached = _listing_cache.get(path)
+        if cached is None or cached[0] != key:
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                meta = json.load(f)
+            length = _recorded_length(index_path) if key else 0
+            cached = _listing_cache[path] = (key, dict(meta, session_id=session_id,
+                                                       duration=length / meta["sample_rate"]))
+        sessions.append(dict(cached[1]))
+    return sessions
+
+
+# Session directory -> journal open for writing in this process
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def open_journal(path: str, **options) -> "AudioJournal":
+    """Writer for a session journal, shared with any earlier run still shutting down.
+
+    Each call must be paired with :meth:`AudioJournal.close`; only the last
+    close syncs and truncates the files, so a run that is still stopping
+    never cuts off audio a newer run has already appended.
+    """
+    key = os.path.abspath(path)
+    with _writers_lock:
+        journal = _writers.get(key)
+        if journal is None:
+            journal = _writers[key] = AudioJournal(path, **options)
+        else:
+            journal._users += 1
+        return journal
+
+
+class AudioJournal:
+    """Durable, append-only audio store for one session.
+
+    By default every appended window is flushed and its index line fsynced
+    before :meth:`append` returns, i.e. one fsync per captured window (about
+    one per second while recording). With ``sync_interval`` seconds, samples
+    and index lines are made durable together at most that often; a crash
+    then loses up to that much audio, but the index never points past
+    flushed samples.
+
+    Only the recorded length is kept in memory; :meth:`segments` reads the
+    index from disk. With ``read_only`` nothing is written, recovered or
+    truncated and the audio is mapped read-only, so a session can be read
+    (e.g. re-transcribed) while it is still being recorded.
+    """
+
+    GROW_SECONDS = 600  # file grows in 10-minute steps to keep remaps rare
+
+    def __init__(self, path: str, sample_rate: int = 16000, dtype: str = "int16", sync_interval: float = 0.0,
+                 read_only: bool = False):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        self.data_path = os.path.join(path, "audio.pcm")
+        self.index_path = os.path.join(path, "index.jsonl")
+        meta_path = os.path.join(path, "meta.json")
+
+        if os.path.exists(meta_path) or read_only:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        else:
+            meta = {"sample_rate": sample_rate, "dtype": dtype, "created": time.time()}
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        self.sample_rate = meta["sample_rate"]
+        self.dtype = _DTYPES[meta["dtype"]]
+
+        self._lock = threading.Lock()
+        self._unsynced = []  # index lines of samples not yet flushed
+        self._users = 1
+        self.length = self._recover()
+        if read_only:
+            self._file = self._index = None
+            self._map = (np.memmap(self.data_path, dtype=self.dtype, mode="r", shape=(self.length,))
+                         if self.length else np.zeros(0, dtype=self.dtype))
+            return
+        self._file = open(self.data_path, "a+b")
+        self._map = None
+        self._capacity = 0
+        self._ensure_capacity(self.length)
+        self._index = open(self.index_path, "a")
+        self._last_sync = time.monotonic()
+
+    def _recover(self) -> int:
+        """Recorded length from the end of the index, cutting off a torn final line from an interrupted write"""
+        if not os.path.exists(self.index_path):
+            return 0
+        length, valid = _index_tail(self.index_path)
+        if not self.read_only and valid < os.path.getsize(self.index_path):
+            # Drop the partial line so appends start clean
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid)
+        return length
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity and self._map is not None:
+            return
+        capacity = max(needed, self._capacity) + self.GROW_SECONDS * self.sample_rate
+        if self._map is not None:
+            self._sync()
+            del self._map
+        self._file.truncate(capacity * np.dtype(self.dtype).itemsize)
+        self._map = np.memmap(self.data_path, dtype=self.dtype, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    @property
+    def duration(self) -> float:
+        return self.length / self.sample_rate
+
+    def append(self, samples: np.ndarray, **info) -> dict:
+        """Persist a window of float32 audio and return its index record"""
+        if self.read_only:
+            raise io.UnsupportedOperation("journal was opened read-only")
+        samples = np.asarray(samples, dtype=np.float32)
+        with self._lock:
+            start, end = self.length, self.length + len(samples)
+            self._ensure_capacity(end)
+            if self.dtype == np.int16:
+                np.multiply(np.clip(samples, -1.0, 1.0), 32767, out=self._map[start:end], casting="unsafe")
+            else:
+                self._map[start:end] = samples
+
+            record = dict(info, start=start, end=end, t=time.time())
+            self._unsynced.append(record)
+            self.length = end
+            if time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+        return record
+
+    def _sync(self):
+        """Flush samples, then write and fsync the index lines that describe them"""
+        self._map.flush()
+        if self._unsynced:
+            self._index.writelines(json.dumps(record) + "\n" for record in self._unsynced)
+            self._index.flush()
+            os.fsync(self._index.fileno())
+            self._unsynced = []
+        self._last_sync = time.monotonic()
+
+    def segments(self) -> List[dict]:
+        """Index records of every appended window, read from disk"""
+        records = []
+        with self._lock:
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            break
+                        if record["end"] > self.length:
+                            break
+                        records.append(record)
+            return records + list(self._unsynced)
+
+    def read(self, start_seconds: float = 0.0, end_seconds: float = None) -> np.ndarray:
+        """Float32 copy of a time range"""
+        start = int(start_seconds * self.sample_rate)
+        end = self.length if end_seconds is None else min(self.length, int(end_seconds * self.sample_rate))
+        chunk = self._map[start:end]
+        if self.dtype == np.int16:
+            return chunk.astype(np.float32) / 32767.0
+        return np.array(chunk)
+
+    def iter_windows(self, start_seconds: float = 0.0, end_seconds: float = None,
+                     window_seconds: float = 30.0) -> Iterator[tuple]:
+        """(start_seconds, audio) windows over a range, reading one window at a time"""
+        end_seconds = self.duration if end_seconds is None else min(end_seconds, self.duration)
+        position = start_seconds
+        while position < end_seconds:
+            stop = min(position + window_seconds, end_seconds)
+            yield position, self.read(position, stop)
+            position = stop
+
+    def retranscribe(self, backend: ASRBackend, start_seconds: float = 0.0, end_seconds: float = None,
+                     **options) -> Iterator[Segment]:
+        """Re-run recognition over a stored time range, e.g. with a larger model after the session"""
+        for offset, audio in self.iter_windows(start_seconds, end_seconds):
+            for s in backend.transcribe(audio, self.sample_rate, **options):
+                yield Segment(offset + s.start, offset + s.end, s.text)
+
+    def close(self):
+        if self.read_only:
+            self._map = None
+            return
+        with _writers_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            key = os.path.abspath(self.path)
+            if _writers.get(key) is self:
+                del _writers[key]
+        with self._lock:
+            if self._map is not None:
+                self._sync()
+                del self._map
+                self._map = None
+            # Drop the preallocated tail so the file holds exactly the recorded audio
+            self._file.truncate(self.length * np.dtype(self.dtype).itemsize)
+            self._file.close()
+            self._index.close()
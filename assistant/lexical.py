@@ -0,0 +1,124 @@
+"""
+Local BM25 keyword index kept next to the vector store
+
+Embeddings are good at paraphrase and poor at exact tokens: a product name,
+a ticker or a figure said in the live transcript often doesn't pull up the
+passage that contains it. :class:`LexicalIndex` stores the same passages
+under the same ids as the vector store in an SQLite FTS5 table
+(``lexical.db`` under the data directory) and ranks them with FTS5's
+built-in BM25.
+"""
+import os
+import re
+import sqlite3
+import threading
+from typing import Iterable, List, Sequence, Tuple
+
+from .paths import data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passage_keys (
+    rowid INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    id TEXT NOT NULL,
+    UNIQUE (scope, id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+# Matches FTS5's unicode61 tokens: runs of letters and digits
+TERM = re.compile(r"[^\W_]+")
+
+_STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how
+i if in into is it its itself just like me more most my no nor not now of off on once only or other our ours out
+over own really right same she should so some such than that the their theirs them then there these they this
+those through to too uh um under until up very was we well were what when where which while who whom why will with
+would yeah yes you your yours
+""".split())
+
+
+def query_terms(text: str, limit: int = 32) -> List[str]:
+    """Distinctive words of a query, lowercased: numbers, capitalized words and longer words first"""
+    ranks = {}
+    for word in TERM.findall(text):
+        term = word.lower()
+        marked = any(c.isdigit() for c in word) or word[0].isupper()
+        # Short words only count when they look like a code or a name ("Q3", "AI", "42")
+        if term in _STOPWORDS or (len(term) < 3 and not (marked and (len(term) > 1 or term.isdigit()))):
+            continue
+        rank = len(term) + (10 if marked else 0)
+        ranks[term] = max(ranks.get(term, 0), rank)
+    return sorted(ranks, key=ranks.get, reverse=True)[:limit]
+
+
+class LexicalIndex:
+    """BM25 full-text search over passages, partitioned by ``scope``.
+
+    ``scope`` plays the role of a topic filter or namespace in the vector
+    store; ids are the vector ids, so results from both can be fused.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(data_dir(), "lexical.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, scope: str, passages: Iterable[Tuple[str, str]]):
+        """Index ``(id, text)`` pairs, replacing passages already stored under the same ids"""
+        passages = list(passages)
+        with self._lock, self._conn:
+            self._delete(scope, [vector_id for vector_id, _ in passages])
+            for vector_id, text in passages:
+                rowid = self._conn.execute(
+                    "INSERT INTO passage_keys (scope, id) VALUES (?, ?)", (scope, vector_id)
+                ).lastrowid
+                self._conn.execute("INSERT INTO passages (rowid, text) VALUES (?, ?)", (rowid, text))
+
+    def _delete(self, scope: str, ids: Sequence[str] = None):
+        if ids is None:
+            rowids = self._conn.execute("SELECT rowid FROM passage_keys WHERE scope = ?", (scope,)).fetchall()
+        else:
+            rowids = []
+            for i in range(0, len(ids), 500):
+                batch = list(ids[i:i + 500])
+                rowids += self._conn.execute(
+                    f"SELECT rowid FROM passage_keys WHERE scope = ? AND id IN ({','.join('?' * len(batch))})",
+                    [scope] + batch,
+                ).fetchall()
+        self._conn.executemany("DELETE FROM passages WHERE rowid = ?", rowids)
+        self._conn.executemany("DELETE FROM passage_keys WHERE rowid = ?", rowids)
+        return len(rowids)
+
+    def delete(self, scope: str, ids: Sequence[str] = None) -> int:
+        """Remove the given passages, or the whole scope when ``ids`` is None"""
+        with self._lock, self._conn:
+            return self._delete(scope, None if ids is None else list(ids))
+
+    def search(self, scope: str, terms: Sequence[str], limit: int = 20) -> List[Tuple[str, str, float]]:
+        """``(id, text, score)`` of the best BM25 matches for any of ``terms``, best first"""
+        if not terms:
+            return []
+        expression = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT passage_keys.id, passages.text, bm25(passages) FROM passages "
+                "JOIN passage_keys ON passage_keys.rowid = passages.rowid "
+                "WHERE passages MATCH ? AND passage_keys.scope = ? ORDER BY bm25(passages) LIMIT ?",
+                (expression, scope, limit),
+            ).fetchall()
+        # FTS5 reports BM25 as a negative number, lower is better
+        return [(vector_id, text, -score) for vector_id, text, score in rows]
+
+    def count(self, scope: str = None) -> int:
+        with self._lock:
+            if scope is None:
+                return self._conn.execute("SELECT COUNT(*) FROM passage_keys").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM passage_keys WHERE scope = ?", (scope,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,129 @@
+"""
+Per-stage latency histograms for the live assistant loop
+
+Every instrumented call site (audio capture, transcription, embedding,
+vector query, chat completion) records its wall time into a fixed-bucket
+log-scale histogram, so percentiles are available at any point without
+keeping raw samples around. Transcription stages also record how much
+audio they covered, which gives their real-time factor.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Log-spaced bucket edges from 1 ms to ~17 min, 5% apart: percentiles are accurate to within 5%
+_EDGES = np.geomspace(1e-3, 1e3, num=int(np.log(1e6) / np.log(1.05)) + 1)
+
+
+class LatencyHistogram:
+    """Fixed-memory latency distribution with approximate percentiles"""
+
+    def __init__(self):
+        self.counts = np.zeros(len(_EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        seconds = float(seconds)
+        self.counts[np.searchsorted(_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return None
+        rank = np.searchsorted(np.cumsum(self.counts), q / 100 * self.count)
+        if rank >= len(_EDGES):
+            return self.max
+        return min(float(_EDGES[rank]), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else None
+
+
+class LatencyRecorder:
+    """Thread-safe collection of named stage histograms.
+
+    Time a call site with ``with recorder.time("embedding"): ...``; pass
+    ``audio_seconds`` for transcription stages to track their real-time
+    factor. Plain event counts (e.g. calls avoided by a cache) go through
+    :meth:`increment`.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._audio = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, stage: str, seconds: float, audio_seconds: float = None):
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = LatencyHistogram()
+            self._stages[stage].record(seconds)
+            if audio_seconds:
+                self._audio[stage] = self._audio.get(stage, 0.0) + audio_seconds
+
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    @contextmanager
+    def time(self, stage: str, audio_seconds: float = None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, audio_seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._audio.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def summary(self) -> dict:
+        """Per-stage count, mean, p50/p95/p99 and max in milliseconds, plus RTF where known"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        with self._lock:
+            summary = {}
+            for stage, histogram in self._stages.items():
+                summary[stage] = {
+                    "count": histogram.count,
+                    "mean_ms": ms(histogram.mean),
+                    "p50_ms": ms(histogram.percentile(50)),
+                    "p95_ms": ms(histogram.percentile(95)),
+                    "p99_ms": ms(histogram.percentile(99)),
+                    "max_ms": ms(histogram.max),
+                }
+                if stage in self._audio:
+                    summary[stage]["rtf"] = round(histogram.total / self._audio[stage], 3)
+            return summary
+
+    def rows(self) -> list:
+        """Summary as table rows, slowest stage (by p95) first"""
+        rows = [dict(stage=stage, **values) for stage, values in self.summary().items()]
+        return sorted(rows, key=lambda row: row["p95_ms"] or 0, reverse=True)
+
+    def to_json(self) -> str:
+        return json.dumps({"started": self.started, "exported": time.time(), "stages": self.summary(),
+                           "counters": self.counters()}, indent=2)
+
+
+# Process-wide recorder shared by the Streamlit reruns and the pipeline worker threads
+METRICS = LatencyRecorder()
@@ -0,0 +1,211 @@
+"""
+Adaptive Whisper model-size selection driven by measured real-time factor
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .asr import ASRBackend
+
+logger = logging.getLogger(__name__)
+
+MODEL_SIZES = ("tiny", "base", "small")
+
+
+class ModelCache:
+    """Small LRU of loaded backends so switching back to a recent model is cheap.
+
+    ``pinned`` returns keys that must never be evicted (e.g. the model in
+    use); the cache may then briefly hold more than ``capacity`` models.
+    """
+
+    def __init__(self, loader, capacity: int = 2, pinned=None):
+        self.loader = loader
+        self.capacity = capacity
+        self.pinned = pinned
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._models
+
+    def keys(self):
+        with self._lock:
+            return list(self._models)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+        backend = self.loader(key)
+        with self._lock:
+            backend = self._models.setdefault(key, backend)
+            self._models.move_to_end(key)
+            keep = set(self.pinned()) if self.pinned else set()
+            keep.add(key)
+            for candidate in list(self._models):
+                if len(self._models) <= self.capacity:
+                    break
+                if candidate not in keep:
+                    del self._models[candidate]
+                    logger.info("Evicted ASR model %s from cache", candidate)
+        return backend
+
+
+class AdaptiveModelController(ASRBackend):
+    """Moves between tiny/base/small at runtime to stay ahead of live audio.
+
+    Every decoded window feeds a smoothed real-time factor and the current
+    transcription backlog into the policy. The model is downgraded when it
+    falls behind and upgraded when there is ample headroom; ``patience``
+    consecutive votes plus a ``cooldown`` between switches provide the
+    hysteresis that keeps it from flapping. A larger model is warmed up in
+    the background before traffic moves to it; while a model is loading for
+    a switch, no other switch starts, and the model in use is never evicted
+    from the cache.
+
+    Under a :class:`~assistant.streaming.StreamingTranscriber` each decode
+    covers the whole buffer but only one step of new audio, so the
+    transcriber reports decode time per step through :meth:`observe_step`
+    and the per-window factor is ignored from then on. In that mode a step
+    must cost less than ``streaming_upgrade_rtf`` of its interval, both
+    smoothed and on every single step, before a larger model is tried.
+    """
+
+    name = "adaptive"
+
+    def __init__(self, loader, initial: str = "base", sizes=MODEL_SIZES, upgrade_rtf: float = 0.3,
+                 downgrade_rtf: float = 0.8, max_backlog: int = 2, patience: int = 5,
+                 cooldown: float = 30.0, smoothing: float = 0.3, cache_size: int = 2, backlog_fn=None,
+                 streaming_upgrade_rtf: float = 0.2):
+        super().__init__(initial)
+        self.sizes = list(sizes)
+        self.cache = ModelCache(loader, cache_size, pinned=lambda: (self.model_name,))
+        self.upgrade_rtf = upgrade_rtf
+        self.downgrade_rtf = downgrade_rtf
+        self.streaming_upgrade_rtf = streaming_upgrade_rtf
+        self.max_backlog = max_backlog
+        self.patience = patience
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.backlog_fn = backlog_fn
+        self.switches = []
+        self.smoothed_rtf = None
+        self.streaming = False  # set once step timings arrive through observe_step
+        self._up_votes = 0
+        self._down_votes = 0
+        self._last_switch = time.monotonic()
+        self._switching = False
+        self._warming = None
+        self._ready = None
+        self._policy_lock = threading.Lock()
+        self.cache.get(initial)
+
+    @property
+    def current(self) -> ASRBackend:
+        return self.cache.get(self.model_name)
+
+    @property
+    def label(self) -> str:
+        return f"adaptive:{self.current.label}"
+
+    def _transcribe(self, audio, **options):
+        if self._ready is not None:
+            self._switch(self._ready, "warm-up finished")
+        backend = self.current
+        segments = backend.transcribe(audio, **options)
+        if backend.last_rtf is not None and not self.streaming:
+            self.observe(backend.last_rtf)
+        return segments
+
+    def detect_language(self, audio, sample_rate=16000):
+        return self.current.detect_language(audio, sample_rate)
+
+    def observe_step(self, decode_seconds: float, step_seconds: float, backlog: int = None):
+        """Feed one streaming step: decode wall time over the seconds of audio that step added"""
+        self.streaming = True
+        self.observe(decode_seconds / step_seconds, backlog)
+
+    def observe(self, rtf: float, backlog: int = None):
+        """Feed one window's real-time factor into the switching policy"""
+        if backlog is None:
+            backlog = self.backlog_fn() if self.backlog_fn else 0
+        with self._policy_lock:
+            if self.smoothed_rtf is None:
+                self.smoothed_rtf = rtf
+            else:
+                self.smoothed_rtf += self.smoothing * (rtf - self.smoothed_rtf)
+
+            falling_behind = self.smoothed_rtf > self.downgrade_rtf or backlog > self.max_backlog
+            if self.streaming:
+                headroom = max(rtf, self.smoothed_rtf) < self.streaming_upgrade_rtf and backlog == 0
+            else:
+                headroom = self.smoothed_rtf < self.upgrade_rtf and backlog == 0
+            self._down_votes = self._down_votes + 1 if falling_behind else 0
+            self._up_votes = self._up_votes + 1 if headroom else 0
+
+            if self._switching or time.monotonic() - self._last_switch < self.cooldown:
+                return
+            position = self.sizes.index(self.model_name)
+            if self._down_votes >= self.patience and position > 0:
+                target = self.sizes[position - 1]
+                reason = f"rtf={self.smoothed_rtf:.2f} backlog={backlog}"
+                self._down_votes = 0
+                # Claimed before the load starts, so slow steps during the load don't start more switches
+                self._switching = True
+                self._last_switch = time.monotonic()
+                # Falling behind: move immediately, even if the smaller model must load first
+                threading.Thread(target=self._switch, args=(target, reason), daemon=True).start()
+            elif self._up_votes >= self.patience and position < len(self.sizes) - 1 and self._warming is None:
+                self._up_votes = 0
+                self._warm(self.sizes[position + 1], f"rtf={self.smoothed_rtf:.2f} backlog={backlog}")
+
+    def _warm(self, target: str, reason: str):
+        self._warming = target
+
+        def load():
+            try:
+                self.cache.get(target).warm()
+                self._ready = target
+                logger.info("ASR model %s warmed up (%s)", target, reason)
+            except Exception:
+                logger.exception("Could not load ASR model %s", target)
+            finally:
+                self._warming = None
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _switch(self, target: str, reason: str):
+        try:
+            self.cache.get(target)
+        except Exception:
+            logger.exception("Could not load ASR model %s", target)
+            with self._policy_lock:
+                self._switching = False
+            return
+        with self._policy_lock:
+            self._ready = None
+            self._switching = False
+            previous = self.model_name
+            if previous == target:
+                return
+            self.model_name = target
+            self.smoothed_rtf = None
+            self._up_votes = self._down_votes = 0
+            self._last_switch = time.monotonic()
+            self.switches.append({"at": time.time(), "from": previous, "to": target, "reason": reason})
+        logger.info("ASR model switch %s -> %s (%s)", previous, target, reason)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "model": self.model_name,
+            "smoothed_rtf": self.smoothed_rtf,
+            "rtf_basis": "step" if self.streaming else "window",
+            "loaded": self.cache.keys(),
+            "switches": list(self.switches),
+        })
+        return stats
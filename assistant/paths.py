@@ -0,0 +1,13 @@
+"""
+Local storage locations for session data, caches and indexes
+"""
+import os
+
+DATA_DIR = os.path.expanduser(os.getenv("ASSISTANT_DATA_DIR", "~/.audio_assistant"))
+
+
+def data_dir(*parts: str) -> str:
+    """Directory under the assistant data root, created on first use"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,209 @@
+"""
+Staged live pipeline: capture → transcription → question generation
+"""
+import threading
+import time
+from collections import deque
+
+
+class BoundedQueue:
+    """Thread-safe bounded queue that drops the oldest item when full.
+
+    Producers never block, so a slow downstream stage can only lose stale
+    work instead of stalling the stages in front of it.
+    """
+
+    _EMPTY = object()
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Enqueue an item, evicting the oldest one if the queue is full"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Dequeue the oldest item, or return ``BoundedQueue._EMPTY`` on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return self._EMPTY
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+
+class PipelineState:
+    """Latest results published by the workers, read by the Streamlit script"""
+
+    def __init__(self, **initial):
+        self._values = dict(initial)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def update(self, **values):
+        with self._lock:
+            self._values.update(values)
+            self.version += 1
+
+    def append(self, key, value):
+        with self._lock:
+            self._values.setdefault(key, []).append(value)
+            self.version += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def snapshot(self) -> dict:
+        """Shallow copy of the current values (lists are copied too)"""
+        with self._lock:
+            return {k: list(v) if isinstance(v, list) else v for k, v in self._values.items()}
+
+
+class Stage:
+    """One pipeline worker: pulls from its input queue and pushes to the next"""
+
+    def __init__(self, name: str, fn, maxsize: int = 4):
+        self.name = name
+        self.fn = fn
+        self.queue = BoundedQueue(maxsize)
+        self.processed = 0
+        self.errors = 0
+        self.last_error = None
+        self.busy = False
+
+
+class LivePipeline:
+    """Runs a capture source and a chain of stages on separate threads.
+
+    ``source`` is called repeatedly on the capture thread and should return
+    the next item (e.g. an audio window) or None if nothing is ready yet.
+    Each stage function receives the previous stage's output; returning None
+    ends processing for that item.
+    """
+
+    def __init__(self, source, stages, queue_size: int = 4, state: PipelineState = None):
+        self.source = source
+        self.stages = [Stage(name, fn, queue_size) for name, fn in stages]
+        self.state = state or PipelineState()
+        self.captured = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    @property
+    def stopped(self) -> bool:
+        """:meth:`stop` was called; workers may still be finishing their current item"""
+        return self._stop.is_set()
+
+    def start(self):
+        """Start the capture worker and one worker per stage"""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            self._threads.append(threading.Thread(
+                target=self._stage_loop, args=(stage, next_stage), name=stage.name, daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        """Signal every worker to exit and wait briefly for them (``timeout=0`` does not wait)"""
+        self._stop.set()
+        if timeout:
+            self.join(timeout)
+        for stage in self.stages:
+            stage.queue.clear()
+
+    def join(self, timeout: float = None):
+        """Wait for the workers to exit after :meth:`stop`"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _capture_loop(self):
+        first = self.stages[0]
+        while not self._stop.is_set():
+            try:
+                item = self.source()
+            except Exception as e:
+                self.state.update(error=f"capture: {e}")
+                time.sleep(0.1)
+                continue
+            if item is not None:
+                self.captured += 1
+                first.queue.put(item)
+
+    def _stage_loop(self, stage: Stage, next_stage: Stage):
+        while not self._stop.is_set():
+            item = stage.queue.get(timeout=0.1)
+            if item is BoundedQueue._EMPTY:
+                continue
+            stage.busy = True
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                stage.errors += 1
+                stage.last_error = str(e)
+                self.state.update(error=f"{stage.name}: {e}")
+                result = None
+            finally:
+                stage.busy = False
+            stage.processed += 1
+            if result is not None and next_stage is not None:
+                next_stage.queue.put(result)
+
+    def queue_depths(self) -> dict:
+        """Items waiting in front of each stage"""
+        return {stage.name: len(stage.queue) for stage in self.stages}
+
+    def stats(self) -> dict:
+        """Per-stage depth, drop, throughput and error counters"""
+        stats = {"capture": {"windows": self.captured}}
+        for stage in self.stages:
+            stats[stage.name] = {
+                "depth": len(stage.queue),
+                "dropped": stage.queue.dropped,
+                "processed": stage.processed,
+                "busy": stage.busy,
+                "errors": stage.errors,
+            }
+        return stats
+
+    def describe(self) -> str:
+        """One-line queue summary for the UI, e.g. to spot which stage stalls"""
+        parts = [f"captured {self.captured}"]
+        for stage in self.stages:
+            part = f"{stage.name}: {len(stage.queue)} queued"
+            if stage.busy:
+                part += ", working"
+            if stage.queue.dropped:
+                part += f", {stage.queue.dropped} dropped"
+            parts.append(part)
+        return " · ".join(parts)
+
+    def snapshot(self) -> dict:
+        """Latest published state plus queue statistics"""
+        snapshot = self.state.snapshot()
+        snapshot["stats"] = self.stats()
+        return snapshot
@@ -0,0 +1,135 @@
+"""
+Token-budgeted, de-duplicated context for LLM prompts
+
+Retrieved passages used to be pasted into prompts as they came back. The
+same summary upserted after several question rounds shows up several times,
+and long passages crowd out everything else. :class:`ContextAssembler` takes
+the ranked passages for one prompt, drops near-duplicates (64-bit SimHash
+over word shingles), orders the rest by maximal marginal relevance so each
+passage adds something the previous ones didn't, and packs them into a
+token budget. Tokens saved against pasting every passage are counted on
+``METRICS``.
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from .metrics import METRICS
+from .tokens import count_tokens
+from .trigger import lexical_sketch
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash of the word ``shingle``-grams; near-duplicate texts differ in few bits"""
+    words = _WORD.findall(text.lower())
+    grams = [" ".join(words[i:i + shingle]) for i in range(max(len(words) - shingle + 1, 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little")
+                       for gram in grams], dtype=np.uint64)
+    ones = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0)
+    return int(sum(1 << bit for bit in range(64) if ones[bit] * 2 > len(grams)))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    passages: int  # passages kept
+    candidates: int  # passages offered
+    duplicates: int  # dropped as near-duplicates of a better-ranked passage
+    tokens: int
+    naive_tokens: int  # every candidate joined, as prompts used to carry them
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.naive_tokens - self.tokens, 0)
+
+
+class ContextAssembler:
+    """Packs ranked passages into at most ``budget`` tokens.
+
+    Passages within ``max_distance`` SimHash bits of a better-ranked one are
+    dropped: a passage with a few words changed lands within about ten bits,
+    unrelated ones around 32. The rest are chosen greedily by MMR,
+    ``relevance - diversity * max similarity to the passages already
+    chosen``, with relevance falling off linearly with the retriever's rank
+    and similarity measured between lexical sketches. A passage that doesn't fit is skipped in favour of a
+    shorter one; if even the best one doesn't fit it is cut at a word
+    boundary.
+    """
+
+    def __init__(self, budget: int = 600, diversity: float = 0.3, max_distance: int = 10, counter=count_tokens,
+                 recorder=METRICS):
+        self.budget = budget
+        self.diversity = diversity
+        self.max_distance = max_distance
+        self.counter = counter
+        self.recorder = recorder
+
+    def deduplicate(self, passages: Sequence[str]) -> List[int]:
+        """Indices of the passages that are not near-duplicates of an earlier one"""
+        kept, fingerprints = [], []
+        for i, passage in enumerate(passages):
+            if not passage.strip():
+                continue
+            fingerprint = simhash(passage)
+            if any(hamming(fingerprint, other) <= self.max_distance for other in fingerprints):
+                continue
+            kept.append(i)
+            fingerprints.append(fingerprint)
+        return kept
+
+    def _mmr_order(self, passages: Sequence[str], indices: List[int]) -> List[int]:
+        count = len(passages)
+        relevance = {i: 1.0 - i / count for i in indices}
+        sketches = {i: lexical_sketch(passages[i]) for i in indices}
+        order, remaining = [], list(indices)
+        while remaining:
+            def score(i):
+                redundancy = max((float(sketches[i] @ sketches[j]) for j in order), default=0.0)
+                return (1 - self.diversity) * relevance[i] - self.diversity * redundancy
+            best = max(remaining, key=score)
+            order.append(best)
+            remaining.remove(best)
+        return order
+
+    def _truncate(self, text: str, budget: int) -> str:
+        words = text.split()
+        keep = len(words)
+        while keep and self.counter(" ".join(words[:keep])) > budget:
+            keep = int(keep * 0.9)
+        return " ".join(words[:keep])
+
+    def assemble(self, query: str, passages: Sequence[str], budget: int = None) -> AssembledContext:
+        """Context for one prompt from passages ranked best first; ``query`` is only used for logging"""
+        budget = self.budget if budget is None else budget
+        passages = list(passages)
+        naive_tokens = self.counter("\n".join(passages))
+        unique = self.deduplicate(passages)
+        chosen = []
+        for i in self._mmr_order(passages, unique):
+            # Counted as joined, so the separators are inside the budget too
+            if self.counter("\n".join(chosen + [passages[i]])) <= budget:
+                chosen.append(passages[i])
+        if not chosen and unique:
+            chosen = [self._truncate(passages[unique[0]], budget)]
+        text = "\n".join(chosen)
+        result = AssembledContext(text, len(chosen), len(passages), sum(1 for p in passages if p.strip()) - len(unique),
+                                  self.counter(text), naive_tokens)
+        self.recorder.increment("context.prompts")
+        self.recorder.increment("context.tokens_saved", result.saved_tokens)
+        self.recorder.increment("context.duplicates_dropped", result.duplicates)
+        logger.debug("Context for %r: %d/%d passages, %d tokens, %d saved", query[:40], result.passages,
+                     result.candidates, result.tokens, result.saved_tokens)
+        return result
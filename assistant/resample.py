@@ -0,0 +1,122 @@
+"""
+Streaming polyphase resampler for native-rate capture
+
+Microphones are opened at whatever rate and channel count they run at
+natively (typically 44.1 or 48 kHz, often stereo). Each callback block is
+downmixed and converted to 16 kHz here with a windowed-sinc polyphase
+filter. The filter state carries across blocks, so the output is the same
+as resampling the whole recording at once.
+
+Run ``python -m assistant.resample`` for a micro-benchmark of the CPU cost.
+"""
+import argparse
+import time
+from math import gcd
+
+import numpy as np
+
+
+class PolyphaseResampler:
+    """Rational-ratio resampler (``out_rate / in_rate = up / down``) for float32 blocks.
+
+    Output sample ``n`` sits at position ``n * down`` on the ``up``-times
+    upsampled grid; its filter phase and input offset are computed for the
+    whole block at once and the convolution is a single gather + einsum.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = 16000, taps_per_phase: int = 32, beta: float = 8.0):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.taps = taps_per_phase
+
+        # Low-pass prototype at the upsampled rate, cut off below the lower Nyquist
+        length = self.taps * self.up
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+        prototype *= self.up / prototype.sum()
+        # bank[p, k] multiplies x[base - k] for outputs in phase p
+        self.bank = prototype.reshape(self.taps, self.up).T.astype(np.float32)
+        self._offsets = np.arange(self.taps)
+
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._position = 0  # next output's position on the upsampled grid, relative to this block
+
+    def reset(self):
+        self._history[:] = 0
+        self._position = 0
+
+    def output_length(self, frames: int) -> int:
+        """Samples produced by the next block of ``frames`` input samples"""
+        limit = frames * self.up
+        if self._position >= limit:
+            return 0
+        return (limit - self._position - 1) // self.down + 1
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Downmix a ``(frames,)`` or ``(frames, channels)`` block and resample it"""
+        block = downmix(np.asarray(block, dtype=np.float32))
+        frames = len(block)
+        count = self.output_length(frames)
+        extended = np.concatenate([self._history, block])
+
+        positions = self._position + self.down * np.arange(count)
+        phases = positions % self.up
+        # Index into ``extended``: the history occupies the first taps-1 slots
+        bases = positions // self.up + self.taps - 1
+        windows = extended[bases[:, None] - self._offsets]
+        output = np.einsum("ij,ij->i", windows, self.bank[phases])
+
+        self._position += count * self.down - frames * self.up
+        self._history = extended[-(self.taps - 1):].copy()
+        return output
+
+
+def downmix(block: np.ndarray) -> np.ndarray:
+    """Mono view or mean of a ``(frames, channels)`` block"""
+    if block.ndim == 1:
+        return block
+    return block[:, 0] if block.shape[1] == 1 else block.mean(axis=1, dtype=np.float32)
+
+
+def benchmark(in_rate: int = 48000, channels: int = 2, block_frames: int = 1024, seconds: float = 60.0,
+              out_rate: int = 16000) -> dict:
+    """Time resampling ``seconds`` of callback-sized blocks; ``core_fraction`` is CPU time per audio time"""
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    rng = np.random.default_rng(0)
+    block = rng.standard_normal((block_frames, channels)).astype(np.float32) * 0.1
+    blocks = int(seconds * in_rate / block_frames)
+    started = time.process_time()
+    produced = 0
+    for _ in range(blocks):
+        produced += len(resampler.process(block))
+    elapsed = time.process_time() - started
+    audio_seconds = blocks * block_frames / in_rate
+    return {
+        "in_rate": in_rate,
+        "channels": channels,
+        "block_frames": block_frames,
+        "audio_seconds": round(audio_seconds, 1),
+        "cpu_seconds": round(elapsed, 3),
+        "core_fraction": elapsed / audio_seconds,
+        "output_rate": produced / audio_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the CPU cost of capture resampling")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Audio duration to simulate per case")
+    parser.add_argument("--block", type=int, default=1024, help="Frames per capture callback")
+    args = parser.parse_args()
+    for in_rate, channels in [(48000, 1), (48000, 2), (44100, 1), (44100, 2)]:
+        result = benchmark(in_rate, channels, args.block, args.seconds)
+        verdict = "ok" if result["core_fraction"] < 0.01 else "OVER BUDGET"
+        print(f"{in_rate} Hz x{channels}: {result['core_fraction'] * 100:.3f}% of a core "
+              f"({result['cpu_seconds']} s CPU for {result['audio_seconds']} s audio) {verdict}")
+
+
+if __name__ == "__main__":
+    main()
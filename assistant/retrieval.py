@@ -0,0 +1,96 @@
+"""
+Request-scoped retrieval memoization
+
+A single interaction often builds several prompts from the same text: a
+question round asks for questions and follow-up actions, a final report
+asks for questions and a summary, and each of them used to embed the text
+and query the index again. A :class:`RetrievalContext` is created per
+interaction and hands every consumer the same query embedding and top-k
+matches. With a :class:`~assistant.hybrid.HybridRanker` the vector matches
+are fused with keyword hits and reranked before they are shared, and with
+a :class:`~assistant.prompt_context.ContextAssembler` each prompt's section
+is de-duplicated and packed into that prompt's token budget.
+"""
+import threading
+from typing import Callable, List
+
+from .embedding_cache import normalize_text
+from .metrics import METRICS
+
+
+class RetrievalContext:
+    """Memoized ``embed`` and ``search`` results for one interaction.
+
+    ``embed(text)`` returns a query vector and ``search(vector, top_k)``
+    returns matches with ``match["metadata"]["text"]``. A request for fewer
+    matches than were already fetched is served from the larger result.
+    Every call avoided is counted on the recorder as
+    ``retrieval.embeddings_saved`` or ``retrieval.queries_saved``. A
+    ``ranker`` gets ``ranker.candidates`` vector matches and returns the
+    final ``top_k``. An ``assembler`` turns the matches into each prompt's
+    context; the last result is kept in ``assembled``.
+    """
+
+    def __init__(self, embed: Callable, search: Callable, recorder=METRICS, ranker=None, assembler=None):
+        self.embed = embed
+        self.search = search
+        self.recorder = recorder
+        self.ranker = ranker
+        self.assembler = assembler
+        self.assembled = None
+        self.tokens_saved = 0
+        self.embeddings = 0
+        self.queries = 0
+        self.saved = 0
+        self._vectors = {}
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    def vector(self, query: str):
+        key = normalize_text(query)
+        with self._lock:
+            if key in self._vectors:
+                self._saved("retrieval.embeddings_saved")
+                return self._vectors[key]
+            vector = self._vectors[key] = self.embed(query)
+            self.embeddings += 1
+            return vector
+
+    def matches(self, query: str, top_k: int = 5) -> List:
+        key = normalize_text(query)
+        with self._lock:
+            cached = self._matches.get(key)
+            if cached is not None and cached[0] >= top_k:
+                self._saved("retrieval.queries_saved")
+                return cached[1][:top_k]
+        vector = self.vector(query)
+        with self._lock:
+            if self.ranker is None:
+                matches = list(self.search(vector, top_k))
+            else:
+                candidates = list(self.search(vector, max(top_k, self.ranker.candidates)))
+                matches = self.ranker.rank(query, candidates, top_k)
+            self._matches[key] = (top_k, matches)
+            self.queries += 1
+            return matches
+
+    def context(self, query: str, top_k: int = 5, budget: int = None) -> str:
+        """Matched texts as a prompt section, within ``budget`` tokens when there is an assembler"""
+        texts = [match["metadata"]["text"] for match in self.matches(query, top_k)]
+        if self.assembler is None:
+            return "\n".join(texts)
+        assembled = self.assembler.assemble(query, texts, budget)
+        with self._lock:
+            self.assembled = assembled
+            self.tokens_saved += assembled.saved_tokens
+        return assembled.text
+
+    def _saved(self, counter: str):
+        self.saved += 1
+        self.recorder.increment(counter)
+
+    def describe(self) -> str:
+        description = f"retrieval: {self.embeddings} embeddings, {self.queries} queries, {self.saved} calls saved"
+        if self.assembler is not None:
+            description += f", {self.tokens_saved} prompt tokens saved"
+        return description
@@ -0,0 +1,121 @@
+"""
+Background live session that outlives Streamlit reruns
+
+Streamlit reruns the whole script on every widget interaction, so a
+recording loop inside the script either blocks the UI or is killed by the
+next click. :class:`LiveSession` owns the running pipeline instead; the app
+keeps one per browser session in ``st.cache_resource`` and only reads
+:meth:`LiveSession.snapshot` from a periodically refreshed fragment.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSession:
+    """Starts and stops a :class:`~assistant.pipeline.LivePipeline` without blocking the caller.
+
+    ``start`` and ``stop`` only flip state and signal the workers; joining
+    the worker threads and running the ``on_stop`` callbacks (releasing the
+    run's journal handle and microphone cursor) happens on a separate
+    thread. Each run passes callbacks for the resources it owns, so a new
+    run can start while the previous one is still finishing (``stopping``),
+    e.g. waiting for a decode or an LLM call. The last snapshot stays
+    readable after the pipeline has stopped, until :meth:`reset`.
+    """
+
+    def __init__(self, join_timeout: float = 10.0):
+        self.join_timeout = join_timeout
+        self.pipeline = None
+        self.context = {}
+        self.started_at = None
+        self.last_transition_ms = None
+        self._on_stop = []
+        self._finishers = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.pipeline is not None and self.started_at is not None
+
+    @property
+    def stopping(self) -> bool:
+        """An earlier run is still joining its workers and releasing what it owns"""
+        return any(finisher.is_alive() for finisher in self._finishers)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+
+    def start(self, build, on_stop=(), **context) -> bool:
+        """Build a pipeline with ``build()`` and start its workers; False if already running.
+
+        ``on_stop`` callbacks run once this run's workers have exited, or
+        straight away if the session is already running; ``context`` keeps
+        objects the UI needs to reach while the session runs (e.g. the
+        language lock).
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self.running:
+                self._cleanup(on_stop)
+                return False
+            try:
+                self.pipeline = build().start()
+            except Exception:
+                self._cleanup(on_stop)
+                raise
+            self.context = dict(context)
+            self._on_stop = list(on_stop)
+            self.started_at = time.monotonic()
+        self.last_transition_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    def stop(self):
+        """Signal the workers to exit and return immediately"""
+        started = time.perf_counter()
+        with self._lock:
+            if not self.running:
+                return
+            pipeline, on_stop = self.pipeline, self._on_stop
+            pipeline.stop(timeout=0)
+            self.started_at = None
+            self._on_stop = []
+            finisher = threading.Thread(
+                target=self._finish, args=(pipeline, on_stop), name="session-stop", daemon=True
+            )
+            finisher.start()
+            self._finishers = [f for f in self._finishers if f.is_alive()] + [finisher]
+        self.last_transition_ms = (time.perf_counter() - started) * 1000
+
+    def reset(self):
+        """Stop if running and drop the last results"""
+        self.stop()
+        with self._lock:
+            self.pipeline = None
+            self.context = {}
+
+    def snapshot(self) -> dict:
+        """Latest pipeline state, empty before the first start"""
+        pipeline = self.pipeline
+        return pipeline.snapshot() if pipeline is not None else {}
+
+    def describe(self) -> str:
+        pipeline = self.pipeline
+        if pipeline is None:
+            return "idle"
+        return pipeline.describe() if self.running else "stopped"
+
+    def _finish(self, pipeline, on_stop):
+        pipeline.join(self.join_timeout)
+        self._cleanup(on_stop)
+
+    @staticmethod
+    def _cleanup(on_stop):
+        for callback in on_stop:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Live session cleanup failed")
@@ -0,0 +1,162 @@
+"""
+Streaming Whisper transcription with overlapping windows and local agreement
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+
+def _normalize(word: str) -> str:
+    return "".join(ch for ch in word.lower() if ch.isalnum())
+
+
+class StreamingTranscriber:
+    """Incremental decoder over an :class:`ASRBackend` that only commits words two passes agree on.
+
+    Audio is appended in small steps and the whole uncommitted tail is
+    re-decoded each time, so consecutive decodes overlap. A word is committed
+    once it appears at the same position in two consecutive hypotheses
+    (LocalAgreement-2). Committed text is carried into the next decode as
+    ``initial_prompt`` so words split across steps keep their context.
+
+    ``process()`` hands back words as soon as they are committed, so the
+    first word arrives about two steps after it was spoken. A consumer that
+    wants batches can set ``chunk_seconds`` to hold words back until that
+    much speech is committed; ``flush()`` returns everything pending either
+    way. ``preview`` shows committed-but-unreturned words plus the current
+    hypothesis for immediate display.
+
+    Because every step re-decodes the whole buffer, the backend's own
+    real-time factor (decode time / buffer length) understates the load.
+    ``last_step_rtf`` is decode time over the audio added since the previous
+    decode, and a backend with ``observe_step`` (the adaptive model
+    controller) is fed that instead.
+    """
+
+    def __init__(self, backend, sample_rate: int = 16000, chunk_seconds: float = 0.0,
+                 max_buffer_seconds: float = 20.0, prompt_chars: int = 200, **decode_options):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.chunk_seconds = chunk_seconds
+        self.max_buffer_seconds = max_buffer_seconds
+        self.prompt_chars = prompt_chars
+        self.decode_options = decode_options
+        self.reset()
+
+    def reset(self):
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._offset = 0.0  # session time of the first sample in the buffer
+        self._committed_until = 0.0
+        self._hypothesis = []  # [(start, end, word)] not yet agreed on
+        self._pending = []  # committed words not yet returned as a chunk
+        self._recent = deque(maxlen=100)  # committed words, for the decoder prompt
+        self._first_audio_at = None
+        self._step_seconds = 0.0  # audio inserted since the last decode
+        self.first_word_latency = None
+        self.last_step_rtf = None
+        self.decodes = 0
+
+    @property
+    def buffered_seconds(self) -> float:
+        return len(self._audio) / self.sample_rate
+
+    @property
+    def preview(self) -> str:
+        """Committed words not yet returned plus the unconfirmed hypothesis"""
+        return "".join(w for _, _, w in self._pending + self._hypothesis).strip()
+
+    def _prompt(self) -> str:
+        """Committed text whose audio has already left the buffer"""
+        text = "".join(w for _, end, w in self._recent if end <= self._offset)
+        return text[-self.prompt_chars:].strip()
+
+    def insert_audio(self, audio: np.ndarray):
+        if self._first_audio_at is None:
+            self._first_audio_at = time.perf_counter()
+        audio = np.asarray(audio, dtype=np.float32)
+        self._audio = np.concatenate([self._audio, audio])
+        self._step_seconds += len(audio) / self.sample_rate
+
+    def _decode(self):
+        started = time.perf_counter()
+        segments = self.backend.transcribe(
+            self._audio,
+            self.sample_rate,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=self._prompt() or None,
+            **self.decode_options,
+        )
+        elapsed = time.perf_counter() - started
+        self.decodes += 1
+        if self._step_seconds:
+            self.last_step_rtf = elapsed / self._step_seconds
+            observe_step = getattr(self.backend, "observe_step", None)
+            if observe_step is not None:
+                observe_step(elapsed, self._step_seconds)
+        self._step_seconds = 0.0
+        words = []
+        for segment in segments:
+            for w in segment.words:
+                start = self._offset + w.start
+                if start >= self._committed_until - 0.05:
+                    words.append((start, self._offset + w.end, w.word))
+        return words
+
+    def _commit(self, words):
+        if not words:
+            return
+        if self.first_word_latency is None and self._first_audio_at is not None:
+            self.first_word_latency = time.perf_counter() - self._first_audio_at
+        self._pending.extend(words)
+        self._recent.extend(words)
+        self._committed_until = words[-1][1]
+
+    def _trim(self):
+        """Drop committed audio once the buffer gets long"""
+        if self.buffered_seconds <= self.max_buffer_seconds:
+            return
+        cut = max(0.0, self._committed_until - self._offset)
+        if cut <= 0:
+            # Nothing agreed for a whole buffer; keep the decoder bounded anyway
+            cut = self.buffered_seconds - self.max_buffer_seconds / 2
+        samples = int(cut * self.sample_rate)
+        self._audio = self._audio[samples:]
+        self._offset += samples / self.sample_rate
+
+    def _take_chunk(self, force: bool = False) -> str:
+        if not self._pending:
+            return ""
+        span = self._pending[-1][1] - self._pending[0][0]
+        if not force and span < self.chunk_seconds:
+            return ""
+        text = "".join(w for _, _, w in self._pending).strip()
+        self._pending = []
+        return text
+
+    def process(self) -> str:
+        """Re-decode the uncommitted tail; return a chunk of newly stable text or ''"""
+        if len(self._audio) == 0:
+            return ""
+        words = self._decode()
+
+        agreed = 0
+        for new, old in zip(words, self._hypothesis):
+            if _normalize(new[2]) != _normalize(old[2]):
+                break
+            agreed += 1
+        self._commit(words[:agreed])
+        self._hypothesis = words[agreed:]
+        self._trim()
+        return self._take_chunk()
+
+    def flush(self) -> str:
+        """Commit everything heard so far (e.g. at a pause or when stopping)"""
+        if len(self._audio):
+            self._hypothesis = self._decode()
+        self._commit(self._hypothesis)
+        self._hypothesis = []
+        self._offset += self.buffered_seconds
+        self._audio = np.zeros(0, dtype=np.float32)
+        return self._take_chunk(force=True)
@@ -0,0 +1,35 @@
+"""
+Token counting for prompt budgeting
+"""
+import functools
+import math
+from typing import List, Sequence
+
+DEFAULT_ENCODING = "cl100k_base"  # gpt-3.5-turbo, gpt-4 and text-embedding-ada-002
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(name: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    """Exact count with tiktoken when it is installed, otherwise ~4 characters per token"""
+    if not text:
+        return 0
+    enc = _encoding(encoding)
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_tokens_many(texts: Sequence[str], encoding: str = DEFAULT_ENCODING) -> List[int]:
+    """``count_tokens`` for many texts at once; tiktoken encodes the batch on several threads"""
+    enc = _encoding(encoding)
+    if enc is None:
+        return [math.ceil(len(text) / 4) for text in texts]
+    return [len(tokens) for tokens in enc.encode_ordinary_batch(list(texts))]
@@ -0,0 +1,63 @@
+"""
+Rolling transcript window bounded by prompt tokens
+"""
+import threading
+from collections import deque
+
+from .tokens import count_tokens
+
+
+class TranscriptWindow:
+    """Most recent transcript chunks, capped at ``max_tokens``.
+
+    Each chunk is counted once when it is appended and the running total is
+    kept alongside the deque, so appending and evicting from the front are
+    O(1). The joined text is only built when it is read and is cached until
+    the window changes. The newest chunk is always kept, even if it alone
+    exceeds the budget.
+    """
+
+    def __init__(self, max_tokens: int = 500, counter=count_tokens):
+        self.max_tokens = max_tokens
+        self.counter = counter
+        self.tokens = 0
+        self.appended = 0
+        self.evicted = 0
+        self._chunks = deque()
+        self._text = ""
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __bool__(self):
+        return bool(self._chunks)
+
+    def append(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        tokens = self.counter(text)
+        with self._lock:
+            self._chunks.append((text, tokens))
+            self.tokens += tokens
+            self.appended += 1
+            while self.tokens > self.max_tokens and len(self._chunks) > 1:
+                _, dropped = self._chunks.popleft()
+                self.tokens -= dropped
+                self.evicted += 1
+            self._text = None
+
+    @property
+    def text(self) -> str:
+        """The window as one string, joined on first access after a change"""
+        with self._lock:
+            if self._text is None:
+                self._text = " ".join(chunk for chunk, _ in self._chunks)
+            return self._text
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self.tokens = 0
+            self._text = ""
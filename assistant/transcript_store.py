@@ -0,0 +1,159 @@
+"""
+Append-only transcript store on SQLite
+
+Committed transcript segments are written to ``transcripts.db`` under the
+data directory with their session, audio timestamps and topic. The
+database runs in WAL mode, so the UI (and the other desktop apps) can read
+while a pipeline writes, and segments are inserted in batches rather than
+one commit per chunk. Reads are keyed on the segment id: a view that
+remembers the last id it has seen only fetches newer rows, and resuming a
+session reads just its most recent rows.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import List
+
+from .paths import data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    app TEXT,
+    topic TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    start_seconds REAL,
+    end_seconds REAL,
+    text TEXT NOT NULL,
+    topic TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_by_session ON segments (session_id, id);
+"""
+
+_COLUMNS = "id, start_seconds, end_seconds, text, topic, created"
+
+
+class TranscriptStore:
+    """Durable transcript segments for every session of an app.
+
+    :meth:`append` only queues a segment; the queue is written in one
+    transaction once ``batch_size`` segments are waiting, the oldest has
+    waited ``flush_interval`` seconds, or before any read, so readers in
+    this process always see everything appended so far.
+    """
+
+    def __init__(self, path: str = None, app: str = None, batch_size: int = 32, flush_interval: float = 5.0):
+        self.path = path or os.path.join(data_dir(), "transcripts.db")
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(self, session_id: str, text: str, start: float = None, end: float = None, topic: str = None):
+        """Queue a segment for the next batch"""
+        text = text.strip()
+        if not text:
+            return
+        with self._lock:
+            self._pending.append((session_id, start, end, text, topic, time.time()))
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        rows, self._pending, self._pending_since = self._pending, [], None
+        sessions = {}
+        for session_id, _, _, _, topic, created in rows:
+            sessions[session_id] = (session_id, self.app, topic, created, created)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO sessions (session_id, app, topic, created, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET app = COALESCE(sessions.app, excluded.app), "
+                "topic = excluded.topic, updated = excluded.updated",
+                sessions.values(),
+            )
+            self._conn.executemany(
+                "INSERT INTO segments (session_id, start_seconds, end_seconds, text, topic, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.written += len(rows)
+        self.batches += 1
+
+    def read(self, session_id: str, after: int = 0, limit: int = None) -> List[dict]:
+        """Segments with an id greater than ``after``, oldest first"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM segments WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (session_id, after, -1 if limit is None else limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def tail(self, session_id: str, limit: int = 50) -> List[dict]:
+        """The newest ``limit`` segments, oldest first, read backwards through the session index"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM segments WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def text(self, session_id: str, separator: str = " ") -> str:
+        """The whole session transcript as one string, for export and final summaries"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT text FROM segments WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return separator.join(row["text"] for row in rows)
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            self._flush()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM segments WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def sessions(self) -> List[dict]:
+        """Sessions of this store's app (all apps if it has none), most recently updated first"""
+        query = "SELECT session_id, app, topic, created, updated FROM sessions"
+        params = ()
+        if self.app:
+            query += " WHERE app = ?"
+            params = (self.app,)
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(query + " ORDER BY updated DESC", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
@@ -0,0 +1,153 @@
+"""
+Novelty-driven scheduling of question generation
+
+Instead of calling the LLM every N chunks, :class:`QuestionTrigger` looks
+at what has been said since the last prompt and fires when it is different
+enough from the window that was last prompted on. A minimum interval stops
+bursts, a maximum interval guarantees fresh questions during a long
+monologue, and a per-session budget caps the total number of LLM calls.
+"""
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from .tokens import count_tokens
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can could did do
+does doing don't down during each few for from further had has have having he her here hers him his how i
+if in into is it it's its just let's like me more most my no nor not now of off on once only or other our
+out over own really right same she should so some such than that that's the their them then there these
+they this those through to too um uh under until up very was we well were what when where which while who
+whom why will with would yeah yes you your yours
+""".split())
+
+
+def lexical_sketch(text: str, dims: int = 1024) -> np.ndarray:
+    """Unit-length hashed bag of content words; cosine between sketches approximates topical overlap"""
+    ids = [zlib.crc32(w.encode()) % dims for w in _WORD.findall(text.lower())
+           if len(w) > 2 and w not in _STOPWORDS]
+    vector = np.bincount(ids, minlength=dims).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class TriggerDecision:
+    fire: bool
+    reason: str
+    novelty: float = None
+
+
+class QuestionTrigger:
+    """Decides after each transcript chunk whether to generate questions.
+
+    ``sketch`` turns text into a vector (a lexical sketch by default, or an
+    embedding function); novelty is one minus the cosine similarity between
+    the latest ``novelty_tokens`` of new speech and the last prompted
+    window. Only looking at the latest speech means a topic change is
+    noticed right away instead of being diluted by everything said since
+    the last prompt. Each firing is charged ``calls_per_trigger`` against
+    ``budget``.
+    """
+
+    def __init__(self, novelty_threshold: float = 0.5, min_interval: float = 20.0, max_interval: float = 90.0,
+                 min_new_tokens: int = 30, novelty_tokens: int = 80, budget: int = 60, calls_per_trigger: int = 2,
+                 sketch=lexical_sketch, clock=time.monotonic):
+        self.novelty_threshold = novelty_threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_new_tokens = min_new_tokens
+        self.novelty_tokens = novelty_tokens
+        self.budget = budget
+        self.calls_per_trigger = calls_per_trigger
+        self.sketch = sketch
+        self.clock = clock
+        self.calls = 0
+        self.fired = 0
+        self.skipped = 0
+        self.last_novelty = None
+        self._new_text = deque()  # (text, tokens) of the newest speech since the last firing
+        self._new_tokens = 0  # all speech since the last firing
+        self._kept_tokens = 0  # speech held in _new_text
+        self._prompted = None
+        self._last_fired = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.budget - self.calls)
+
+    def _novelty(self, text: str) -> float:
+        if self._prompted is None:
+            return 1.0
+        current = np.asarray(self.sketch(text), dtype=np.float32)
+        norm = np.linalg.norm(current) * np.linalg.norm(self._prompted)
+        if not norm:
+            return 0.0
+        return float(1.0 - np.dot(current, self._prompted) / norm)
+
+    def update(self, text: str, window) -> TriggerDecision:
+        """Record a new chunk; on firing, ``window.text`` becomes the reference for novelty"""
+        with self._lock:
+            if text:
+                tokens = count_tokens(text)
+                self._new_text.append((text, tokens))
+                self._new_tokens += tokens
+                self._kept_tokens += tokens
+                # Only the newest novelty_tokens are ever sketched; without a firing (e.g. once the
+                # budget is spent) older chunks would pile up for the rest of the session
+                while self._kept_tokens - self._new_text[0][1] >= self.novelty_tokens:
+                    self._kept_tokens -= self._new_text.popleft()[1]
+            decision = self._decide()
+            if decision.fire:
+                self.fired += 1
+                self.calls += self.calls_per_trigger
+                self._prompted = np.asarray(self.sketch(window.text), dtype=np.float32)
+                self._new_text.clear()
+                self._new_tokens = self._kept_tokens = 0
+                self._last_fired = self.clock()
+            else:
+                self.skipped += 1
+            return decision
+
+    def _decide(self) -> TriggerDecision:
+        if self.remaining < self.calls_per_trigger:
+            return TriggerDecision(False, "budget spent")
+        elapsed = self.clock() - self._last_fired
+        if elapsed < self.min_interval:
+            return TriggerDecision(False, "too soon")
+        if self._new_tokens < self.min_new_tokens:
+            return TriggerDecision(False, "not enough new speech")
+        latest = self._latest_text()
+        if not lexical_sketch(latest).any():
+            return TriggerDecision(False, "filler only")
+        if elapsed >= self.max_interval:
+            return TriggerDecision(True, "max interval")
+        # Only sketched here, after the cheap checks, in case the sketch is a remote embedding
+        self.last_novelty = self._novelty(latest)
+        if self.last_novelty >= self.novelty_threshold:
+            return TriggerDecision(True, "new topic", self.last_novelty)
+        return TriggerDecision(False, "same topic", self.last_novelty)
+
+    def _latest_text(self) -> str:
+        """Newest new speech, up to ``novelty_tokens``"""
+        parts, tokens = [], 0
+        for text, count in reversed(self._new_text):
+            if tokens >= self.novelty_tokens:
+                break
+            parts.append(text)
+            tokens += count
+        return " ".join(reversed(parts))
+
+    def describe(self) -> str:
+        part = f"questions: {self.fired} rounds, {self.remaining}/{self.budget} LLM calls left"
+        if self.last_novelty is not None:
+            part += f", novelty {self.last_novelty:.2f}"
+        return part
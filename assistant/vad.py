@@ -0,0 +1,103 @@
+"""
+Voice-activity detection gate in front of Whisper
+"""
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class VadConfig:
+    """Per-session VAD thresholds"""
+    frame_ms: int = 30
+    energy_threshold_db: float = -45.0  # frames quieter than this (dBFS) are silence
+    flatness_threshold: float = 0.45  # frames with a flatter spectrum are treated as noise
+    min_speech_ms: int = 300  # windows with less detected speech are skipped entirely
+    padding_ms: int = 200  # audio kept around detected speech when trimming
+    sample_rate: int = 16000
+
+
+class VoiceActivityDetector:
+    """Energy + spectral-flatness VAD, vectorized over fixed-size frames.
+
+    Speech frames must be loud enough *and* tonal enough (low spectral
+    flatness); broadband hiss and room noise fail the flatness test even when
+    they are loud.
+    """
+
+    def __init__(self, config: VadConfig = None):
+        self.config = config or VadConfig()
+        self.frame = int(self.config.sample_rate * self.config.frame_ms / 1000)
+        self._window = np.hanning(self.frame).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame, 1.0 / self.config.sample_rate)
+        # Restrict flatness to the speech band so DC offset and hiss above 4 kHz don't dominate
+        self._band = (freqs >= 100) & (freqs <= 4000)
+        self._lock = threading.Lock()
+        self.total_seconds = 0.0
+        self.skipped_seconds = 0.0
+        self.trimmed_seconds = 0.0
+        self.windows_seen = 0
+        self.windows_skipped = 0
+
+    def speech_mask(self, audio: np.ndarray) -> np.ndarray:
+        """Boolean speech decision per frame"""
+        n = len(audio) // self.frame
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        frames = audio[:n * self.frame].reshape(n, self.frame)
+
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1))[:, self._band] ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        return (energy_db > self.config.energy_threshold_db) & (flatness < self.config.flatness_threshold)
+
+    def _pad(self, mask: np.ndarray) -> np.ndarray:
+        pad = int(self.config.padding_ms / self.config.frame_ms)
+        if pad == 0 or not mask.any():
+            return mask
+        return np.convolve(mask.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode="same") > 0
+
+    def process(self, audio: np.ndarray, trim: bool = True):
+        """Return the speech span of ``audio`` (a view), or None if the window is silent.
+
+        With ``trim=False`` the whole window is returned when it contains speech.
+        """
+        sr = self.config.sample_rate
+        duration = len(audio) / sr
+        mask = self.speech_mask(audio)
+        speech_ms = int(mask.sum()) * self.config.frame_ms
+
+        with self._lock:
+            self.windows_seen += 1
+            self.total_seconds += duration
+            if speech_ms < self.config.min_speech_ms:
+                self.windows_skipped += 1
+                self.skipped_seconds += duration
+                return None
+            if not trim:
+                return audio
+
+            voiced = np.flatnonzero(self._pad(mask))
+            start = voiced[0] * self.frame
+            end = min(len(audio), (voiced[-1] + 1) * self.frame)
+            self.trimmed_seconds += (len(audio) - (end - start)) / sr
+        return audio[start:end]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "windows_seen": self.windows_seen,
+                "windows_skipped": self.windows_skipped,
+                "total_seconds": round(self.total_seconds, 1),
+                "skipped_seconds": round(self.skipped_seconds, 1),
+                "trimmed_seconds": round(self.trimmed_seconds, 1),
+            }
+
+    def describe(self) -> str:
+        """Short summary of how much audio never reached Whisper"""
+        stats = self.stats()
+        saved = stats["skipped_seconds"] + stats["trimmed_seconds"]
+        return (f"VAD skipped {stats['windows_skipped']}/{stats['windows_seen']} silent windows, "
+                f"{saved:.1f}s of {stats['total_seconds']:.1f}s audio not transcribed")
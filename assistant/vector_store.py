@@ -0,0 +1,490 @@
+"""
+Vector stores behind the Pinecone index interface
+
+The apps talk to their vector index through three calls: ``upsert(vectors=,
+namespace=)``, ``query(vector=, top_k=, include_metadata=, filter=,
+namespace=)`` returning an object with ``.matches``, and ``delete(ids= |
+filter= | delete_all=, namespace=)``. :class:`VectorStore` names that
+contract. :class:`PineconeStore` forwards it to a Pinecone index;
+:class:`LocalVectorStore` answers it on the laptop, so retrieval no longer
+waits on a network round trip.
+
+The local engine keeps unit-normalized float32 vectors in a memory-mapped
+matrix (``vectors.f32``) and ids and metadata in SQLite (``meta.db``), under
+``~/.audio_assistant/vectors/<name>/``. Once it holds ``train_threshold``
+vectors it builds an inverted-file (IVF) index: spherical k-means centroids
+partition the rows into ~2*sqrt(n) lists and a query only scores the rows
+of the ``nprobe`` lists closest to it. Namespaces and metadata filters become
+boolean masks over per-key value codes; when a filter leaves few rows those
+are scored exactly instead.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .paths import data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    id TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    UNIQUE (namespace, id)
+);
+"""
+
+
+class Match(dict):
+    """One query hit, readable as ``match["metadata"]`` or ``match.metadata`` like Pinecone's"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+@dataclass
+class QueryResponse:
+    matches: List[Match] = field(default_factory=list)
+    namespace: str = ""
+
+
+class VectorStore:
+    """The subset of the Pinecone index API the apps use"""
+
+    def upsert(self, vectors: Sequence[dict], namespace: str = None):
+        raise NotImplementedError
+
+    def query(self, vector: Sequence[float], top_k: int = 5, include_metadata: bool = False,
+              filter: dict = None, namespace: str = None):
+        raise NotImplementedError
+
+    def delete(self, ids: Sequence[str] = None, delete_all: bool = False, filter: dict = None,
+               namespace: str = None):
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return type(self).__name__
+
+
+class PineconeStore(VectorStore):
+    """Pass-through to a ``pinecone.Index``"""
+
+    def __init__(self, index, name: str = ""):
+        self.index = index
+        self.name = name
+
+    def upsert(self, vectors, namespace=None):
+        kwargs = {"namespace": namespace} if namespace else {}
+        return self.index.upsert(vectors=list(vectors), **kwargs)
+
+    def query(self, vector, top_k=5, include_metadata=False, filter=None, namespace=None):
+        kwargs = {"namespace": namespace} if namespace else {}
+        if filter:
+            kwargs["filter"] = filter
+        return self.index.query(vector=list(vector), top_k=top_k, include_metadata=include_metadata, **kwargs)
+
+    def delete(self, ids=None, delete_all=False, filter=None, namespace=None):
+        kwargs = {"namespace": namespace} if namespace else {}
+        if ids is not None:
+            kwargs["ids"] = list(ids)
+        if delete_all:
+            kwargs["delete_all"] = True
+        if filter:
+            kwargs["filter"] = filter
+        return self.index.delete(**kwargs)
+
+    def describe(self) -> str:
+        return f"vector store: Pinecone {self.name}".rstrip()
+
+
+def _code_value(value):
+    """Metadata values as dictionary keys; lists match ``$in`` element-wise in Pinecone but are rare here"""
+    return tuple(value) if isinstance(value, list) else value
+
+
+class LocalVectorStore(VectorStore):
+    """Embedded IVF vector index over a memory-mapped float32 matrix.
+
+    Scores are cosine similarities, like the apps' Pinecone indexes. Rows
+    freed by deletes are reused by later upserts. The IVF lists are rebuilt
+    in a background thread whenever the store has doubled since they were
+    last trained. One process should own a store at a time; every method is
+    thread-safe.
+    """
+
+    GROW_ROWS = 4096  # matrix grows in steps to keep remaps rare
+
+    def __init__(self, name: str, dimension: int = 1536, path: str = None, nprobe: int = 8,
+                 train_threshold: int = 4096, exact_rows: int = 2048):
+        self.name = name
+        self.dimension = dimension
+        self.path = path or data_dir("vectors", name)
+        os.makedirs(self.path, exist_ok=True)
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.exact_rows = exact_rows
+        self._lock = threading.RLock()
+        self._train_lock = threading.Lock()
+        self._written = None  # rows upserted while training, assigned to the new lists afterwards
+
+        self._conn = sqlite3.connect(os.path.join(self.path, "meta.db"), check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        rows = self._conn.execute("SELECT row, namespace, id, metadata FROM vectors ORDER BY row").fetchall()
+
+        self._size = rows[-1][0] + 1 if rows else 0
+        self._capacity = 0
+        self._matrix = None
+        self._assign = None
+        self._ensure_capacity(self._size)
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._namespace = np.full(self._capacity, -1, dtype=np.int32)
+        self._namespaces: Dict[str, int] = {}
+        self._ids: List[Optional[tuple]] = [None] * self._size
+        self._metadata: List[Optional[dict]] = [None] * self._size
+        self._rows: Dict[tuple, int] = {}
+        self._columns: Dict[str, tuple] = {}
+        for row, namespace, vector_id, metadata in rows:
+            self._ids[row] = (namespace, vector_id)
+            self._metadata[row] = json.loads(metadata)
+            self._rows[(namespace, vector_id)] = row
+            self._alive[row] = True
+            self._namespace[row] = self._namespace_code(namespace)
+        self._free = [row for row in range(self._size) if not self._alive[row]]
+
+        centroids_path = os.path.join(self.path, "centroids.npy")
+        self._centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._lists = None
+        self._trained_size = len(rows) if self._centroids is not None else 0
+
+    # -- storage --------------------------------------------------------------
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity and self._matrix is not None:
+            return
+        capacity = max(needed, self._capacity) + self.GROW_ROWS
+        for attr, filename, dtype, width in (("_matrix", "vectors.f32", np.float32, self.dimension),
+                                             ("_assign", "assign.i32", np.int32, 1)):
+            current = getattr(self, attr)
+            if current is not None:
+                current.flush()
+                setattr(self, attr, None)
+                del current
+            file_path = os.path.join(self.path, filename)
+            with open(file_path, "a+b") as f:
+                f.truncate(capacity * width * np.dtype(dtype).itemsize)
+            shape = (capacity, width) if width > 1 else (capacity,)
+            setattr(self, attr, np.memmap(file_path, dtype=dtype, mode="r+", shape=shape))
+        for attr, fill in (("_alive", False), ("_namespace", -1)):
+            if hasattr(self, attr):
+                current = getattr(self, attr)
+                grown = np.full(capacity, fill, dtype=current.dtype)
+                grown[:len(current)] = current
+                setattr(self, attr, grown)
+        self._capacity = capacity
+
+    def _namespace_code(self, namespace: str) -> int:
+        return self._namespaces.setdefault(namespace, len(self._namespaces))
+
+    def _column(self, key: str):
+        """Per-row value codes of one metadata key, built on first use and kept up to date by writes"""
+        if key not in self._columns:
+            codes = np.full(self._capacity, -1, dtype=np.int32)
+            values = {}
+            for row, metadata in enumerate(self._metadata):
+                if metadata is not None and key in metadata:
+                    codes[row] = values.setdefault(_code_value(metadata[key]), len(values))
+            self._columns[key] = (codes, values)
+        return self._columns[key]
+
+    def _write_columns(self, rows: List[int]):
+        for key, (codes, values) in list(self._columns.items()):
+            if len(codes) < self._capacity:
+                grown = np.full(self._capacity, -1, dtype=np.int32)
+                grown[:len(codes)] = codes
+                codes = grown
+                self._columns[key] = (codes, values)
+            for row in rows:
+                metadata = self._metadata[row]
+                codes[row] = (values.setdefault(_code_value(metadata[key]), len(values))
+                              if metadata is not None and key in metadata else -1)
+
+    # -- writes ---------------------------------------------------------------
+
+    def upsert(self, vectors, namespace=None):
+        namespace = namespace or ""
+        vectors = list(vectors)
+        if not vectors:
+            return {"upserted_count": 0}
+        matrix = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {matrix.shape[1]}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        with self._lock:
+            rows = []
+            for vector in vectors:
+                key = (namespace, vector["id"])
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._free.pop() if self._free else self._size
+                    if row == self._size:
+                        self._size += 1
+                        self._ids.append(None)
+                        self._metadata.append(None)
+                    self._rows[key] = row
+                rows.append(row)
+            self._ensure_capacity(self._size)
+            # Later duplicates of an id win, as they would in sequential upserts
+            self._matrix[rows] = matrix
+            if self._centroids is not None:
+                self._assign[rows] = np.argmax(matrix @ self._centroids.T, axis=1)
+            self._matrix.flush()
+            self._assign.flush()
+            self._lists = None
+            for vector, row in zip(vectors, rows):
+                self._ids[row] = (namespace, vector["id"])
+                self._metadata[row] = dict(vector.get("metadata") or {})
+                self._alive[row] = True
+                self._namespace[row] = self._namespace_code(namespace)
+            self._write_columns(rows)
+            # Metadata is committed after the vectors are on disk, so a crash never exposes a garbage row
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (row, namespace, id, metadata) VALUES (?, ?, ?, ?)",
+                    [(row, namespace, vector["id"], json.dumps(self._metadata[row], default=str))
+                     for vector, row in zip(vectors, rows)],
+                )
+            if self._written is not None:
+                self._written.extend(rows)
+            retrain = (self.count >= self.train_threshold and self.count >= 2 * self._trained_size
+                       and not self._train_lock.locked())
+        if retrain:
+            threading.Thread(target=self.train, name="ivf-train", daemon=True).start()
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, delete_all=False, filter=None, namespace=None):
+        namespace = namespace or ""
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[(namespace, i)] for i in ids if (namespace, i) in self._rows]
+            else:
+                if not delete_all and not filter:
+                    raise ValueError("delete needs ids, filter or delete_all=True")
+                rows = np.flatnonzero(self._mask(namespace, None if delete_all else filter)).tolist()
+            for row in rows:
+                del self._rows[self._ids[row]]
+                self._ids[row] = None
+                self._metadata[row] = None
+                self._alive[row] = False
+            self._lists = None
+            self._write_columns(rows)
+            self._free.extend(rows)
+            with self._conn:
+                self._conn.executemany("DELETE FROM vectors WHERE row = ?", [(row,) for row in rows])
+        return {}
+
+    # -- IVF ------------------------------------------------------------------
+
+    def train(self, iterations: int = 8, sample_per_list: int = 32, seed: int = 0):
+        """Rebuild the IVF centroids with spherical k-means over a sample of the stored vectors.
+
+        The clustering runs without holding the store lock, so queries and
+        upserts continue meanwhile; rows written during training are
+        assigned to the new lists when they are installed.
+        """
+        with self._train_lock:
+            with self._lock:
+                alive = np.flatnonzero(self._alive[:self._size])
+                matrix = self._matrix
+                self._written = []
+            if len(alive) < 2:
+                # Nothing to cluster; queries scan the few stored vectors directly
+                self._written = None
+                return
+            lists = max(int(2 * np.sqrt(len(alive))), 1)
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(alive, size=min(len(alive), lists * sample_per_list), replace=False))
+            sample = np.asarray(matrix[sample_rows])
+            lists = min(lists, len(sample))
+            centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+            for _ in range(iterations):
+                nearest = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, nearest, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # An empty list keeps its previous centroid
+                centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+            assign = np.full(len(matrix), -1, dtype=np.int32)
+            for start in range(0, len(alive), 8192):
+                block = alive[start:start + 8192]
+                assign[block] = np.argmax(np.asarray(matrix[block]) @ centroids.T, axis=1)
+            with self._lock:
+                written = np.asarray(sorted(set(self._written)), dtype=np.int64)
+                self._written = None
+                self._assign[:len(assign)] = assign
+                if len(written):
+                    self._assign[written] = np.argmax(np.asarray(self._matrix[written]) @ centroids.T, axis=1)
+                self._assign.flush()
+                np.save(os.path.join(self.path, "centroids.npy"), centroids)
+                self._centroids = centroids
+                self._trained_size = len(alive)
+                self._lists = None
+
+    def _inverted_lists(self):
+        """Rows of every IVF list as one array sorted by list, with each list's bounds"""
+        if self._lists is None:
+            alive = np.flatnonzero(self._alive[:self._size])
+            assign = self._assign[alive]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = (alive[order], bounds)
+        return self._lists
+
+    # -- reads ----------------------------------------------------------------
+
+    def _condition(self, key: str, condition) -> np.ndarray:
+        codes, values = self._column(key)
+        codes = codes[:self._size]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        mask = np.ones(self._size, dtype=bool)
+        for op, operand in condition.items():
+            if op in ("$eq", "$ne"):
+                hit = codes == values.get(_code_value(operand), -2)
+            elif op in ("$in", "$nin"):
+                hit = np.isin(codes, [values[v] for v in map(_code_value, operand) if v in values])
+            else:
+                raise ValueError(f"Unsupported filter operator {op}")
+            mask &= hit if op in ("$eq", "$in") else ~hit
+        return mask
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self._filter_mask(clause) for clause in condition])
+            else:
+                mask &= self._condition(key, condition)
+        return mask
+
+    def _mask(self, namespace: str, filter: dict = None) -> np.ndarray:
+        mask = self._alive[:self._size] & (self._namespace[:self._size] == self._namespaces.get(namespace, -2))
+        if filter:
+            mask &= self._filter_mask(filter)
+        return mask
+
+    def query(self, vector, top_k=5, include_metadata=False, filter=None, namespace=None):
+        namespace = namespace or ""
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            mask = self._mask(namespace, filter)
+            rows = np.flatnonzero(mask)
+            if self._centroids is not None and len(rows) > self.exact_rows:
+                probe = np.argpartition(-(self._centroids @ query), min(self.nprobe, len(self._centroids) - 1))
+                members, bounds = self._inverted_lists()
+                probed = np.concatenate([members[bounds[i]:bounds[i + 1]] for i in probe[:self.nprobe]])
+                probed = np.sort(probed[mask[probed]])
+                # A selective filter can empty the probed lists; fall back to scanning everything it allows
+                if len(probed) >= top_k:
+                    rows = probed
+            if len(rows) == 0:
+                return QueryResponse([], namespace)
+            scores = self._matrix[rows] @ query
+            best = np.argpartition(-scores, top_k - 1)[:top_k] if len(rows) > top_k else np.arange(len(rows))
+            best = best[np.argsort(-scores[best])]
+            matches = []
+            for i in best:
+                row = rows[i]
+                match = Match(id=self._ids[row][1], score=float(scores[i]))
+                if include_metadata:
+                    match["metadata"] = dict(self._metadata[row])
+                matches.append(match)
+        return QueryResponse(matches, namespace)
+
+    @property
+    def count(self) -> int:
+        return len(self._rows)
+
+    def describe(self) -> str:
+        lists = f"{len(self._centroids)} IVF lists" if self._centroids is not None else "exact search"
+        return f"vector store: local {self.name}, {self.count} vectors, {lists}"
+
+    def close(self):
+        with self._lock:
+            self._matrix.flush()
+            self._assign.flush()
+            self._conn.close()
+
+
+def benchmark(vectors: int = 100_000, dimension: int = 1536, queries: int = 200, clusters: int = 500,
+              top_k: int = 5) -> dict:
+    """Query latency and recall@k against exact search on clustered synthetic embeddings"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore("benchmark", dimension, path=path)
+        started = time.perf_counter()
+        for start in range(0, vectors, 10_000):
+            count = min(10_000, vectors - start)
+            data = centers[rng.integers(0, clusters, count)] + rng.standard_normal((count, dimension)).astype(
+                np.float32)
+            store.upsert([{"id": str(start + i), "values": row, "metadata": {"topic": f"t{(start + i) % 4}"}}
+                          for i, row in enumerate(data)])
+        # Waits for any background training, then clusters the complete set
+        store.train()
+        build_seconds = time.perf_counter() - started
+        probes = centers[rng.integers(0, clusters, queries)] + rng.standard_normal((queries, dimension)).astype(
+            np.float32)
+        latencies, hits = [], 0
+        matrix = np.asarray(store._matrix[:store._size])
+        for probe in probes:
+            started = time.perf_counter()
+            result = store.query(probe, top_k=top_k)
+            latencies.append(time.perf_counter() - started)
+            exact = np.argsort(-(matrix @ (probe / np.linalg.norm(probe))))[:top_k]
+            hits += len({str(i) for i in exact} & {match.id for match in result.matches})
+        filtered = []
+        for probe in probes[:50]:
+            started = time.perf_counter()
+            store.query(probe, top_k=top_k, filter={"topic": "t1"})
+            filtered.append(time.perf_counter() - started)
+        store.close()
+    return {
+        "vectors": vectors,
+        "build_seconds": round(build_seconds, 1),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "filtered_p50_ms": float(np.percentile(filtered, 50) * 1000),
+        "recall": hits / (queries * top_k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure local vector store query latency and recall")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Vectors to index")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args()
+    result = benchmark(args.vectors, args.dimension)
+    print(f"{result['vectors']} vectors (built in {result['build_seconds']} s): query p50 "
+          f"{result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, filtered p50 "
+          f"{result['filtered_p50_ms']:.2f} ms, recall@5 {result['recall']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,7 @@ def build_app(app_name, main_file, icon=None):
         "--windowed",
         "--name", app_name,
         "--add-data", f"{main_file}:.",
+        "--add-data", "assistant:assistant",
         "--hidden-import", "streamlit",
         "--hidden-import", "sounddevice",
         "--hidden-import", "whisper",
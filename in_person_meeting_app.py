@@ -9,19 +9,26 @@ import sys
 import streamlit as st
 import time
 import numpy as np
-import sounddevice as sd
-import whisper
 from uuid import uuid4
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
 import json
+import logging
 import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 import keyring
 import getpass
+from assistant import (LANGUAGES, METRICS, AdaptiveModelController, AudioCapture, AudioJournal, ContextAssembler,
+                       EmbeddingCache, EmbeddingService, HybridRanker, IngestionRegistry, LanguageLock, LexicalIndex,
+                       LivePipeline, LiveSession, LocalVectorStore, PineconeStore, PipelineState, QuestionTrigger,
+                       RemoteBackend, RetrievalContext, StreamingTranscriber, TokenChunker, TranscriptStore,
+                       TranscriptWindow, VadConfig, VectorWriter, VoiceActivityDetector, connect_or_spawn,
+                       content_digest, decode_options, format_timestamp, list_sessions, load_backend, new_session_id,
+                       open_journal, segments_text, session_dir, vector_id)
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=logging.INFO)
 
 # Page configuration
 st.set_page_config(
@@ -124,6 +131,11 @@ def setup_api_keys():
     
     st.stop()
 
+@st.cache_resource
+def get_local_vector_store(name):
+    """Embedded vector index under ~/.audio_assistant/vectors; queries never leave the machine"""
+    return LocalVectorStore(name, dimension=1536)
+
 def initialize_clients():
     """Initialize OpenAI and Pinecone clients"""
     try:
@@ -135,15 +147,17 @@ def initialize_clients():
         pinecone_api_key = keyring.get_password("in_person_meeting_assistant", "pinecone_api_key")
         pinecone_env = keyring.get_password("in_person_meeting_assistant", "pinecone_env") or "us-east-1"
         
-        if not openai_api_key or not pinecone_api_key:
+        if not openai_api_key or (not pinecone_api_key and VECTOR_STORE != "local"):
             st.error("API keys not found. Please restart the app.")
             st.stop()
         
         client = OpenAI(api_key=openai_api_key)
+        index_name = "in-person-meeting-assistant"
+        if VECTOR_STORE == "local":
+            return client, get_local_vector_store(index_name)
         pc = Pinecone(api_key=pinecone_api_key)
         
         # Create or get index
-        index_name = "in-person-meeting-assistant"
         try:
             index = pc.Index(index_name)
         except Exception:
@@ -160,7 +174,7 @@ def initialize_clients():
             )
             index = pc.Index(index_name)
         
-        return client, index
+        return client, PineconeStore(index, index_name)
         
     except Exception as e:
         st.error(f"Error initializing clients: {e}")
@@ -168,64 +182,164 @@ def initialize_clients():
 
 # Configuration
 RECORD_DURATION = 5  # seconds per recording chunk
-ROLLING_BUFFER_LIMIT = 12  # number of chunks before generating questions
-MODEL_NAME = "base"  # Whisper model size
+CONTEXT_PASSAGES = 3  # passages per prompt after hybrid keyword + vector reranking
+RETRIEVAL_CANDIDATES = 4 * CONTEXT_PASSAGES  # vector matches (with metadata) and keyword hits fetched for reranking
+CONTEXT_BUDGETS = {"questions": 600, "summary": 900}  # tokens of retrieved context per prompt, after de-duplication
+QUESTION_NOVELTY_THRESHOLD = 0.5  # how different new speech must be from the last prompted window (0-1)
+QUESTION_MIN_INTERVAL = 20  # seconds between question rounds, however much the topic moves
+QUESTION_MAX_INTERVAL = 90  # generate anyway after this long if there was enough new speech
+QUESTION_LLM_BUDGET = 60  # LLM calls per recording session for summaries and questions
+QUESTION_CALLS_PER_ROUND = 2  # LLM calls made by each question round
+NOVELTY_SKETCH = "lexical"  # "lexical" (local word sketch) or "embedding" (one embedding call per check)
+TRANSCRIPT_WINDOW_TOKENS = 500  # recent transcript kept for prompts (~3 minutes of speech)
+TRANSCRIPT_TAIL_SEGMENTS = 40  # recent segments shown live and reloaded when a session is resumed
+MODEL_NAME = "base"  # Whisper model size to start with
+ADAPTIVE_MODEL_SIZE = True  # switch between tiny/base/small based on measured real-time factor
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")  # "pinecone" or "local" (embedded IVF index, no network)
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper")  # "whisper" (openai-whisper) or "faster-whisper" (CTranslate2 int8)
+# Share one warm model across all desktop apps; off in bundled builds, which cannot start the daemon
+USE_ASR_DAEMON = os.getenv("ASR_DAEMON", "0" if getattr(sys, "frozen", False) else "1") != "0"
+TRANSCRIPTION_MODE = "streaming"  # "streaming" (incremental, low latency) or "chunked" (one decode per chunk)
+STREAM_STEP_SECONDS = 1.0  # audio added per incremental decode in streaming mode
+PIPELINE_QUEUE_SIZE = 4  # max pending items per stage before the oldest is dropped
+LIVE_REFRESH_SECONDS = 0.5  # how often the live results fragment polls the background session
+LANGUAGE_DETECT_SECONDS = 8.0  # speech heard before the session language is detected and locked
+LIVE_DECODE_PROFILE = "live"  # greedy single-pass decoding while recording
+POST_SESSION_DECODE_PROFILE = "accurate"  # beam search with fallback when re-transcribing a session
+SESSION_APP = "in_person_meeting"  # recorded audio is journaled under ~/.audio_assistant/sessions/in_person_meeting/
+JOURNAL_SYNC_SECONDS = 5.0  # recorded audio is made durable this often; a crash loses at most this much
 
 @st.cache_resource
-def load_whisper_model():
-    """Load Whisper model for transcription"""
-    return whisper.load_model(MODEL_NAME)
+def load_asr_backend():
+    """Load the speech-recognition backend, through the shared transcription daemon when possible"""
+    use_daemon = USE_ASR_DAEMON
+    if use_daemon:
+        try:
+            connect_or_spawn(ASR_BACKEND, MODEL_NAME)
+        except Exception as e:
+            use_daemon = False
+            st.warning(f"Transcription daemon unavailable ({e}); loading the model in this app instead.")
+    
+    def load_model(model_name):
+        if use_daemon:
+            return RemoteBackend(model_name, ASR_BACKEND)
+        return load_backend(ASR_BACKEND, model_name)
+    
+    if ADAPTIVE_MODEL_SIZE:
+        return AdaptiveModelController(load_model, initial=MODEL_NAME)
+    return load_model(MODEL_NAME)
+
+def retranscribe_session(session_id, model_name, start_seconds, end_seconds, language=None):
+    """Re-run recognition over part of a recorded session with a chosen model"""
+    # Read-only, so a session that is being recorded in the background is never rewritten or truncated
+    journal = AudioJournal(session_dir(SESSION_APP, session_id), read_only=True)
+    try:
+        if USE_ASR_DAEMON:
+            backend = connect_or_spawn(ASR_BACKEND, model_name)
+        else:
+            backend = load_backend(ASR_BACKEND, model_name)
+        options = decode_options(POST_SESSION_DECODE_PROFILE, language=language)
+        return segments_text(list(journal.retranscribe(backend, start_seconds, end_seconds, **options)))
+    finally:
+        journal.close()
 
 def chunk_text(text, max_tokens=500):
-    """Split text into chunks for processing"""
-    words = text.split()
-    return [" ".join(words[i:i+max_tokens]) for i in range(0, len(words), max_tokens)]
+    """Split text into overlapping token-bounded chunks that end at page, paragraph or sentence breaks"""
+    return TokenChunker(max_tokens).split(text)
+
+@st.cache_resource
+def get_embedding_cache():
+    """Embeddings already computed by any of the apps (~/.audio_assistant/embeddings.db)"""
+    return EmbeddingCache()
+
+@st.cache_resource
+def get_embedding_service(_client):
+    """Batched embedding requests shared by every caller in the app, checked against the cache first"""
+    return EmbeddingService(_client, cache=get_embedding_cache())
 
 def get_embedding(client, text):
     """Get embedding for text using OpenAI"""
-    response = client.embeddings.create(
-        input=[text],
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
-
-def embed_and_upsert(client, index, text, topic):
-    """Embed text and store in Pinecone"""
-    for chunk in chunk_text(text):
-        vector = get_embedding(client, chunk)
-        index.upsert([{
-            "id": str(uuid4()),
-            "values": vector,
-            "metadata": {"text": chunk, "topic": topic, "app": "in_person_meeting"}
-        }])
-
-def query_context(client, index, query, topic):
-    """Query context from Pinecone"""
-    vector = get_embedding(client, query)
+    return get_embedding_service(client).embed_one(text)
+
+@st.cache_resource
+def get_vector_writer(_index):
+    """Batched, retried upserts shared by every caller in the app"""
+    return VectorWriter(_index)
+
+def embed_and_upsert(client, index, text, topic, source=None):
+    """Embed text and store in Pinecone; storing the same source again overwrites its vectors"""
+    chunks = chunk_text(text)
+    # A few multi-input requests instead of one round trip per chunk
+    vectors = get_embedding_service(client).embed([chunk.text for chunk in chunks])
+    source = source or content_digest(text.encode())
+    vector_ids = get_vector_writer(index).upsert([{
+        "id": vector_id(ingestion_scope(topic), source, chunk.start),
+        "values": vector,
+        "metadata": {"text": chunk.text, "topic": topic, "app": "in_person_meeting",
+                     "start": chunk.start, "end": chunk.end}
+    } for chunk, vector in zip(chunks, vectors)])
+    # Same passages under the same ids in the keyword index, for hybrid retrieval
+    get_lexical_index().add(ingestion_scope(topic), zip(vector_ids, [chunk.text for chunk in chunks]))
+    return vector_ids
+
+@st.cache_resource
+def get_lexical_index():
+    """BM25 keyword index of every stored passage (~/.audio_assistant/lexical.db)"""
+    return LexicalIndex()
+
+@st.cache_resource
+def get_ingestion_registry():
+    """Documents already embedded, per topic (~/.audio_assistant/ingested.db)"""
+    return IngestionRegistry()
+
+def ingestion_scope(topic):
+    return f"{SESSION_APP}:{topic}"
+
+def reingest_document(index, digest, topic):
+    """Re-ingest button callback: delete the document's vectors so the next run embeds it again"""
+    record = get_ingestion_registry().forget(digest, ingestion_scope(topic))
+    if record:
+        for i in range(0, len(record["vector_ids"]), 1000):
+            index.delete(ids=record["vector_ids"][i:i + 1000])
+        get_lexical_index().delete(ingestion_scope(topic), record["vector_ids"])
+
+def retrieval_context(client, index, topic):
+    """Query embedding and hybrid-ranked matches shared by every prompt built in one interaction"""
+    def search(vector, top_k):
+        with METRICS.time("vector_query"):
+            response = index.query(
+                vector=vector, 
+                top_k=top_k, 
+                include_metadata=True,
+                filter={"topic": topic}
+            )
+        return response.matches
+    ranker = HybridRanker(get_lexical_index(), ingestion_scope(topic), candidates=RETRIEVAL_CANDIDATES)
+    return RetrievalContext(lambda text: get_embedding(client, text), search, ranker=ranker,
+                            assembler=ContextAssembler())
+
+def query_context(client, index, query, topic, retrieval=None, budget=None):
+    """Query context from Pinecone, packed into ``budget`` tokens"""
+    retrieval = retrieval or retrieval_context(client, index, topic)
     try:
-        response = index.query(
-            vector=vector, 
-            top_k=5, 
-            include_metadata=True,
-            filter={"topic": topic}
-        )
-        return "\n".join([match['metadata']['text'] for match in response.matches])
+        return retrieval.context(query, CONTEXT_PASSAGES, budget)
     except Exception:
         return ""
 
 def summarize_and_append(client, index, transcript, topic):
     """Summarize transcript and store in vector database"""
     summary_prompt = f"Summarize this in-person meeting transcript:\n\n{transcript}"
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": summary_prompt}]
-    )
+    with METRICS.time("chat.summary"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": summary_prompt}]
+        )
     summary = response.choices[0].message.content.strip()
     embed_and_upsert(client, index, summary, topic)
 
-def generate_questions(client, index, transcript, topic, prompt_override=None):
+def generate_questions(client, index, transcript, topic, prompt_override=None, retrieval=None):
     """Generate intelligent questions based on transcript and context"""
-    context = query_context(client, index, transcript, topic)
+    context = query_context(client, index, transcript, topic, retrieval, CONTEXT_BUDGETS["questions"])
     
     full_prompt = f"""
 You are an expert meeting facilitator listening to an in-person meeting. Your goal is to generate 5 intelligent, context-specific questions that will help the speaker (me) sound informed and drive the conversation forward.
@@ -255,15 +369,16 @@ Generate 5 intelligent, meeting-focused questions:"""
     if prompt_override:
         full_prompt += f"\n\nAdditional Context: {prompt_override}"
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": full_prompt.strip()}]
-    )
+    with METRICS.time("chat.questions"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": full_prompt.strip()}]
+        )
     return response.choices[0].message.content.strip()
 
-def generate_meeting_summary(client, index, transcript, topic):
+def generate_meeting_summary(client, index, transcript, topic, retrieval=None):
     """Generate comprehensive meeting summary"""
-    context = query_context(client, index, transcript, topic)
+    context = query_context(client, index, transcript, topic, retrieval, CONTEXT_BUDGETS["summary"])
     
     summary_prompt = f"""
 Based on this in-person meeting transcript, generate a comprehensive meeting summary:
@@ -288,35 +403,252 @@ Generate a structured summary including:
 
 Format as a clear, professional meeting summary:"""
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": summary_prompt.strip()}]
-    )
+    with METRICS.time("chat.meeting_summary"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": summary_prompt.strip()}]
+        )
     return response.choices[0].message.content.strip()
 
-def record_audio(duration=RECORD_DURATION, sample_rate=16000):
-    """Record audio from microphone"""
-    try:
-        # Record audio
-        audio = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=1, dtype='float32')
-        sd.wait()
+@st.cache_resource
+def get_audio_capture(sample_rate=16000):
+    """Shared microphone capture stream; it stays open while any recording still holds a reader"""
+    return AudioCapture(sample_rate=sample_rate)
+
+@st.cache_resource
+def get_transcript_store():
+    """Durable transcript segments of every session (~/.audio_assistant/transcripts.db)"""
+    return TranscriptStore(app=SESSION_APP)
+
+def transcript_tail(store, session_id):
+    """Recent segments of a session; after the first call only segments newer than the last one seen are read"""
+    view = st.session_state.get("transcript_view")
+    if view is None or view["session_id"] != session_id:
+        view = st.session_state.transcript_view = {
+            "session_id": session_id,
+            "segments": deque(store.tail(session_id, TRANSCRIPT_TAIL_SEGMENTS), maxlen=TRANSCRIPT_TAIL_SEGMENTS),
+        }
+    else:
+        last_id = view["segments"][-1]["id"] if view["segments"] else 0
+        view["segments"].extend(store.read(session_id, after=last_id))
+    return view["segments"]
+
+def transcribe_audio(asr_backend, audio_np, **options):
+    """Transcribe audio using the configured Whisper backend"""
+    return segments_text(asr_backend.transcribe(audio_np, **options))
+
+def build_live_pipeline(client, index, asr_backend, topic, custom_prompt, cursor, vad_config=None, sample_rate=16000,
+                        journal=None, language_lock=None, store=None, session_id=None, history=()):
+    """Run capture, transcription and question generation on separate workers, reading audio from ``cursor``"""
+    language_lock = language_lock or LanguageLock(asr_backend, LANGUAGE_DETECT_SECONDS, sample_rate)
+    streamer = None
+    if TRANSCRIPTION_MODE == "streaming":
+        # Committed words go to the transcript, window and trigger on every step, not every RECORD_DURATION
+        streamer = StreamingTranscriber(asr_backend, sample_rate, **decode_options(LIVE_DECODE_PROFILE))
+    window = int((STREAM_STEP_SECONDS if streamer else RECORD_DURATION) * sample_rate)
+    state = PipelineState(live_transcript="", latest_transcript=None, questions="")
+    transcript_window = TranscriptWindow(TRANSCRIPT_WINDOW_TOKENS)
+    for text in history:
+        # A resumed session prompts with where it left off
+        transcript_window.append(text)
+    question_trigger = QuestionTrigger(
+        novelty_threshold=QUESTION_NOVELTY_THRESHOLD,
+        min_interval=QUESTION_MIN_INTERVAL,
+        max_interval=QUESTION_MAX_INTERVAL,
+        budget=QUESTION_LLM_BUDGET,
+        calls_per_trigger=QUESTION_CALLS_PER_ROUND,
+        **({"sketch": lambda text: get_embedding(client, text)} if NOVELTY_SKETCH == "embedding" else {}),
+    )
+    vad = VoiceActivityDetector(vad_config or VadConfig(sample_rate=sample_rate))
+    # Session audio time, continuing from the journal when a session is resumed
+    audio_seconds = journal.duration if journal is not None else 0.0
+    segment_start = audio_seconds
+    
+    dropped = 0
+    
+    def capture_window():
+        nonlocal audio_seconds, dropped
+        audio_np = cursor.read(window, timeout=0.1)
+        if audio_np is None or pipeline.stopped:
+            # After Stop, a new run may already be appending to the same journal
+            return None
+        # Samples the cursor skipped after falling a whole buffer behind
+        gap, dropped = cursor.dropped - dropped, cursor.dropped
+        if journal is not None:
+            # Every captured window goes to disk so a crashed session can be resumed
+            with METRICS.time("journal"):
+                if gap:
+                    # Skipped audio is stored as silence so journal offsets stay on the wall-clock timeline
+                    journal.append(np.zeros(gap, dtype=np.float32), gap=True)
+                record = journal.append(audio_np, dropped=cursor.dropped)
+            audio_seconds = record["end"] / sample_rate
+        else:
+            audio_seconds += (gap + len(audio_np)) / sample_rate
+        return audio_np, time.monotonic(), audio_seconds
+    
+    def transcribe_stage(captured):
+        audio_np, captured_at, audio_end = captured
+        # Time the window waited behind a busy transcriber
+        METRICS.record("capture_queue", time.monotonic() - captured_at)
         
-        # Convert to numpy array
-        audio_np = np.squeeze(audio)
+        # Skip dead air and trim silence before it reaches Whisper
+        with METRICS.time("vad"):
+            speech = vad.process(audio_np, trim=streamer is None)
+        state.update(vad=vad.describe())
         
-        return audio_np
-    except Exception as e:
-        st.error(f"Audio recording error: {e}")
-        return None
+        # Detect the language once over the first seconds of speech, then skip detection per chunk
+        if speech is not None and not language_lock.locked:
+            language_lock.observe(speech)
+        state.update(language=language_lock.describe())
+        options = decode_options(LIVE_DECODE_PROFILE, **language_lock.options())
+        
+        if streamer is not None:
+            streamer.decode_options = options
+            text = stream_step(audio_np, speech)
+        elif speech is None:
+            return None
+        else:
+            with METRICS.time("transcribe", audio_seconds=len(speech) / sample_rate):
+                text = transcribe_audio(asr_backend, speech, **options)
+        return (text, captured_at, audio_end) if text else None
+    
+    def stream_step(audio_np, speech):
+        with METRICS.time("transcribe", audio_seconds=len(audio_np) / sample_rate):
+            # A silent step is a natural boundary: commit whatever is pending
+            if speech is None:
+                text = streamer.flush()
+            else:
+                streamer.insert_audio(audio_np)
+                text = streamer.process()
+        state.update(live_transcript=streamer.preview)
+        return text
+    
+    def question_stage(transcribed):
+        nonlocal segment_start
+        text, captured_at, audio_end = transcribed
+        if store is not None:
+            # Text is committed at the end of the window that completed it, so a segment
+            # spans from the previous commit to that window's end
+            store.append(session_id, text, start=segment_start, end=audio_end, topic=topic)
+            segment_start = audio_end
+        # Bounded by tokens: the oldest chunks drop off once the prompt budget is reached
+        transcript_window.append(text)
+        state.update(latest_transcript=transcript_window)
+        
+        # Generate questions when the conversation has moved on, within the interval and budget limits
+        decision = question_trigger.update(text, transcript_window)
+        state.update(trigger=question_trigger.describe())
+        if decision.fire:
+            joined_text = transcript_window.text
+            summarize_and_append(client, index, joined_text, topic)
+            retrieval = retrieval_context(client, index, topic)
+            questions = generate_questions(client, index, joined_text, topic, custom_prompt, retrieval)
+            state.update(questions=questions)
+            # End to end: from the newest speech in the window to questions on screen
+            METRICS.record("speech_to_question", time.monotonic() - captured_at)
+    
+    pipeline = LivePipeline(
+        capture_window,
+        [("transcribe", transcribe_stage), ("questions", question_stage)],
+        queue_size=PIPELINE_QUEUE_SIZE,
+        state=state,
+    )
+    if isinstance(asr_backend, AdaptiveModelController):
+        # Transcription backlog is the other signal for stepping the model size down
+        asr_backend.backlog_fn = lambda: pipeline.queue_depths()["transcribe"]
+    return pipeline
 
-def transcribe_audio(whisper_model, audio_np):
-    """Transcribe audio using Whisper"""
-    try:
-        result = whisper_model.transcribe(audio_np, fp16=False)
-        return result["text"].strip()
-    except Exception as e:
-        st.error(f"Transcription error: {e}")
-        return ""
+# Not bounded: the live fragment keeps the LiveSession it was handed instead of calling this again,
+# so an evicted entry would leave its pipeline and microphone reader running with nothing to stop them
+@st.cache_resource
+def get_live_session(session_key):
+    """Background recording session for one browser session, kept across script reruns"""
+    return LiveSession()
+
+def current_live_session():
+    """This browser session's recorder; the key is kept in the URL so a page reload reattaches to it"""
+    if "session" not in st.query_params:
+        st.query_params["session"] = uuid4().hex
+    return get_live_session(st.query_params["session"])
+
+def start_recording(live_session, client, index, asr_backend, topic, custom_prompt, vad_config, language):
+    """Start button callback: starts the workers and returns without waiting for audio"""
+    if live_session.running:
+        return
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = new_session_id(SESSION_APP)
+    session_id = st.session_state.session_id
+    # This run's own journal handle and microphone cursor: a previous run that is still finishing
+    # releases only its own, so Start never waits for it
+    capture = get_audio_capture()
+    cursor = capture.open_reader()
+    journal = open_journal(session_dir(SESSION_APP, session_id), sync_interval=JOURNAL_SYNC_SECONDS)
+    language_lock = LanguageLock(asr_backend, LANGUAGE_DETECT_SECONDS, language=language)
+    store = get_transcript_store()
+    history = [segment["text"] for segment in store.tail(session_id, TRANSCRIPT_TAIL_SEGMENTS)]
+    live_session.start(
+        lambda: build_live_pipeline(client, index, asr_backend, topic, custom_prompt, cursor, vad_config,
+                                    journal=journal, language_lock=language_lock,
+                                    store=store, session_id=session_id, history=history),
+        # Run once the workers have exited, so the journal is not closed under the capture thread
+        on_stop=[journal.close, store.flush, lambda: capture.release(cursor)],
+        language_lock=language_lock,
+        session_id=session_id,
+    )
+
+def reset_session(live_session):
+    """Reset button callback: stop recording and forget the session's results"""
+    live_session.reset()
+    st.session_state.pop("session_id", None)
+
+def resume_session(live_session, session_id):
+    """Resume button callback: the next Start appends to this session's audio and transcript"""
+    live_session.reset()
+    st.session_state.session_id = session_id
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_live_session(live_session, asr_backend):
+    """Live transcript, questions and status, redrawn from the session snapshot without rerunning the page"""
+    if not live_session.running:
+        if st.session_state.get("live_rendering"):
+            # Stopped outside this page run (e.g. from another tab): rerun to show the final results
+            st.session_state.live_rendering = False
+            st.rerun()
+        return
+    snapshot = live_session.snapshot()
+    
+    st.markdown("""
+    <div class="recording-indicator">
+        🔴 RECORDING - Click "Stop Recording" to stop
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if snapshot.get("live_transcript"):
+        st.markdown(f"**🎙️ Live:** {snapshot['live_transcript']}")
+    segments = transcript_tail(get_transcript_store(), live_session.context["session_id"])
+    if segments:
+        window = snapshot.get("latest_transcript")
+        lines = "\n\n".join(f"`{format_timestamp(segment['end_seconds'] or 0)}` {segment['text']}"
+                            for segment in segments)
+        st.markdown(f"**📝 Transcript** ({window.tokens if window else 0} tokens in the prompt window):\n\n{lines}")
+    if snapshot.get("questions"):
+        st.markdown(f"**🤝 Meeting Questions:**\n{snapshot['questions']}")
+    if snapshot.get("error"):
+        st.warning(f"⚠️ {snapshot['error']}")
+    
+    status = (f"🎙️ {get_audio_capture().stream_format} · {live_session.describe()} · "
+              f"{snapshot.get('vad', '')} · {snapshot.get('language', '')} · {snapshot.get('trigger', '')}")
+    if asr_backend.last_rtf is not None:
+        status += f" · {asr_backend.label} RTF {asr_backend.last_rtf:.2f}"
+    st.caption(f"{status} · started in {live_session.last_transition_ms:.0f} ms")
+
+def render_latency(placeholder):
+    """Per-stage latency percentiles for the sidebar Usage panel"""
+    rows = METRICS.rows()
+    if rows:
+        placeholder.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        placeholder.caption("Latency percentiles appear once the assistant starts working.")
 
 def main():
     """Main In-Person Meeting Assistant function"""
@@ -327,8 +659,13 @@ def main():
     # Initialize clients
     client, index = initialize_clients()
     
-    # Load Whisper model
-    whisper_model = load_whisper_model()
+    # Load speech-recognition backend
+    asr_backend = load_asr_backend()
+    
+    # Recording runs in the background; a rerun or page reload reattaches to it
+    live_session = current_live_session()
+    if live_session.running:
+        st.session_state.session_id = live_session.context["session_id"]
     
     # Main app interface
     st.markdown("""
@@ -356,10 +693,57 @@ def main():
         if st.button("🗑️ Clear Topic Data"):
             try:
                 index.delete(filter={"topic": topic})
+                get_ingestion_registry().forget_scope(ingestion_scope(topic))
+                get_lexical_index().delete(ingestion_scope(topic))
                 st.success(f"Cleared data for topic: {topic}")
             except Exception as e:
                 st.error(f"Error clearing data: {e}")
         
+        language = st.selectbox(
+            "Language", [None] + list(LANGUAGES),
+            format_func=lambda code: "Auto-detect" if code is None else LANGUAGES[code],
+            help=f"Auto-detect listens to the first {LANGUAGE_DETECT_SECONDS:.0f} s of speech, "
+                 "then keeps that language for the rest of the session",
+        )
+        
+        with st.expander("🎚️ Voice Detection"):
+            vad_config = VadConfig(
+                energy_threshold_db=st.slider("Silence threshold (dBFS)", -70, -20, -45,
+                                              help="Audio quieter than this is treated as silence"),
+                flatness_threshold=st.slider("Noise flatness cutoff", 0.1, 0.9, 0.45, 0.05,
+                                             help="Lower values reject more background noise"),
+                min_speech_ms=st.slider("Minimum speech per chunk (ms)", 0, 2000, 300, 50,
+                                        help="Chunks with less speech are not transcribed"),
+            )
+        
+        with st.expander("🗂️ Sessions"):
+            sessions = list_sessions(SESSION_APP)
+            session_ids = [s["session_id"] for s in sessions]
+            current = st.session_state.get("session_id")
+            choice = st.selectbox("Recorded sessions", ["New session"] + session_ids,
+                                  index=session_ids.index(current) + 1 if current in session_ids else 0,
+                                  help="Pick a session to resume recording into it or re-transcribe it")
+            if choice != "New session":
+                duration = sessions[session_ids.index(choice)]["duration"]
+                st.caption(f"{duration / 60:.1f} min of audio, "
+                           f"{get_transcript_store().count(choice)} transcript segments recorded")
+                if choice != current and not live_session.running:
+                    st.button("⏪ Resume Session", on_click=resume_session, args=(live_session, choice),
+                              help="Start Recording will continue this session's audio and transcript")
+                if duration > 0 and not live_session.running:
+                    retranscribe_model = st.selectbox("Model", ["small", "medium", "large"],
+                                                      help="Usually larger than the live model, for a cleaner transcript")
+                    time_range = st.slider("Range (s)", 0.0, duration, (0.0, duration))
+                    if st.button("🔁 Re-transcribe"):
+                        with st.spinner("Re-transcribing recorded audio..."):
+                            st.session_state.retranscript = retranscribe_session(
+                                choice, retranscribe_model, *time_range, language=language
+                            )
+                    if st.session_state.get("retranscript"):
+                        st.text_area("Re-transcribed", st.session_state.retranscript, height=150)
+            elif not live_session.running:
+                st.session_state.pop("session_id", None)
+        
         st.divider()
         
         st.header("📊 Meeting Features")
@@ -373,6 +757,20 @@ def main():
         - 💾 Knowledge base
         """)
         
+        latency_display = st.empty()
+        render_latency(latency_display)
+        st.caption(get_embedding_service(client).describe())
+        st.caption(index.describe())
+        st.caption(get_vector_writer(index).describe())
+        if METRICS.counters():
+            st.caption(" · ".join(f"{name}: {count}" for name, count in METRICS.counters().items()))
+        st.download_button(
+            "📥 Export Latency (JSON)",
+            METRICS.to_json(),
+            file_name=f"{SESSION_APP}_latency_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+        )
+        
         st.markdown("""
         <div class="meeting-tip">
             <strong>💡 Meeting Tip:</strong>
@@ -388,10 +786,22 @@ def main():
         uploaded_file = st.file_uploader("📄 Upload Meeting Documents", type="pdf", 
                                        help="Upload agendas, project docs, or previous meeting notes")
         if uploaded_file:
-            pdf = PdfReader(uploaded_file)
-            raw_text = "\n".join([page.extract_text() for page in pdf.pages])
-            embed_and_upsert(client, index, raw_text, topic)
-            st.success("✅ Document uploaded and embedded in your knowledge base!")
+            # The file stays in the uploader across reruns; embed it once per topic
+            digest = content_digest(uploaded_file.getvalue())
+            ingested = get_ingestion_registry().lookup(digest, ingestion_scope(topic))
+            if ingested is None:
+                pdf = PdfReader(uploaded_file)
+                # Form feeds mark the page breaks for the chunker
+                raw_text = "\f".join([page.extract_text() for page in pdf.pages])
+                vector_ids = embed_and_upsert(client, index, raw_text, topic, source=digest)
+                get_ingestion_registry().record(digest, ingestion_scope(topic), uploaded_file.name, vector_ids)
+                st.success("✅ Document uploaded and embedded in your knowledge base!")
+            else:
+                ingested_at = datetime.datetime.fromtimestamp(ingested["ingested"]).strftime("%Y-%m-%d %H:%M")
+                st.info(f"📚 {ingested['name']} is already in the knowledge base for this topic "
+                        f"({len(ingested['vector_ids'])} chunks, added {ingested_at}).")
+                st.button("🔁 Re-ingest", on_click=reingest_document, args=(index, digest, topic),
+                          help="Delete this document's vectors and embed it again")
         
         # Custom prompt
         custom_prompt = st.text_area("💭 Meeting Context (Optional)", 
@@ -404,96 +814,47 @@ def main():
         
         col_start, col_stop = st.columns(2)
         
+        # Callbacks only start or signal the background session, so a click takes effect immediately
         with col_start:
-            start_button = st.button("🔴 Start Recording", type="primary")
+            st.button("🔴 Start Recording", type="primary", disabled=live_session.running,
+                      on_click=start_recording,
+                      args=(live_session, client, index, asr_backend, topic, custom_prompt, vad_config, language))
         
         with col_stop:
-            stop_button = st.button("⏹️ Stop Recording")
+            st.button("⏹️ Stop Recording", disabled=not live_session.running, on_click=live_session.stop)
         
-        if st.button("🔄 Reset Session"):
-            st.session_state.recording = False
-            st.session_state.transcript_buffer = []
-            st.session_state.all_transcripts = []
-            st.rerun()
-    
-    # Initialize session state
-    if "recording" not in st.session_state:
-        st.session_state.recording = False
-    if "transcript_buffer" not in st.session_state:
-        st.session_state.transcript_buffer = []
-    if "all_transcripts" not in st.session_state:
-        st.session_state.all_transcripts = []
+        st.button("🔄 Reset Session", on_click=reset_session, args=(live_session,))
     
-    # Recording logic
-    if start_button:
-        st.session_state.recording = True
+    if live_session.running:
+        # A sidebar change reruns the script; apply the override to the running session
+        live_session.context["language_lock"].set(language)
     
-    if stop_button:
-        st.session_state.recording = False
-    
-    # Display areas
-    transcript_display = st.empty()
-    question_display = st.empty()
-    summary_display = st.empty()
-    status_display = st.empty()
-    
-    # Main recording loop
-    if st.session_state.recording:
-        try:
-            while st.session_state.recording:
-                status_display.markdown("""
-                <div class="recording-indicator">
-                    🔴 RECORDING - Click "Stop Recording" to stop
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Record audio
-                audio_np = record_audio()
-                if audio_np is not None:
-                    # Transcribe audio
-                    text = transcribe_audio(whisper_model, audio_np)
-                    
-                    if text and text.strip():
-                        st.session_state.all_transcripts.append(text)
-                        st.session_state.transcript_buffer.append(text)
-                        
-                        # Keep buffer size manageable
-                        if len(st.session_state.transcript_buffer) > ROLLING_BUFFER_LIMIT:
-                            st.session_state.transcript_buffer.pop(0)
-                        
-                        # Display current transcript
-                        joined_text = " ".join(st.session_state.transcript_buffer)
-                        transcript_display.markdown(f"**📝 Latest Transcript:**\n{joined_text}")
-                        
-                        # Generate questions periodically
-                        if len(st.session_state.all_transcripts) % ROLLING_BUFFER_LIMIT == 0:
-                            summarize_and_append(client, index, joined_text, topic)
-                            questions = generate_questions(client, index, joined_text, topic, custom_prompt)
-                            question_display.markdown(f"**🤝 Meeting Questions:**\n{questions}")
-                
-                time.sleep(0.1)  # Small delay to prevent UI freezing
-                
-        except KeyboardInterrupt:
-            st.session_state.recording = False
-            status_display.success("✅ Recording stopped.")
+    # Live results: the workers do the heavy lifting, the fragment only polls their snapshot
+    st.session_state.live_rendering = live_session.running
+    render_live_session(live_session, asr_backend)
     
     # Display final results
-    if st.session_state.all_transcripts and not st.session_state.recording:
+    final_session_id = live_session.context.get("session_id")
+    full_transcript = ""
+    if final_session_id and not live_session.running:
+        full_transcript = get_transcript_store().text(final_session_id)
+    if full_transcript:
         st.subheader("📝 Complete Meeting Summary")
-        full_transcript = " ".join(st.session_state.all_transcripts)
         
         # Create tabs for different views
+        # The tabs share one query embedding and top-k for the transcript
+        retrieval = retrieval_context(client, index, topic)
         tab1, tab2, tab3, tab4 = st.tabs(["📝 Full Transcript", "🤝 Final Questions", "📋 Meeting Summary", "📄 Export"])
         
         with tab1:
             st.text_area("Complete Transcript", full_transcript, height=200)
         
         with tab2:
-            final_questions = generate_questions(client, index, full_transcript, topic, custom_prompt)
+            final_questions = generate_questions(client, index, full_transcript, topic, custom_prompt, retrieval)
             st.markdown(f"**🤝 Final Meeting Questions:**\n{final_questions}")
         
         with tab3:
-            meeting_summary = generate_meeting_summary(client, index, full_transcript, topic)
+            meeting_summary = generate_meeting_summary(client, index, full_transcript, topic, retrieval)
             st.markdown(f"**📋 Meeting Summary:**\n{meeting_summary}")
         
         with tab4:
@@ -503,7 +864,9 @@ def main():
             
             with col_save:
                 if st.button("💾 Save to Knowledge Base"):
-                    embed_and_upsert(client, index, full_transcript, topic)
+                    # One segment per line so chunks end between segments
+                    transcript_lines = get_transcript_store().text(final_session_id, separator="\n")
+                    embed_and_upsert(client, index, transcript_lines, topic, source=f"session:{final_session_id}")
                     st.success("✅ Meeting saved to your knowledge base!")
             
             with col_export:
@@ -2,14 +2,18 @@
 # Main Streamlit App Entry Point
 
 import os
+import shutil
+import tempfile
 import streamlit as st
 import time
-from uuid import uuid4
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
 import json
 import datetime
 from collections import defaultdict
+from assistant import (METRICS, ContextAssembler, EmbeddingCache, EmbeddingService, IngestionRegistry,
+                       RetrievalContext, TokenChunker, VectorWriter, content_digest, decode_options, format_timestamp,
+                       transcribe_file, vector_id)
 
 # --- STREAMLIT UI ---
 st.set_page_config(
@@ -51,12 +55,22 @@ if not openai_api_key or not pinecone_api_key:
     """)
     st.stop()
 
+@st.cache_resource
+def get_embedding_cache():
+    return EmbeddingCache()
+
+@st.cache_resource
+def get_vector_writer(_index):
+    """Batched, retried upserts shared by every caller in the app"""
+    return VectorWriter(_index)
+
 # Initialize API clients
 try:
     from openai import OpenAI
     from pinecone import Pinecone
     
     client = OpenAI(api_key=openai_api_key)
+    embedder = EmbeddingService(client, cache=get_embedding_cache())
     pc = Pinecone(api_key=pinecone_api_key)
     
     # In-Person Meeting specific index - use shared index with namespace
@@ -91,6 +105,7 @@ except Exception as e:
 
 # --- CONFIG ---
 ROLLING_BUFFER_LIMIT = 6  # Generate questions every 6 conversation chunks
+TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "base")  # Whisper model for uploaded recordings
 
 # --- BACKGROUND ONTOLOGY PROCESSING ---
 class MeetingOntologyProcessor:
@@ -118,11 +133,12 @@ class MeetingOntologyProcessor:
             }}
             """
             
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
+            with METRICS.time("chat.entities"):
+                response = client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1
+                )
             
             # Try to parse JSON, fallback to simple extraction if it fails
             try:
@@ -161,11 +177,12 @@ class MeetingOntologyProcessor:
             }}
             """
             
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
+            with METRICS.time("chat.reasoning"):
+                response = client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1
+                )
             
             # Try to parse JSON, fallback to simple reasoning if it fails
             try:
@@ -257,41 +274,58 @@ if 'ontology_processor' not in st.session_state:
     st.session_state.ontology_processor = MeetingOntologyProcessor()
 
 def chunk_text(text, max_tokens=500):
-    words = text.split()
-    return [" ".join(words[i:i+max_tokens]) for i in range(0, len(words), max_tokens)]
+    return TokenChunker(max_tokens).split(text)
 
 def get_embedding(text):
-    response = client.embeddings.create(
-        input=[text],
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
-
-def embed_and_upsert(text, topic):
-    for chunk in chunk_text(text):
-        vector = get_embedding(chunk)
-        index.upsert([{
-            "id": str(uuid4()),
-            "values": vector,
-            "metadata": {"text": chunk}
-        }], namespace=f"it-martini-{topic}")
-
-def query_context(query, topic):
-    vector = get_embedding(query)
-    response = index.query(vector=vector, top_k=5, include_metadata=True, namespace=f"it-martini-{topic}")
-    return "\n".join([match['metadata']['text'] for match in response.matches])
+    return embedder.embed_one(text)
+
+def embed_and_upsert(text, topic, source=None):
+    chunks = chunk_text(text)
+    # A few multi-input requests instead of one round trip per chunk
+    vectors = embedder.embed([chunk.text for chunk in chunks])
+    namespace = f"it-martini-{topic}"
+    source = source or content_digest(text.encode())
+    # Ids are stable across re-uploads, so the same source overwrites its vectors
+    return get_vector_writer(index).upsert([{
+        "id": vector_id(namespace, source, chunk.start),
+        "values": vector,
+        "metadata": {"text": chunk.text, "start": chunk.start, "end": chunk.end}
+    } for chunk, vector in zip(chunks, vectors)], namespace=namespace)
+
+@st.cache_resource
+def get_ingestion_registry():
+    return IngestionRegistry()
+
+def reingest_document(digest, topic):
+    """Delete a document's vectors and its registry record so the next run embeds it again"""
+    record = get_ingestion_registry().forget(digest, f"it-martini-{topic}")
+    if record:
+        for i in range(0, len(record["vector_ids"]), 1000):
+            index.delete(ids=record["vector_ids"][i:i + 1000], namespace=f"it-martini-{topic}")
+
+def retrieval_context(topic):
+    """Query embedding and matches shared by every consumer within one button click"""
+    def search(vector, top_k):
+        with METRICS.time("vector_query"):
+            response = index.query(vector=vector, top_k=top_k, include_metadata=True, namespace=f"it-martini-{topic}")
+        return response.matches
+    return RetrievalContext(get_embedding, search, assembler=ContextAssembler())
+
+def query_context(query, topic, retrieval=None):
+    return (retrieval or retrieval_context(topic)).context(query)
 
 def summarize_and_append(transcript, topic):
     summary_prompt = f"Summarize this transcript:\n\n{transcript}"
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": summary_prompt}]
-    )
+    with METRICS.time("chat.summary"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": summary_prompt}]
+        )
     summary = response.choices[0].message.content.strip()
     embed_and_upsert(summary, topic)
 
-def generate_questions(transcript, topic, prompt_override=None):
-    context = query_context(transcript, topic)
+def generate_questions(transcript, topic, prompt_override=None, retrieval=None):
+    context = query_context(transcript, topic, retrieval)
     
     # Meeting-focused prompt for In-Person Meeting Assistant
     meeting_prompt = f"""
@@ -321,12 +355,32 @@ Relevant Background Context:
 ---
 Generate 10 intelligent, discussion-forwarding questions that will help move the conversation forward:"""
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": meeting_prompt.strip()}]
-    )
+    with METRICS.time("chat.questions"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": meeting_prompt.strip()}]
+        )
     return response.choices[0].message.content.strip()
 
+def render_usage_panel(name):
+    """Sidebar panel with per-stage latency percentiles and a JSON export"""
+    with st.sidebar.expander("📊 Usage"):
+        rows = METRICS.rows()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("Latency percentiles appear once questions have been generated.")
+        st.caption(get_embedding_cache().describe())
+        st.caption(get_vector_writer(index).describe())
+        if METRICS.counters():
+            st.caption(" · ".join(f"{name}: {count}" for name, count in METRICS.counters().items()))
+        st.download_button(
+            "📥 Export Latency (JSON)",
+            METRICS.to_json(),
+            file_name=f"{name}_latency_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+        )
+
 # Main app interface
 st.title("🤝 In-Person Meeting")
 st.markdown("**Your AI-powered conversation partner for live meetings and discussions**")
@@ -340,6 +394,7 @@ with st.sidebar:
     if st.button("🗑️ Clear Previous Data"):
         try:
             index.delete(delete_all=True, namespace=f"it-martini-{topic}")
+            get_ingestion_registry().forget_scope(f"it-martini-{topic}")
             st.success(f"Topic '{topic}' cleared.")
         except Exception as e:
             st.error(f"Error clearing data: {str(e)}")
@@ -348,13 +403,22 @@ with st.sidebar:
     st.markdown("### 📚 Context")
     uploaded_file = st.file_uploader("Upload Context PDF", type="pdf")
     if uploaded_file:
-        try:
-            pdf = PdfReader(uploaded_file)
-            raw_text = "\n".join([page.extract_text() for page in pdf.pages])
-            embed_and_upsert(raw_text, topic)
-            st.success("PDF uploaded and embedded.")
-        except Exception as e:
-            st.error(f"Error processing PDF: {str(e)}")
+        # The file stays in the uploader across reruns; embed it once per topic
+        digest = content_digest(uploaded_file.getvalue())
+        ingested = get_ingestion_registry().lookup(digest, f"it-martini-{topic}")
+        if ingested is None:
+            try:
+                pdf = PdfReader(uploaded_file)
+                raw_text = "\f".join([page.extract_text() for page in pdf.pages])
+                vector_ids = embed_and_upsert(raw_text, topic, source=digest)
+                get_ingestion_registry().record(digest, f"it-martini-{topic}", uploaded_file.name, vector_ids)
+                st.success("PDF uploaded and embedded.")
+            except Exception as e:
+                st.error(f"Error processing PDF: {str(e)}")
+        else:
+            st.info(f"{ingested['name']} is already embedded for this topic ({len(ingested['vector_ids'])} chunks).")
+            st.button("🔁 Re-ingest", on_click=reingest_document, args=(digest, topic),
+                      help="Delete this document's vectors and embed it again")
     
     custom_prompt = st.text_area("Meeting Guidance (optional)", height=100, 
                                 placeholder="Add any specific guidance for question generation...")
@@ -389,7 +453,33 @@ with col1:
     
     if uploaded_audio:
         st.success(f"✅ Audio file uploaded: {uploaded_audio.name}")
-        st.info("💡 Audio transcription will be added in a future update")
+        
+        if st.button("🎧 Transcribe Audio"):
+            suffix = os.path.splitext(uploaded_audio.name)[1]
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                shutil.copyfileobj(uploaded_audio, tmp, 1 << 20)
+            try:
+                with st.status("Transcribing audio...") as status:
+                    lines = []
+                    started = time.perf_counter()
+                    audio_seconds = 0.0
+                    options = decode_options("accurate")
+                    for segment in transcribe_file(tmp.name, model_name=TRANSCRIPTION_MODEL, **options):
+                        lines.append(f"[{format_timestamp(segment.start)}] {segment.text}")
+                        audio_seconds = segment.end
+                        status.update(label=f"Transcribing audio... {format_timestamp(segment.end)} processed")
+                    METRICS.record("transcribe", time.perf_counter() - started, audio_seconds)
+                    status.update(label="Transcription complete", state="complete")
+                st.session_state.audio_transcript = "\n".join(lines)
+                st.session_state.audio_transcript_name = uploaded_audio.name
+            except Exception as e:
+                st.error(f"Error transcribing audio: {str(e)}")
+            finally:
+                os.unlink(tmp.name)
+        
+        if st.session_state.get("audio_transcript_name") == uploaded_audio.name:
+            with st.expander("📝 Audio Transcript", expanded=True):
+                st.text(st.session_state.audio_transcript)
     
     # Manual text input as fallback
     st.subheader("📝 Manual Text Input")
@@ -402,45 +492,47 @@ with col1:
     # Process input
     if uploaded_audio or conversation_text:
         if st.button("🤝 Generate Questions", type="primary"):
-            with st.spinner("Generating intelligent questions..."):
-                try:
-                    # For now, use manual text input
-                    # TODO: Add audio transcription service
-                    text_to_process = conversation_text if conversation_text else f"Audio file uploaded: {uploaded_audio.name} (transcription pending)"
-                    
-                    # Start meeting if not already started
-                    if not st.session_state.ontology_processor.meeting_start_time:
-                        st.session_state.ontology_processor.start_meeting()
-                    
-                    # Background ontology processing
-                    st.session_state.ontology_processor.process_conversation_chunk(text_to_process)
-                    
-                    # Store conversation context
-                    embed_and_upsert(text_to_process, topic)
-                    
-                    # Get context for question generation
-                    context = query_context(text_to_process, topic)
-                    
-                    # Generate questions
-                    questions = generate_questions(text_to_process, topic, custom_prompt)
-                    
-                    # Analyze question reasoning (background)
-                    reasoning = st.session_state.ontology_processor.analyze_question_reasoning(
-                        text_to_process, questions, context
-                    )
-                    
-                    # Record question generation with reasoning
-                    st.session_state.ontology_processor.record_question_generation(
-                        text_to_process, questions, context, reasoning
-                    )
-                    
-                    # Store in session state
-                    st.session_state.last_questions = questions
-                    st.session_state.last_conversation = text_to_process
-                    
-                    st.success("Questions generated successfully!")
-                except Exception as e:
-                    st.error(f"Error generating questions: {str(e)}")
+            # Prefer typed text, then the transcript of the uploaded recording
+            text_to_process = conversation_text or st.session_state.get("audio_transcript", "")
+            if not text_to_process:
+                st.warning("Transcribe the uploaded audio or enter meeting text first.")
+            else:
+                with st.spinner("Generating intelligent questions..."):
+                    try:
+                        # Start meeting if not already started
+                        if not st.session_state.ontology_processor.meeting_start_time:
+                            st.session_state.ontology_processor.start_meeting()
+                        
+                        # Background ontology processing
+                        st.session_state.ontology_processor.process_conversation_chunk(text_to_process)
+                        
+                        # Store conversation context
+                        embed_and_upsert(text_to_process, topic)
+                        
+                        # Get context for question generation; the question prompt reuses the same retrieval
+                        retrieval = retrieval_context(topic)
+                        context = query_context(text_to_process, topic, retrieval)
+                        
+                        # Generate questions
+                        questions = generate_questions(text_to_process, topic, custom_prompt, retrieval)
+                        
+                        # Analyze question reasoning (background)
+                        reasoning = st.session_state.ontology_processor.analyze_question_reasoning(
+                            text_to_process, questions, context
+                        )
+                        
+                        # Record question generation with reasoning
+                        st.session_state.ontology_processor.record_question_generation(
+                            text_to_process, questions, context, reasoning
+                        )
+                        
+                        # Store in session state
+                        st.session_state.last_questions = questions
+                        st.session_state.last_conversation = text_to_process
+                        
+                        st.success("Questions generated successfully!")
+                    except Exception as e:
+                        st.error(f"Error generating questions: {str(e)}")
 
 with col2:
     st.header("❓ Smart Questions")
@@ -504,6 +596,7 @@ st.markdown("---")
 st.markdown("*In-Person Meeting Assistant - Making live conversations more engaging and insightful* 🤝")
 
 # Deployment info
+render_usage_panel("meeting")
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🎙️ Meeting Assistant")
 st.sidebar.info("This app processes meeting content and generates intelligent questions based on the discussion context.")
@@ -2,7 +2,6 @@ import os
 import streamlit as st
 import time
 import random
-from uuid import uuid4
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
 import requests
@@ -11,6 +10,9 @@ import re
 import json
 from PIL import Image
 import easyocr
+import datetime
+from assistant import (METRICS, ContextAssembler, EmbeddingCache, EmbeddingService, TokenChunker, VectorWriter,
+                       content_digest, vector_id)
 
 # Load environment variables
 load_dotenv()
@@ -47,12 +49,22 @@ if not openai_api_key or not pinecone_api_key:
     """)
     st.stop()
 
+@st.cache_resource
+def get_embedding_cache():
+    return EmbeddingCache()
+
+@st.cache_resource
+def get_vector_writer(_index):
+    """Batched, retried upserts shared by every caller in the app"""
+    return VectorWriter(_index)
+
 # Initialize API clients
 try:
     from openai import OpenAI
     from pinecone import Pinecone
 
     client = OpenAI(api_key=openai_api_key)
+    embedder = EmbeddingService(client, cache=get_embedding_cache())
     pc = Pinecone(api_key=pinecone_api_key)
 
     # LinkedIn Call specific index - use shared index with namespace
@@ -107,29 +119,30 @@ ocr_reader = load_ocr_reader()
 # whisper_model = load_model() # Removed for web version
 
 def chunk_text(text, max_tokens=500):
-    words = text.split()
-    return [" ".join(words[i:i+max_tokens]) for i in range(0, len(words), max_tokens)]
+    return TokenChunker(max_tokens).split(text)
 
 def get_embedding(text):
-    response = client.embeddings.create(
-        input=[text],
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
+    return embedder.embed_one(text)
 
-def embed_and_upsert(text, person_name):
-    for chunk in chunk_text(text):
-        vector = get_embedding(chunk)
-        index.upsert([{
-            "id": str(uuid4()),
-            "values": vector,
-            "metadata": {"text": chunk, "person": person_name}
-        }], namespace=f"linkedin-{person_name}")
+def embed_and_upsert(text, person_name, source=None):
+    chunks = chunk_text(text)
+    # A few multi-input requests instead of one round trip per chunk
+    vectors = embedder.embed([chunk.text for chunk in chunks])
+    namespace = f"linkedin-{person_name}"
+    source = source or content_digest(text.encode())
+    # Ids are stable across re-uploads, so the same source overwrites its vectors
+    return get_vector_writer(index).upsert([{
+        "id": vector_id(namespace, source, chunk.start),
+        "values": vector,
+        "metadata": {"text": chunk.text, "person": person_name, "start": chunk.start, "end": chunk.end}
+    } for chunk, vector in zip(chunks, vectors)], namespace=namespace)
 
 def query_context(query, person_name):
     vector = get_embedding(query)
-    response = index.query(vector=vector, top_k=5, include_metadata=True, namespace=f"linkedin-{person_name}")
-    return "\n".join([match['metadata']['text'] for match in response.matches])
+    with METRICS.time("vector_query"):
+        response = index.query(vector=vector, top_k=5, include_metadata=True, namespace=f"linkedin-{person_name}")
+    # Near-duplicate passages are dropped and the rest packed into the default token budget
+    return ContextAssembler().assemble(query, [match['metadata']['text'] for match in response.matches]).text
 
 def analyze_linkedin_profile(profile_image=None, profile_text=None):
     """Analyze LinkedIn profile from uploaded screenshot or manual text input"""
@@ -293,11 +306,12 @@ def parse_linkedin_text_with_ai(ocr_text):
             # Use the first available GPT model
             if available_models:
                 model_to_use = available_models[0]
-                response = client.chat.completions.create(
-                    model=model_to_use,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3
-                )
+                with METRICS.time("chat.profile_parse"):
+                    response = client.chat.completions.create(
+                        model=model_to_use,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.3
+                    )
                 st.info(f"✅ Using model: {model_to_use}")
             else:
                 st.error("No GPT models available in your project")
@@ -831,10 +845,11 @@ def generate_personality_summary(profile_data, personality_insights):
     Generate a concise, professional summary that highlights key conversation points, interests, and personality traits that would be useful for a business call.
     """
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": summary_prompt}]
-    )
+    with METRICS.time("chat.personality"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": summary_prompt}]
+        )
     return response.choices[0].message.content.strip()
 
 def generate_questions(transcript, person_name, call_goals, personality_summary):
@@ -863,12 +878,30 @@ def generate_questions(transcript, person_name, call_goals, personality_summary)
     4. Based on their recent activities or professional interests
     """
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": full_prompt.strip()}]
-    )
+    with METRICS.time("chat.questions"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": full_prompt.strip()}]
+        )
     return response.choices[0].message.content.strip()
 
+def render_usage_panel(name):
+    """Sidebar panel with per-stage latency percentiles and a JSON export"""
+    with st.sidebar.expander("📊 Usage"):
+        rows = METRICS.rows()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("Latency percentiles appear once questions have been generated.")
+        st.caption(get_embedding_cache().describe())
+        st.caption(get_vector_writer(index).describe())
+        st.download_button(
+            "📥 Export Latency (JSON)",
+            METRICS.to_json(),
+            file_name=f"{name}_latency_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+        )
+
 def main():
     # Main UI
     st.title("💼 LinkedIn Call Assistant")
@@ -1148,6 +1181,8 @@ def main():
             # Show the conversation that was analyzed
             with st.expander("📝 Analyzed Conversation"):
                 st.text(st.session_state.last_conversation)
+    
+    render_usage_panel("linkedin_calls")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
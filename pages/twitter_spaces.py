@@ -1,9 +1,11 @@
 import os
 import streamlit as st
 import time
-from uuid import uuid4
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
+import datetime
+from assistant import (METRICS, ContextAssembler, EmbeddingCache, EmbeddingService, IngestionRegistry,
+                       QuestionTrigger, TokenChunker, TranscriptWindow, VectorWriter, content_digest, vector_id)
 
 # Load environment variables
 load_dotenv()
@@ -40,12 +42,22 @@ if not openai_api_key or not pinecone_api_key:
     """)
     st.stop()
 
+@st.cache_resource
+def get_embedding_cache():
+    return EmbeddingCache()
+
+@st.cache_resource
+def get_vector_writer(_index):
+    """Batched, retried upserts shared by every caller in the app"""
+    return VectorWriter(_index)
+
 # Initialize API clients
 try:
     from openai import OpenAI
     from pinecone import Pinecone
 
     client = OpenAI(api_key=openai_api_key)
+    embedder = EmbeddingService(client, cache=get_embedding_cache())
     pc = Pinecone(api_key=pinecone_api_key)
 
     # Twitter Spaces specific index - use shared index with namespace
@@ -89,36 +101,49 @@ except Exception as e:
 # whisper_model = load_model() # Removed for web version
 
 def chunk_text(text, max_tokens=500):
-    words = text.split()
-    return [" ".join(words[i:i+max_tokens]) for i in range(0, len(words), max_tokens)]
+    return TokenChunker(max_tokens).split(text)
 
 def get_embedding(text):
-    response = client.embeddings.create(
-        input=[text],
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
-
-def embed_and_upsert(text, topic):
-    for chunk in chunk_text(text):
-        vector = get_embedding(chunk)
-        index.upsert([{
-            "id": str(uuid4()),
-            "values": vector,
-            "metadata": {"text": chunk}
-        }], namespace=f"twitter-{topic}")
+    return embedder.embed_one(text)
+
+def embed_and_upsert(text, topic, source=None):
+    chunks = chunk_text(text)
+    # A few multi-input requests instead of one round trip per chunk
+    vectors = embedder.embed([chunk.text for chunk in chunks])
+    namespace = f"twitter-{topic}"
+    source = source or content_digest(text.encode())
+    # Ids are stable across re-uploads, so the same source overwrites its vectors
+    return get_vector_writer(index).upsert([{
+        "id": vector_id(namespace, source, chunk.start),
+        "values": vector,
+        "metadata": {"text": chunk.text, "start": chunk.start, "end": chunk.end}
+    } for chunk, vector in zip(chunks, vectors)], namespace=namespace)
+
+@st.cache_resource
+def get_ingestion_registry():
+    return IngestionRegistry()
+
+def reingest_document(digest, topic):
+    """Delete a document's vectors and its registry record so the next run embeds it again"""
+    record = get_ingestion_registry().forget(digest, f"twitter-{topic}")
+    if record:
+        for i in range(0, len(record["vector_ids"]), 1000):
+            index.delete(ids=record["vector_ids"][i:i + 1000], namespace=f"twitter-{topic}")
 
 def query_context(query, topic):
     vector = get_embedding(query)
-    response = index.query(vector=vector, top_k=5, include_metadata=True, namespace=f"twitter-{topic}")
-    return "\n".join([match['metadata']['text'] for match in response.matches])
+    with METRICS.time("vector_query"):
+        response = index.query(vector=vector, top_k=5, include_metadata=True, namespace=f"twitter-{topic}")
+    # Near-duplicate passages are dropped and the rest packed into the default token budget
+    return ContextAssembler().assemble(query, [match['metadata']['text'] for match in response.matches]).text
 
 def summarize_and_append(transcript, topic):
     summary_prompt = f"Summarize this transcript:\n\n{transcript}"
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": summary_prompt}]
-    )
+    with METRICS.time("chat.summary"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": summary_prompt}]
+        )
     summary = response.choices[0].message.content.strip()
     embed_and_upsert(summary, topic)
 
@@ -142,29 +167,59 @@ Relevant Background Context:
 ---
 Generate 3 intelligent, discussion-forwarding questions:"""
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": full_prompt.strip()}]
-    )
+    with METRICS.time("chat.questions"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": full_prompt.strip()}]
+        )
     return response.choices[0].message.content.strip()
 
+def render_usage_panel(name):
+    """Sidebar panel with per-stage latency percentiles and a JSON export"""
+    with st.sidebar.expander("📊 Usage"):
+        rows = METRICS.rows()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("Latency percentiles appear once questions have been generated.")
+        st.caption(get_embedding_cache().describe())
+        st.caption(get_vector_writer(index).describe())
+        st.download_button(
+            "📥 Export Latency (JSON)",
+            METRICS.to_json(),
+            file_name=f"{name}_latency_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+        )
+
 def main():
     # --- STREAMLIT UI ---
     st.title("🐦 Twitter Space AI Assistant")
     st.markdown("Enhance your live Twitter Spaces conversations with real-time AI-powered insights")
+    render_usage_panel("twitter_spaces")
 
     topic = st.text_input("Enter topic (used as namespace)", value="default")
 
     if st.button("Clear Previous Data for This Topic"):
-        index.delete(delete_all=True, namespace=topic)
-        st.success(f"Namespace '{topic}' cleared.")
+        # Same namespace the vectors are upserted to and the registry scope that tracks them
+        index.delete(delete_all=True, namespace=f"twitter-{topic}")
+        get_ingestion_registry().forget_scope(f"twitter-{topic}")
+        st.success(f"Namespace 'twitter-{topic}' cleared.")
 
     uploaded_file = st.file_uploader("Upload Context PDF", type="pdf")
     if uploaded_file:
-        pdf = PdfReader(uploaded_file)
-        raw_text = "\n".join([page.extract_text() for page in pdf.pages])
-        embed_and_upsert(raw_text, topic)
-        st.success("PDF uploaded and embedded.")
+        # The file stays in the uploader across reruns; embed it once per topic
+        digest = content_digest(uploaded_file.getvalue())
+        ingested = get_ingestion_registry().lookup(digest, f"twitter-{topic}")
+        if ingested is None:
+            pdf = PdfReader(uploaded_file)
+            raw_text = "\f".join([page.extract_text() for page in pdf.pages])
+            vector_ids = embed_and_upsert(raw_text, topic, source=digest)
+            get_ingestion_registry().record(digest, f"twitter-{topic}", uploaded_file.name, vector_ids)
+            st.success("PDF uploaded and embedded.")
+        else:
+            st.info(f"{ingested['name']} is already embedded for this topic ({len(ingested['vector_ids'])} chunks).")
+            st.button("🔁 Re-ingest", on_click=reingest_document, args=(digest, topic),
+                      help="Delete this document's vectors and embed it again")
 
     custom_prompt = st.text_area("Optional prompt (will guide question generation)", height=150)
 
@@ -173,7 +228,8 @@ def main():
     transcript_display = st.empty()
     question_display = st.empty()
 
-    rolling_buffer = []
+    transcript_window = TranscriptWindow(500) # Token-bounded rolling window
+    question_trigger = QuestionTrigger() # Fires on topic change, within interval and LLM budget limits
     all_transcripts = []
 
     if start_button:
@@ -190,13 +246,11 @@ def main():
                 # result = whisper_model.transcribe(audio_np, fp16=False)
                 text = "This is a placeholder for the transcript." # Placeholder for transcript
                 all_transcripts.append(text)
-                rolling_buffer.append(text)
-                if len(rolling_buffer) > 12: # Hardcoded for web version
-                    rolling_buffer.pop(0)
-                joined_text = " ".join(rolling_buffer)
-                transcript_display.markdown("**Latest Transcript:**\n" + joined_text)
+                transcript_window.append(text)
+                transcript_display.markdown("**Latest Transcript:**\n" + transcript_window.text)
 
-                if len(all_transcripts) % 12 == 0: # Hardcoded for web version
+                if question_trigger.update(text, transcript_window).fire:
+                    joined_text = transcript_window.text
                     summarize_and_append(joined_text, topic)
                     questions = generate_questions(joined_text, topic, custom_prompt)
                     question_display.markdown("**Smart Questions:**\n" + questions)
@@ -0,0 +1,139 @@
+import os
+import stat
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from assistant import ASRBackend, RemoteBackend, Segment, TranscriptionServer
+from assistant.asr_daemon import FairScheduler, check_model, check_options, connect_or_spawn
+from assistant.model_controller import ModelCache
+
+
+class EchoBackend(ASRBackend):
+    name = "echo"
+
+    def _transcribe(self, audio, **options):
+        return [Segment(0.0, len(audio) / 16000, f"{len(audio)} samples {sorted(options)}")]
+
+
+def test_scheduler_serves_clients_round_robin():
+    scheduler = FairScheduler()
+    for job in ("a1", "a2", "a3"):
+        scheduler.put("a", job)
+    scheduler.put("b", "b1")
+    scheduler.put("c", "c1")
+    assert [scheduler.get(0) for _ in range(5)] == ["a1", "b1", "c1", "a2", "a3"]
+    assert scheduler.get(0) is None
+
+
+def test_dropped_client_loses_its_queue():
+    scheduler = FairScheduler()
+    scheduler.put("a", 1)
+    scheduler.put("b", 2)
+    scheduler.drop_client("a")
+    assert scheduler.pending() == {"b": 1}
+    assert scheduler.get(0) == 2
+
+
+def test_only_known_decoding_options_pass():
+    assert check_options({"language": "en", "beam_size": 1}) == {"language": "en", "beam_size": 1}
+    with pytest.raises(ValueError, match="model_dir"):
+        check_options({"language": "en", "model_dir": "/tmp"})
+
+
+def test_only_known_model_names_pass():
+    assert check_model("small") == "small"
+    assert check_model(None) is None
+    with pytest.raises(ValueError, match="unsupported model"):
+        check_model("/home/someone/evil-model")
+
+
+def echo_server(socket_path, loaded=None):
+    loaded = [] if loaded is None else loaded
+
+    def load(key):
+        loaded.append(key)
+        return EchoBackend(key[1])
+
+    server = TranscriptionServer(socket_path)
+    server._backends = ModelCache(load, 2)
+    return server
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = echo_server(str(tmp_path / "run" / "asr.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(server.socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server
+    server.stop()
+    thread.join(5)
+
+
+def test_socket_is_private_to_the_user(server):
+    assert stat.S_IMODE(os.stat(server.socket_path).st_mode) == 0o600
+
+
+def test_remote_transcription_round_trip(server):
+    remote = RemoteBackend(socket_path=server.socket_path, timeout=5)
+    segments = remote.transcribe(np.zeros(1600, dtype=np.float32), language="en", word_timestamps=True)
+    assert segments[0].text == "1600 samples ['language', 'word_timestamps']"
+    with pytest.raises(RuntimeError, match="unsupported decoding options"):
+        remote.transcribe(np.zeros(160, dtype=np.float32), device="cuda")
+    remote.close()
+
+
+def test_socket_directory_is_private_to_the_user(server):
+    assert stat.S_IMODE(os.stat(os.path.dirname(server.socket_path)).st_mode) == 0o700
+
+
+def test_second_daemon_exits_without_loading_a_model(server):
+    loaded = []
+    echo_server(server.socket_path, loaded).serve_forever()
+    assert loaded == []
+    remote = RemoteBackend(socket_path=server.socket_path, timeout=5)
+    assert remote.ping()["ok"]
+    remote.close()
+
+
+def test_stale_socket_file_is_replaced(tmp_path):
+    socket_path = str(tmp_path / "asr.sock")
+    with open(socket_path, "w"):
+        pass
+    server = echo_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    remote = RemoteBackend(socket_path=socket_path, timeout=5)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            assert remote.ping()["ok"]
+            break
+        except OSError:
+            time.sleep(0.01)
+    else:
+        pytest.fail("daemon did not replace the stale socket")
+    remote.close()
+    server.stop()
+    thread.join(5)
+
+
+def test_clients_refuse_a_socket_owned_by_another_user(server, monkeypatch):
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    with pytest.raises(PermissionError):
+        RemoteBackend(socket_path=server.socket_path, timeout=5).ping()
+    with pytest.raises(PermissionError):
+        connect_or_spawn(socket_path=server.socket_path, startup_timeout=1)
+
+
+def test_unknown_model_is_refused_by_the_daemon(server):
+    remote = RemoteBackend("/tmp/model", socket_path=server.socket_path, timeout=5)
+    with pytest.raises(RuntimeError, match="unsupported model"):
+        remote.transcribe(np.zeros(160, dtype=np.float32))
+    remote.close()
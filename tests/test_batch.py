@@ -0,0 +1,41 @@
+import numpy as np
+
+from assistant import split_on_silence
+
+RATE = 16000
+
+
+def voiced(seconds):
+    """Harmonic tone with a syllable-rate envelope, which the VAD treats as speech"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    return (0.3 * tone * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def blocks(audio, seconds=10.0):
+    step = int(seconds * RATE)
+    return (audio[i:i + step] for i in range(0, len(audio), step))
+
+
+def test_segments_are_cut_in_pauses_and_bounded():
+    audio = np.concatenate([voiced(12), silence(2), voiced(14), silence(1.5), voiced(20), silence(1), voiced(5)])
+    segments = list(split_on_silence(blocks(audio), min_seconds=10, max_seconds=30))
+    assert len(segments) >= 2
+    assert all(len(segment) <= 30 * RATE for _, segment in segments)
+    # Segments tile the audio in order, with absolute start times
+    assert sum(len(segment) for _, segment in segments) == len(audio)
+    starts = [start for start, _ in segments]
+    assert starts == sorted(starts) and starts[0] == 0
+    # The first cut lands inside the first pause
+    assert 12 <= starts[1] <= 14
+
+
+def test_silent_segments_are_dropped():
+    audio = np.concatenate([voiced(5), silence(60), voiced(5)])
+    segments = list(split_on_silence(blocks(audio), min_seconds=10, max_seconds=30))
+    assert 0 < sum(len(segment) for _, segment in segments) < len(audio)
+    assert segments[-1][0] + len(segments[-1][1]) / RATE == len(audio) / RATE
@@ -0,0 +1,48 @@
+import sys
+import types
+
+import pytest
+
+from assistant import AudioCapture
+
+
+class FakeStream:
+    def __init__(self, **options):
+        self.active = False
+        self.closed = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_sounddevice(monkeypatch):
+    module = types.SimpleNamespace(
+        query_devices=lambda device, kind: {"default_samplerate": 16000, "max_input_channels": 1},
+        InputStream=FakeStream,
+    )
+    monkeypatch.setitem(sys.modules, "sounddevice", module)
+    return module
+
+
+def test_stream_stays_open_until_the_last_reader_is_released(fake_sounddevice):
+    capture = AudioCapture()
+    first = capture.open_reader()
+    stream = capture._stream
+    second = capture.open_reader()
+    assert capture._stream is stream and capture.readers == 2
+
+    capture.release(first)
+    assert capture.running
+    capture.release(first)
+    assert capture.running and capture.readers == 1
+
+    capture.release(second)
+    assert not capture.running and stream.closed
+
@@ -0,0 +1,66 @@
+import pytest
+
+from assistant import TokenChunker, count_tokens
+
+
+def paragraph(topic, sentences=6):
+    return " ".join(f"Sentence {i} explains how the {topic} team handles item number {i} in detail."
+                    for i in range(sentences))
+
+
+def test_chunks_fit_the_budget_and_point_back_into_the_text():
+    text = "\n\n".join(paragraph(f"topic{i}") for i in range(20))
+    chunks = TokenChunker(max_tokens=120, overlap_tokens=20).split(text)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert text[chunk.start:chunk.end] == chunk.text
+        assert count_tokens(chunk.text) <= 120
+    # Every character outside separators is covered, in order
+    assert chunks[0].start == 0 and chunks[-1].end == len(text.rstrip())
+    assert all(a.start < b.start for a, b in zip(chunks, chunks[1:]))
+
+
+def test_chunks_end_at_paragraph_breaks_when_they_can():
+    text = "\n\n".join(paragraph(f"topic{i}", 3) for i in range(12))
+    chunks = TokenChunker(max_tokens=200, overlap_tokens=20).split(text)
+    for chunk in chunks[:-1]:
+        assert text[chunk.end:chunk.end + 2] == "\n\n"
+
+
+def test_overlap_inside_a_paragraph_only():
+    long_paragraph = paragraph("overlap", 60)
+    chunks = TokenChunker(max_tokens=150, overlap_tokens=40).split(long_paragraph)
+    assert len(chunks) > 2
+    for a, b in zip(chunks, chunks[1:]):
+        assert b.start < a.end
+        assert count_tokens(long_paragraph[b.start:a.end]) <= 40 + 5
+
+    separate = paragraph("first", 5) + "\n\n" + paragraph("second", 5) + "\n\n" + paragraph("third", 5)
+    split = TokenChunker(max_tokens=150, overlap_tokens=40).split(separate)
+    assert len(split) > 1
+    assert all(b.start >= a.end for a, b in zip(split, split[1:]))
+
+
+def test_oversized_sentence_and_unbroken_blob_are_split():
+    text = "word " * 2000 + "\f" + "x" * 20000
+    chunks = TokenChunker(max_tokens=100, overlap_tokens=10).split(text)
+    assert all(count_tokens(chunk.text) <= 100 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks).count("x") >= 20000
+
+
+def test_empty_text_and_invalid_overlap():
+    assert TokenChunker().split("  \n\n ") == []
+    with pytest.raises(ValueError):
+        TokenChunker(max_tokens=50, overlap_tokens=50)
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n\t\n", "\f \f"])
+def test_blank_text_yields_no_chunks(text):
+    assert TokenChunker(max_tokens=50, overlap_tokens=10).split(text) == []
+
+
+def test_no_chunk_is_blank():
+    text = "First part.\n\n   \n\n\f  \fSecond part.   "
+    chunks = TokenChunker(max_tokens=50, overlap_tokens=10).split(text)
+    assert chunks and all(chunk.text.strip() for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks).split() == ["First", "part.", "Second", "part."]
@@ -0,0 +1,59 @@
+import pytest
+
+from assistant import HybridRanker, LexicalIndex, Match, query_terms, reciprocal_rank_fusion
+
+
+@pytest.fixture
+def lexical(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    yield index
+    index.close()
+
+
+def test_query_terms_keep_names_codes_and_numbers():
+    terms = query_terms("Um, so yeah, we talked about the Q3 numbers with Acme and AI pricing at 42 dollars")
+    assert {"q3", "acme", "ai", "42", "pricing"} <= set(terms)
+    assert not {"um", "so", "yeah", "the", "we"} & set(terms)
+    assert terms.index("acme") < terms.index("pricing")
+
+
+def test_lexical_index_scopes_replaces_and_deletes(lexical):
+    lexical.add("a", [("1", "Quarterly revenue grew in Europe"), ("2", "Hiring plans for engineering")])
+    lexical.add("b", [("1", "Revenue of another topic")])
+    assert [hit[0] for hit in lexical.search("a", ["revenue"])] == ["1"]
+    lexical.add("a", [("1", "Churn dropped after the pricing change")])
+    assert lexical.search("a", ["revenue"]) == []
+    assert lexical.count("a") == 2 and lexical.count() == 3
+    assert lexical.delete("a", ["2"]) == 1
+    assert lexical.delete("b") == 1
+    assert lexical.count() == 1
+    assert lexical.search("a", []) == []
+
+
+def test_fusion_rewards_items_in_both_rankings():
+    scores = reciprocal_rank_fusion([["x", "y", "z"], ["z", "w"]], k=60)
+    assert max(scores, key=scores.get) == "z"
+    assert scores["x"] == pytest.approx(1 / 61)
+
+
+def test_keyword_hit_outranks_unrelated_vector_matches(lexical):
+    passages = {
+        "p1": "General notes about the team offsite and the agenda.",
+        "p2": "Weekly sync covering roadmap themes.",
+        "p3": "Acme signed the Q3 renewal at 42 dollars per seat.",
+        "p4": "Slides from the design review.",
+    }
+    lexical.add("topic", passages.items())
+    vector_matches = [Match(id=i, score=0.9 - n * 0.1, metadata={"text": passages[i]})
+                      for n, i in enumerate(["p1", "p2", "p4"])]
+    ranked = HybridRanker(lexical, "topic", candidates=10).rank("What did Acme pay for the Q3 renewal?",
+                                                                 vector_matches, top_k=2)
+    assert ranked[0].id == "p3"
+    assert ranked[0]["metadata"]["text"] == passages["p3"]
+    assert len(ranked) == 2
+
+
+def test_ranker_without_keyword_hits_keeps_vector_order(lexical):
+    matches = [Match(id=str(i), score=1.0 - i / 10, metadata={"text": f"passage {i}"}) for i in range(4)]
+    ranked = HybridRanker(lexical, "empty").rank("anything at all", matches, top_k=3)
+    assert [match.id for match in ranked] == ["0", "1", "2"]
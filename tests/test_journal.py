@@ -0,0 +1,121 @@
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+
+from assistant import AudioJournal, list_sessions, open_journal
+from assistant import paths
+
+RATE = 16000
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def tone(seconds, value=0.25):
+    return np.full(int(seconds * RATE), value, dtype=np.float32)
+
+
+def test_append_read_and_resume(tmp_path):
+    journal = AudioJournal(str(tmp_path / "s"))
+    journal.append(tone(1.0, 0.25))
+    journal.append(tone(0.5, -0.5))
+    journal.close()
+
+    resumed = AudioJournal(str(tmp_path / "s"))
+    assert resumed.duration == 1.5
+    audio = resumed.read(0.9, 1.1)
+    assert audio[0] == pytest.approx(0.25, abs=1e-4) and audio[-1] == pytest.approx(-0.5, abs=1e-4)
+    resumed.close()
+
+
+def test_torn_index_line_is_dropped_on_recovery(tmp_path):
+    journal = AudioJournal(str(tmp_path / "s"))
+    journal.append(tone(1.0))
+    journal.close()
+    with open(tmp_path / "s" / "index.jsonl", "a") as f:
+        f.write('{"start": 16000, "end": 3')
+    recovered = AudioJournal(str(tmp_path / "s"))
+    assert recovered.duration == 1.0
+    recovered.append(tone(1.0))
+    recovered.close()
+    with open(tmp_path / "s" / "index.jsonl") as f:
+        assert [json.loads(line)["end"] for line in f] == [RATE, 2 * RATE]
+
+
+def test_sync_interval_defers_index_lines_until_samples_are_flushed(tmp_path):
+    journal = AudioJournal(str(tmp_path / "s"), sync_interval=3600)
+    journal.append(tone(1.0))
+    journal.append(tone(1.0))
+    assert os.path.getsize(tmp_path / "s" / "index.jsonl") == 0
+    assert journal.duration == 2.0
+    journal.close()
+    assert AudioJournal(str(tmp_path / "s")).duration == 2.0
+
+
+def test_list_sessions_tracks_growing_journals(data_root):
+    first = AudioJournal(str(data_root / "sessions" / "app" / "app-1"))
+    first.append(tone(1.0))
+    second = AudioJournal(str(data_root / "sessions" / "app" / "app-2"))
+    second.append(tone(2.0))
+    listed = list_sessions("app")
+    assert [(s["session_id"], s["duration"]) for s in listed] == [("app-2", 2.0), ("app-1", 1.0)]
+    first.append(tone(0.5))
+    assert dict((s["session_id"], s["duration"]) for s in list_sessions("app"))["app-1"] == 1.5
+    first.close()
+    second.close()
+
+
+def test_shared_writer_is_only_closed_by_its_last_user(tmp_path):
+    path = str(tmp_path / "s")
+    first = open_journal(path)
+    first.append(tone(1.0))
+    second = open_journal(path)
+    assert second is first
+    first.close()
+    # The earlier run finishing must not truncate what the new run appends
+    second.append(tone(1.0))
+    second.close()
+    assert os.path.getsize(tmp_path / "s" / "audio.pcm") == 2 * RATE * 2
+    reopened = open_journal(path)
+    assert reopened is not first and reopened.duration == 2.0
+    reopened.close()
+
+
+def test_read_only_open_leaves_a_recording_session_alone(tmp_path):
+    writer = AudioJournal(str(tmp_path / "s"))
+    writer.append(tone(1.0))
+    data_size = os.path.getsize(tmp_path / "s" / "audio.pcm")
+    with open(tmp_path / "s" / "index.jsonl") as f:
+        index = f.read()
+
+    reader = AudioJournal(str(tmp_path / "s"), read_only=True)
+    assert reader.duration == 1.0
+    assert reader.read(0.5, 0.6)[0] == pytest.approx(0.25, abs=1e-4)
+    with pytest.raises(io.UnsupportedOperation):
+        reader.append(tone(0.1))
+    reader.close()
+
+    # Neither the preallocated audio nor the index was rewritten under the writer
+    assert os.path.getsize(tmp_path / "s" / "audio.pcm") == data_size
+    with open(tmp_path / "s" / "index.jsonl") as f:
+        assert f.read() == index
+    writer.append(tone(1.0))
+    writer.close()
+    assert AudioJournal(str(tmp_path / "s"), read_only=True).duration == 2.0
+
+
+def test_segments_are_read_from_disk_including_unsynced_windows(tmp_path):
+    journal = AudioJournal(str(tmp_path / "s"), sync_interval=3600)
+    journal.append(tone(1.0), dropped=0)
+    journal._sync()
+    journal.append(tone(0.5), gap=True)
+    assert not hasattr(journal, "_records")
+    assert [(r["start"], r["end"]) for r in journal.segments()] == [(0, RATE), (RATE, RATE + RATE // 2)]
+    assert journal.segments()[1]["gap"] is True
+    journal.close()
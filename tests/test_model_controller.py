@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+
+from assistant import AdaptiveModelController, ASRBackend, ModelCache, StreamingTranscriber
+
+RATE = 16000
+STEP_SECONDS = 0.1
+
+
+class TimedBackend(ASRBackend):
+    """Fake model whose decode costs a fixed share of a streaming step, however long the buffer"""
+
+    name = "timed"
+
+    def __init__(self, model_name, step_costs):
+        super().__init__(model_name)
+        self.cost = step_costs[model_name] * STEP_SECONDS
+
+    def _transcribe(self, audio, **options):
+        time.sleep(self.cost)
+        return []
+
+
+def controller(step_costs, initial):
+    return AdaptiveModelController(lambda name: TimedBackend(name, step_costs), initial=initial, patience=3,
+                                   cooldown=0.0, smoothing=0.5)
+
+
+def stream(asr, steps):
+    streamer = StreamingTranscriber(asr, RATE, max_buffer_seconds=20.0)
+    for _ in range(steps):
+        streamer.insert_audio(np.zeros(int(STEP_SECONDS * RATE), dtype=np.float32))
+        streamer.process()
+    return streamer
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_long_buffer_does_not_hide_step_cost():
+    # base takes 40% of every step; measured against a growing buffer that looked like headroom
+    asr = controller({"tiny": 0.1, "base": 0.4, "small": 1.2}, "base")
+    streamer = stream(asr, 15)
+    assert asr.streaming
+    assert 0.3 < streamer.last_step_rtf < 0.8
+    time.sleep(0.2)
+    stream(asr, 1)
+    assert asr.model_name == "base"
+    assert asr.switches == []
+
+
+def test_step_overrun_downgrades():
+    asr = controller({"tiny": 0.1, "base": 0.4, "small": 1.2}, "small")
+    stream(asr, 5)
+    assert wait_for(lambda: asr.model_name == "base")
+    assert asr.switches[0]["from"] == "small"
+
+
+def test_cheap_steps_upgrade_after_warm_up():
+    asr = controller({"tiny": 0.05, "base": 0.1, "small": 0.5}, "tiny")
+    stream(asr, 5)
+    assert wait_for(lambda: asr._ready == "base" or asr.model_name == "base")
+    stream(asr, 1)
+    assert asr.switches[0]["from"] == "tiny" and asr.switches[0]["to"] == "base"
+    assert asr.stats()["rtf_basis"] == "step"
+
+
+def test_window_rtf_still_drives_chunked_mode():
+    asr = controller({"tiny": 0.1, "base": 0.4, "small": 1.2}, "small")
+    for _ in range(5):
+        # A chunked decode of one step of audio: the window is the new audio
+        asr.transcribe(np.zeros(int(STEP_SECONDS * RATE), dtype=np.float32))
+    assert wait_for(lambda: asr.model_name == "base")
+    assert not asr.streaming
+
+
+def test_slow_steps_during_a_model_load_start_one_switch():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        if name == "base" and len(loads) > 1:
+            time.sleep(0.3)
+        return TimedBackend(name, {"tiny": 0.1, "base": 0.4, "small": 1.2})
+
+    asr = AdaptiveModelController(loader, initial="small", patience=1, cooldown=0.0)
+    for _ in range(20):
+        asr.observe(2.0)
+        time.sleep(0.01)
+    assert wait_for(lambda: asr.model_name == "base")
+    assert loads.count("base") == 1
+    assert len(asr.switches) == 1
+
+
+def test_cache_never_evicts_the_model_in_use():
+    active = ["base"]
+    cache = ModelCache(lambda name: name, capacity=1, pinned=lambda: active)
+    cache.get("base")
+    cache.get("small")
+    assert cache.keys() == ["base", "small"]
+    active[0] = "small"
+    cache.get("tiny")
+    assert cache.keys() == ["small", "tiny"]
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from assistant import BoundedQueue, LivePipeline, PipelineState
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_full_queue_drops_the_oldest_item():
+    queue = BoundedQueue(maxsize=3)
+    for item in range(5):
+        queue.put(item)
+    assert queue.dropped == 2
+    assert [queue.get(0) for _ in range(3)] == [2, 3, 4]
+    assert queue.get(0.01) is BoundedQueue._EMPTY
+
+
+def test_get_wakes_up_on_put():
+    queue = BoundedQueue()
+    threading.Timer(0.05, queue.put, args=("late",)).start()
+    assert queue.get(timeout=2) == "late"
+
+
+def test_items_flow_through_stages_in_order():
+    items = iter(range(10))
+    results = []
+    state = PipelineState()
+
+    def source():
+        return next(items, None)
+
+    def collect(item):
+        results.append(item)
+        state.update(last=item)
+
+    pipeline = LivePipeline(source, [("double", lambda x: x * 2), ("odd_drop", lambda x: x if x % 4 else None),
+                                     ("collect", collect)], queue_size=16, state=state).start()
+    assert wait_for(lambda: len(results) == 5)
+    pipeline.stop()
+    assert results == [2, 6, 10, 14, 18]
+    assert pipeline.snapshot()["last"] == 18
+    assert not pipeline.running
+
+
+def test_slow_stage_loses_stale_work_without_stalling_capture():
+    release = threading.Event()
+    seen = []
+
+    def slow(item):
+        release.wait(2)
+        seen.append(item)
+
+    counter = iter(range(1000))
+    pipeline = LivePipeline(lambda: next(counter, None), [("slow", slow)], queue_size=2).start()
+    assert wait_for(lambda: pipeline.captured == 1000)
+    release.set()
+    assert wait_for(lambda: seen[-1:] == [999])
+    pipeline.stop()
+    # At most the item already being processed, then the newest two
+    assert len(seen) <= 3 and seen[-2:] == [998, 999]
+    assert pipeline.stats()["slow"]["dropped"] == 1000 - len(seen)
+
+
+def test_stage_errors_are_reported_and_the_worker_keeps_going():
+    items = iter([1, 0, 2])
+    out = []
+    pipeline = LivePipeline(lambda: next(items, None), [("invert", lambda x: out.append(1 / x))]).start()
+    assert wait_for(lambda: len(out) == 2)
+    pipeline.stop()
+    assert pipeline.stats()["invert"]["errors"] == 1
+    assert "invert" in pipeline.snapshot()["error"]
@@ -0,0 +1,94 @@
+from assistant import ContextAssembler, RetrievalContext, simhash
+from assistant.metrics import LatencyRecorder
+from assistant.prompt_context import hamming
+from assistant.vector_store import Match
+
+
+def words(text):
+    return len(text.split())
+
+
+def assembler(**kwargs):
+    kwargs.setdefault("counter", words)
+    kwargs.setdefault("recorder", LatencyRecorder())
+    return ContextAssembler(**kwargs)
+
+
+SUMMARY = ("The speakers agreed that the pricing change reduced churn among small teams, "
+           "and that the enterprise tier needs a clearer onboarding path before the next quarter.")
+
+
+def test_simhash_separates_near_duplicates_from_unrelated_text():
+    edited = SUMMARY.replace("clearer", "simpler")
+    other = "Weather across the coast stayed mild while the harbour ferries ran on the winter timetable."
+    assert hamming(simhash(SUMMARY), simhash(SUMMARY)) == 0
+    assert hamming(simhash(SUMMARY), simhash(edited)) <= 10
+    assert hamming(simhash(SUMMARY), simhash(other)) > 10
+
+
+def test_near_duplicates_and_blank_passages_are_dropped():
+    passages = [SUMMARY, "", SUMMARY.replace("clearer", "simpler"), "Hiring is paused until the funding round closes."]
+    context = assembler().assemble("q", passages)
+    assert context.candidates == 4
+    assert context.duplicates == 1
+    assert context.passages == 2
+    assert context.text.splitlines() == [SUMMARY, passages[3]]
+    assert context.saved_tokens == context.naive_tokens - context.tokens > 0
+
+
+def test_mmr_prefers_a_new_topic_over_a_redundant_one():
+    passages = [
+        "Pricing change reduced churn for small teams.",
+        "Churn for small teams dropped after pricing moved.",
+        "Onboarding for enterprise customers still takes weeks.",
+    ]
+    order = assembler(diversity=0.5)._mmr_order(passages, [0, 1, 2])
+    assert order[:2] == [0, 2]
+    assert assembler(diversity=0.0)._mmr_order(passages, [0, 1, 2]) == [0, 1, 2]
+
+
+def test_budget_skips_long_passages_for_shorter_ones():
+    long = " ".join(f"word{i}" for i in range(50))
+    short = "Short note on the roadmap review."
+    context = assembler(budget=20).assemble("q", [long, short])
+    assert context.text == short
+    assert context.tokens <= 20
+
+
+def test_best_passage_is_truncated_when_nothing_fits():
+    long = " ".join(f"word{i}" for i in range(100))
+    context = assembler().assemble("q", [long], budget=30)
+    assert context.passages == 1
+    assert 0 < context.tokens <= 30
+    assert long.startswith(context.text)
+
+
+def test_counters_are_recorded():
+    recorder = LatencyRecorder()
+    assembler(recorder=recorder).assemble("q", [SUMMARY, SUMMARY])
+    counters = recorder.counters()
+    assert counters["context.prompts"] == 1
+    assert counters["context.duplicates_dropped"] == 1
+    assert counters["context.tokens_saved"] == words(SUMMARY)
+
+
+def test_retrieval_context_assembles_and_keeps_totals():
+    texts = [SUMMARY, SUMMARY, "Hiring is paused until the funding round closes."]
+    recorder = LatencyRecorder()
+    retrieval = RetrievalContext(embed=lambda text: [1.0], recorder=recorder,
+                                 search=lambda vector, top_k: [Match(id=str(i), score=1.0, metadata={"text": t})
+                                                               for i, t in enumerate(texts[:top_k])],
+                                 assembler=assembler(recorder=recorder))
+    text = retrieval.context("what about churn?", top_k=3)
+    assert text.splitlines() == [SUMMARY, texts[2]]
+    assert retrieval.assembled.duplicates == 1
+    assert retrieval.tokens_saved == retrieval.assembled.saved_tokens > 0
+    assert "prompt tokens saved" in retrieval.describe()
+
+
+def test_separators_count_against_the_budget():
+    passages = ["a" * 40, "b" * 40, "c" * 19]
+    # Counting characters, the two 40-character passages plus their newline need 81
+    context = assembler(counter=len, budget=80).assemble("q", passages)
+    assert context.tokens <= 80
+    assert context.text == "a" * 40 + "\n" + "c" * 19
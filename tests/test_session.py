@@ -0,0 +1,68 @@
+import threading
+import time
+
+from assistant import LiveSession
+
+
+class SlowPipeline:
+    """Stands in for LivePipeline; ``join`` waits until the test releases it"""
+
+    def __init__(self, released):
+        self.released = released
+
+    def start(self):
+        return self
+
+    def stop(self, timeout=None):
+        pass
+
+    def join(self, timeout=None):
+        self.released.wait(timeout)
+
+    def snapshot(self):
+        return {"questions": "q"}
+
+
+def test_start_does_not_wait_for_a_previous_run_that_is_still_stopping():
+    released = threading.Event()
+    session = LiveSession()
+    closed = []
+    assert session.start(lambda: SlowPipeline(released), on_stop=[lambda: closed.append("first")])
+    session.stop()
+    assert session.stopping and not session.running
+
+    started = time.perf_counter()
+    assert session.start(lambda: SlowPipeline(released), on_stop=[lambda: closed.append("second")])
+    assert time.perf_counter() - started < 0.05
+    assert session.running and closed == []
+
+    released.set()
+    deadline = time.monotonic() + 2
+    while session.stopping and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Only the first run's resources are released; the second run keeps its own
+    assert closed == ["first"]
+    assert session.running
+
+
+def test_refused_start_releases_its_own_resources():
+    released = threading.Event()
+    released.set()
+    session = LiveSession()
+    closed = []
+    session.start(lambda: SlowPipeline(released))
+    assert session.start(lambda: SlowPipeline(released), on_stop=[lambda: closed.append(True)]) is False
+    assert closed == [True]
+
+
+def test_snapshot_survives_stop_until_reset():
+    released = threading.Event()
+    released.set()
+    session = LiveSession()
+    assert session.snapshot() == {}
+    session.start(lambda: SlowPipeline(released))
+    assert session.start(lambda: SlowPipeline(released)) is False
+    session.stop()
+    assert session.snapshot() == {"questions": "q"}
+    session.reset()
+    assert session.snapshot() == {}
@@ -0,0 +1,94 @@
+import numpy as np
+
+from assistant import ASRBackend, Segment, StreamingTranscriber, Word
+
+RATE = 16000
+WORD_SECONDS = 0.5
+
+
+def speech(words):
+    """Audio where word ``i`` is WORD_SECONDS of samples with value ``i + 1``"""
+    return np.repeat(np.arange(1, words + 1, dtype=np.float32), int(WORD_SECONDS * RATE))
+
+
+class ScriptedBackend(ASRBackend):
+    """Reads words back out of :func:`speech` audio; a word cut off by the buffer edge is misheard"""
+
+    name = "scripted"
+
+    def __init__(self):
+        super().__init__("test")
+        self.prompts = []
+
+    def _transcribe(self, audio, **options):
+        self.prompts.append(options.get("initial_prompt"))
+        words = []
+        edges = np.flatnonzero(np.diff(audio)) + 1
+        for start, end in zip(np.r_[0, edges], np.r_[edges, len(audio)]):
+            value = int(audio[start])
+            if value == 0:
+                continue
+            complete = end - start >= int(WORD_SECONDS * RATE) or end < len(audio)
+            words.append(Word(start / RATE, end / RATE, f" w{value}" if complete else f" w{value}-"))
+        if not words:
+            return []
+        return [Segment(words[0].start, words[-1].end, "".join(w.word for w in words), words)]
+
+
+def feed(streamer, audio, step_seconds=0.25):
+    step = int(step_seconds * RATE)
+    out = []
+    for i in range(0, len(audio), step):
+        streamer.insert_audio(audio[i:i + step])
+        out.append(streamer.process())
+    return out
+
+
+def test_words_commit_after_two_agreeing_decodes():
+    streamer = StreamingTranscriber(ScriptedBackend(), RATE, chunk_seconds=0)
+    streamer.insert_audio(speech(2))
+    assert streamer.process() == ""
+    assert streamer.preview == "w1 w2"
+    streamer.insert_audio(np.zeros(RATE // 4, dtype=np.float32))
+    assert streamer.process() == "w1 w2"
+
+
+def test_partial_word_is_not_committed():
+    streamer = StreamingTranscriber(ScriptedBackend(), RATE, chunk_seconds=0)
+    audio = speech(2)[:int(0.75 * RATE)]
+    assert "w2" not in "".join(feed(streamer, audio))
+    assert streamer.preview.endswith("w2-")
+
+
+def test_stream_returns_every_word_once_in_order():
+    streamer = StreamingTranscriber(ScriptedBackend(), RATE, chunk_seconds=2.0, max_buffer_seconds=4.0)
+    out = feed(streamer, speech(30)) + [streamer.flush()]
+    text = " ".join(chunk for chunk in out if chunk)
+    assert text.split() == [f"w{i}" for i in range(1, 31)]
+
+
+def test_buffer_is_trimmed_and_committed_text_becomes_prompt():
+    backend = ScriptedBackend()
+    streamer = StreamingTranscriber(backend, RATE, max_buffer_seconds=3.0)
+    feed(streamer, speech(20))
+    assert streamer.buffered_seconds <= 3.0 + 0.25
+    assert backend.prompts[0] is None
+    assert backend.prompts[-1] and backend.prompts[-1].split()[-1].startswith("w")
+
+
+def test_flush_commits_pending_hypothesis_and_empties_buffer():
+    streamer = StreamingTranscriber(ScriptedBackend(), RATE, chunk_seconds=10)
+    feed(streamer, speech(3))
+    assert streamer.flush() == "w1 w2 w3"
+    assert streamer.buffered_seconds == 0
+    assert streamer.preview == ""
+
+
+def test_committed_words_are_returned_on_the_step_that_agrees_on_them():
+    streamer = StreamingTranscriber(ScriptedBackend(), RATE)
+    out = feed(streamer, speech(12))
+    first = next(i for i, chunk in enumerate(out) if chunk)
+    # Word 1 is complete after 0.5 s and agreed on by the next step, well before 5 s of speech
+    assert (first + 1) * 0.25 <= 1.0
+    assert out[first] == "w1"
+    assert sum(1 for chunk in out if chunk) > 5
@@ -0,0 +1,40 @@
+from assistant import TranscriptStore, new_session_id
+
+
+def test_sessions_started_together_stay_apart(tmp_path):
+    path = str(tmp_path / "transcripts.db")
+    twitter = TranscriptStore(path, app="twitter_spaces")
+    linkedin = TranscriptStore(path, app="linkedin_calls")
+    first, second = new_session_id("twitter_spaces"), new_session_id("linkedin_calls")
+    assert first != second
+    twitter.append(first, "hello from the space", 0.0, 1.0)
+    linkedin.append(second, "hello from the call", 0.0, 1.0)
+    twitter.flush()
+    linkedin.flush()
+    assert twitter.text(first) == "hello from the space"
+    assert linkedin.text(second) == "hello from the call"
+    assert [s["session_id"] for s in twitter.sessions()] == [first]
+    assert [s["session_id"] for s in linkedin.sessions()] == [second]
+
+
+def test_session_keeps_its_app(tmp_path):
+    path = str(tmp_path / "transcripts.db")
+    session = new_session_id("in_person_meeting")
+    meeting = TranscriptStore(path, app="in_person_meeting")
+    meeting.append(session, "first", topic="a")
+    meeting.flush()
+    store = TranscriptStore(path)
+    store.append(session, "second", topic="b")
+    assert store.sessions()[0]["app"] == "in_person_meeting"
+    assert store.text(session) == "first second"
+
+
+def test_reads_only_newer_segments(tmp_path):
+    store = TranscriptStore(str(tmp_path / "transcripts.db"), batch_size=2)
+    session = new_session_id()
+    for i in range(5):
+        store.append(session, f"segment {i}", i, i + 1)
+    rows = store.read(session)
+    assert [row["text"] for row in store.read(session, after=rows[2]["id"])] == ["segment 3", "segment 4"]
+    assert [row["text"] for row in store.tail(session, 2)] == ["segment 3", "segment 4"]
+    assert store.count(session) == 5
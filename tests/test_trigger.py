@@ -0,0 +1,42 @@
+from assistant import QuestionTrigger, TranscriptWindow
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def feed(trigger, clock, window, text, seconds=5.0):
+    clock.now += seconds
+    window.append(text)
+    return trigger.update(text, window)
+
+
+def test_new_topic_fires_and_same_topic_waits():
+    clock = Clock()
+    window = TranscriptWindow(500)
+    trigger = QuestionTrigger(min_interval=10, max_interval=1000, min_new_tokens=10, novelty_tokens=15, clock=clock)
+    budget_talk = "The quarterly budget review covers marketing spend and hiring plans for engineering teams."
+    assert not feed(trigger, clock, window, budget_talk).fire  # too soon
+    assert feed(trigger, clock, window, budget_talk, seconds=10).fire
+    assert feed(trigger, clock, window, budget_talk, seconds=20).reason == "same topic"
+    decision = feed(trigger, clock, window, "Satellite launches, rocket engines and orbital payload insurance "
+                                            "pricing dominate the space industry discussion now.", seconds=20)
+    assert decision.fire and decision.reason == "new topic"
+
+
+def test_pending_speech_stays_bounded_after_budget_is_spent():
+    clock = Clock()
+    window = TranscriptWindow(500)
+    trigger = QuestionTrigger(min_interval=0, min_new_tokens=1, novelty_tokens=40, budget=2, calls_per_trigger=2,
+                              clock=clock)
+    assert feed(trigger, clock, window, "Opening remarks about product strategy and roadmap priorities.").fire
+    for i in range(500):
+        decision = feed(trigger, clock, window, f"Update {i} on supplier contracts and logistics costs.")
+        assert decision.reason == "budget spent"
+    assert sum(tokens for _, tokens in trigger._new_text) < 40 + 20
+    assert len(trigger._new_text) < 10
+    assert "Update 499" in trigger._latest_text()
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from assistant import LocalVectorStore
+
+DIM = 16
+
+
+def unit(i, dim=DIM):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[i % dim] = 1.0
+    return vector
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore("test", DIM, path=str(tmp_path / "store"), train_threshold=10**9)
+    yield store
+    store.close()
+
+
+def test_query_ranks_by_cosine_and_returns_metadata(store):
+    store.upsert([{"id": f"v{i}", "values": unit(i) * (i + 1), "metadata": {"text": f"passage {i}"}}
+                  for i in range(5)])
+    result = store.query(unit(3) + 0.1 * unit(4), top_k=2, include_metadata=True)
+    assert [match.id for match in result.matches] == ["v3", "v4"]
+    assert result.matches[0].score == pytest.approx(1 / np.sqrt(1.01), rel=1e-5)
+    assert result.matches[0]["metadata"] == {"text": "passage 3"}
+    assert "metadata" not in store.query(unit(3), top_k=1).matches[0]
+
+
+def test_upsert_overwrites_by_id_and_namespaces_are_separate(store):
+    store.upsert([{"id": "a", "values": unit(0), "metadata": {"v": 1}}], namespace="one")
+    store.upsert([{"id": "a", "values": unit(1), "metadata": {"v": 2}}], namespace="one")
+    store.upsert([{"id": "a", "values": unit(2), "metadata": {"v": 3}}], namespace="two")
+    assert store.count == 2
+    match = store.query(unit(1), top_k=5, include_metadata=True, namespace="one").matches
+    assert len(match) == 1 and match[0]["metadata"] == {"v": 2}
+    assert store.query(unit(1), namespace="missing").matches == []
+    with pytest.raises(ValueError):
+        store.upsert([{"id": "bad", "values": [1.0, 2.0]}])
+
+
+def test_metadata_filters(store):
+    store.upsert([{"id": str(i), "values": unit(i), "metadata": {"topic": f"t{i % 3}", "n": i}} for i in range(9)])
+
+    def ids(filter):
+        return sorted(match.id for match in store.query(unit(0), top_k=9, filter=filter).matches)
+
+    assert ids({"topic": "t1"}) == ["1", "4", "7"]
+    assert ids({"topic": {"$in": ["t0", "t2"]}, "n": {"$ne": 0}}) == ["2", "3", "5", "6", "8"]
+    assert ids({"topic": {"$nin": ["t0", "t1"]}}) == ["2", "5", "8"]
+    assert ids({"$or": [{"n": 1}, {"n": 8}]}) == ["1", "8"]
+    assert ids({"$and": [{"topic": "t0"}, {"n": {"$in": [0, 6, 7]}}]}) == ["0", "6"]
+    with pytest.raises(ValueError):
+        ids({"n": {"$gt": 3}})
+
+
+def test_delete_by_ids_filter_and_all_then_reuse_rows(store):
+    store.upsert([{"id": str(i), "values": unit(i), "metadata": {"topic": f"t{i % 2}"}} for i in range(6)])
+    store.delete(ids=["0", "missing"])
+    store.delete(filter={"topic": "t1"})
+    assert store.count == 2
+    assert sorted(m.id for m in store.query(unit(0), top_k=6).matches) == ["2", "4"]
+    store.upsert([{"id": "new", "values": unit(5)}])
+    assert store._size == 6  # a freed row was reused
+    store.delete(delete_all=True)
+    assert store.count == 0 and store.query(unit(0)).matches == []
+    with pytest.raises(ValueError):
+        store.delete()
+
+
+def test_vectors_metadata_and_lists_survive_reopening(tmp_path):
+    path = str(tmp_path / "store")
+    store = LocalVectorStore("test", DIM, path=path, train_threshold=10**9, exact_rows=0)
+    store.upsert([{"id": str(i), "values": unit(i) + 0.01 * i, "metadata": {"i": i}} for i in range(40)])
+    store.train()
+    store.delete(ids=["3"])
+    store.close()
+
+    reopened = LocalVectorStore("test", DIM, path=path, train_threshold=10**9, exact_rows=0)
+    assert reopened.count == 39
+    assert "IVF lists" in reopened.describe()
+    match = reopened.query(unit(5) + 0.05, top_k=1, include_metadata=True).matches[0]
+    assert match.id in {"5", "21", "37"} and match["metadata"]["i"] == int(match.id)
+    assert "3" not in {m.id for m in reopened.query(unit(3), top_k=39).matches}
+    reopened.close()
+
+
+def test_ivf_search_keeps_recall_on_clustered_vectors(tmp_path):
+    rng = np.random.default_rng(1)
+    dim, clusters = 32, 40
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, 5000)] + 0.3 * rng.standard_normal((5000, dim)).astype(np.float32)
+    store = LocalVectorStore("ivf", dim, path=str(tmp_path / "ivf"), nprobe=8, train_threshold=10**9,
+                             exact_rows=100)
+    store.upsert([{"id": str(i), "values": row, "metadata": {"odd": i % 2}} for i, row in enumerate(data)])
+    store.train()
+    # Written after training: assigned to the existing lists on upsert
+    store.upsert([{"id": "late", "values": centers[7] * 10}])
+    assert store.query(centers[7], top_k=1).matches[0].id == "late"
+
+    normalized = data / np.linalg.norm(data, axis=1, keepdims=True)
+    hits = 0
+    probes = centers[rng.integers(0, clusters, 30)] + 0.3 * rng.standard_normal((30, dim)).astype(np.float32)
+    for probe in probes:
+        exact = set(map(str, np.argsort(-(normalized @ (probe / np.linalg.norm(probe))))[:5]))
+        found = {m.id for m in store.query(probe, top_k=6).matches} - {"late"}
+        hits += len(exact & found)
+    assert hits / (30 * 5) >= 0.9
+    odd = store.query(probes[0], top_k=5, filter={"odd": 1}).matches
+    assert len(odd) == 5 and all(int(m.id) % 2 for m in odd)
+    store.close()
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3])
+def test_training_a_nearly_empty_store(store, count):
+    store.upsert([{"id": f"v{i}", "values": unit(i)} for i in range(count)])
+    store.train()
+    result = store.query(unit(0), top_k=1)
+    assert [match.id for match in result.matches] == (["v0"] if count else [])
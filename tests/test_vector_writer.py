@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from assistant import VectorWriter, vector_id
+
+
+class FlakyIndex:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("reset by peer")
+            self.requests.append((namespace, [vector["id"] for vector in vectors]))
+
+
+def vectors(count, dims=8):
+    return [{"id": vector_id("topic", "doc", i), "values": [0.1] * dims, "metadata": {"text": f"chunk {i}"}}
+            for i in range(count)]
+
+
+def test_ids_are_stable_and_scoped():
+    assert vector_id("a", "doc", 0) == vector_id("a", "doc", 0)
+    assert len({vector_id("a", "doc", 0), vector_id("b", "doc", 0), vector_id("a", "doc", 1)}) == 3
+
+
+def test_batches_by_count_and_payload_size():
+    from assistant.vector_writer import payload_bytes
+    assert len(VectorWriter(FlakyIndex(), batch_size=100).batches(vectors(350))) == 4
+    batches = VectorWriter(FlakyIndex(), batch_size=100, max_batch_bytes=4000).batches(vectors(350, dims=16))
+    assert len(batches) > 4
+    assert all(sum(payload_bytes(vector) for vector in batch) <= 4000 for batch in batches)
+    assert sum(len(batch) for batch in batches) == 350
+
+
+def test_concurrent_upsert_writes_every_vector_once():
+    index = FlakyIndex()
+    writer = VectorWriter(index, batch_size=50)
+    ids = writer.upsert(vectors(230), namespace="ns")
+    written = [i for namespace, batch in index.requests for i in batch]
+    assert sorted(written) == sorted(ids)
+    assert {namespace for namespace, _ in index.requests} == {"ns"}
+    assert writer.describe() == "upserts: 230 vectors in 5 requests, 0 retried"
+
+
+def test_failed_requests_are_retried_then_raised():
+    index = FlakyIndex(failures=2)
+    writer = VectorWriter(index, retries=3, backoff=0.001)
+    writer.upsert(vectors(10))
+    assert writer.retried == 2 and len(index.requests) == 1
+    with pytest.raises(ConnectionError):
+        VectorWriter(FlakyIndex(failures=5), retries=1, backoff=0.001).upsert(vectors(3))